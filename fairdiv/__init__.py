@@ -1,8 +1,11 @@
 # -*- coding: utf-8 -*-
+import array
 import collections
+import collections.abc
 import itertools
 from functools import total_ordering
 from cacheUtils import *
+from instrumentation import Instrumentation
 
 
 class Utils(object):
@@ -191,6 +194,8 @@ class Agent(object):
         injections = Utils.get_possible_injections(alloc1, alloc2)
         ordinally_less = False
         for injection in injections:
+            if Instrumentation.enabled:
+                Instrumentation.count("Agent._is_ordinally_less.injections")
             ordinally_less = True
             for (x, y) in injection:
                 if not agent.compare_goods(y, x):
@@ -275,6 +280,31 @@ class Allocation(object):
     def __iter__(self):
         yield from [self.g1, self.g2]
 
+    def to_mask(self, goods):
+        """
+        Encodes the allocation as a bitmask over the given goods.
+        :param goods: the goods of the problem, in a fixed order
+        :return: an int whose bit i is set if goods[i] is allocated to the first agent
+        """
+        mask = 0
+        for i, good in enumerate(goods):
+            if good in self.g1:
+                mask |= 1 << i
+        return mask
+
+    @staticmethod
+    def from_mask(agents, goods, mask):
+        """
+        Decodes an allocation from a bitmask (see :meth:`to_mask`)
+        :param agents: the two agents
+        :param goods: the goods of the problem, in the same order used to build the mask
+        :param mask: an int whose bit i is set if goods[i] is allocated to the first agent
+        :return: An Allocation object
+        """
+        mask = int(mask)
+        return Allocation(agents[0], [good for i, good in enumerate(goods) if mask >> i & 1],
+                          agents[1], [good for i, good in enumerate(goods) if not mask >> i & 1])
+
     @staticmethod
     @mem_cache(cache_size=10)
     def generate_all_allocations(agents, goods):
@@ -289,20 +319,282 @@ class Allocation(object):
                     for g1 in itertools.combinations(goods, len(goods)//2)])
 
     @staticmethod
-    def get_allocations(agents, allocations):
+    @mem_cache(cache_size=20)
+    def skeleton(n):
+        """
+        The structure of the balanced allocations of n goods, which doesn't depend on the agents nor on the goods.
+        :param n: the number of goods
+        :return: a list of tuples (mask, first indices, second indices), one per allocation, in the order of
+                 :meth:`generate_all_allocations`. The indices are the ones of the goods given to each agent.
+        """
+        return [(sum([1 << i for i in first]), first, tuple([i for i in range(n) if i not in first]))
+                for first in itertools.combinations(range(n), n // 2)]
+
+    @staticmethod
+    def view(agents, goods):
+        """
+        :param agents: the two agents
+        :param goods: the goods
+        :return: the possible allocations of the problem as an :class:`AllocationView`, which is cheaper to build
+                 than :meth:`generate_all_allocations` since the skeleton is shared by all the problems of a size
+        """
+        return AllocationView(agents, goods)
+
+    @staticmethod
+    def get_allocations(agents, allocations, goods=None):
         """
         Retrieves a set of Allocation objects from allocations represented by iterables
         :param agents: The agents
         :type agents: list|tuple
         :param allocations: The allocations represented by iterables like [(0, 1), (2, 3)]
         :type allocations: collections.Iterable
-        :return: A set of Allocation objects
+        :param goods: the goods of the problem. If None, they are the ones of the first allocation.
+        :return: An :class:`AllocationSet`
+        """
+        allocations = list(allocations)
+        if goods is None:
+            goods = list(allocations[0][0]) + list(allocations[0][1]) if len(allocations) > 0 else []
+        return AllocationSet.from_allocations(agents, goods, allocations)
+
+
+class AllocationView(collections.abc.Sequence):
+    """
+    The possible allocations of a problem, binding the skeleton of its size (see :meth:`Allocation.skeleton`) to
+    its agents & goods. Allocation objects are only built when accessed.
+    """
+
+    def __init__(self, agents, goods):
+        """
+        :param agents: the two agents
+        :param goods: the goods
+        """
+        self.agents = agents
+        self.goods = goods
+        self._skeleton = Allocation.skeleton(len(goods))
+
+    def __len__(self):
+        return len(self._skeleton)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        mask, first, second = self._skeleton[index]
+        return Allocation(self.agents[0], [self.goods[i] for i in first],
+                          self.agents[1], [self.goods[i] for i in second])
+
+    def __contains__(self, alloc):
+        return (
+            isinstance(alloc, Allocation)
+            and alloc.a1 == self.agents[0] and alloc.a2 == self.agents[1]
+            and len(alloc.g1) == len(self.goods) // 2
+            and sorted(alloc.g1 + alloc.g2) == sorted(self.goods)
+        )
+
+    def masks(self):
+        """
+        :return: the masks of the allocations over the goods (see :meth:`Allocation.to_mask`), in order
+        """
+        return [mask for mask, _, _ in self._skeleton]
+
+
+class AllocationSet(collections.abc.Set):
+    """
+    A set of allocations of one problem, stored as the sorted bitmasks of the allocations over the sorted goods
+    (see :meth:`Allocation.to_mask`). Set operations between sets of the same problem work on the masks, without
+    building Allocation objects. Sets of allocations of other types are accepted too.
+    """
+
+    def __init__(self, agents, goods, masks=()):
+        """
+        :param agents: the two agents
+        :param goods: the goods of the problem, the masks being over the sorted goods
+        :param masks: the masks of the allocations
+        """
+        self.agents = tuple(agents)
+        self.goods = tuple(sorted(goods))
+        self._set_masks(set([int(mask) for mask in masks]))
+
+    def _set_masks(self, masks):
+        """
+        :param masks: a set of distinct masks
+        """
+        self._mask_set = frozenset(masks)
+        masks = sorted(masks)
+        self._masks = array.array("Q", masks) if len(self.goods) <= 64 else masks
+
+    @staticmethod
+    def from_allocations(agents, goods, allocations):
         """
-        result = set()
-        for allocation in allocations:
-            result.add(Allocation(agents[0], allocation[0], agents[1], allocation[1]))
+        :param agents: the two agents
+        :param goods: the goods of the problem
+        :param allocations: an iterable of Allocation objects of the problem, or of couples of bundles
+        :return: an AllocationSet of these allocations
+        """
+        index = {good: 1 << i for i, good in enumerate(sorted(goods))}
+        return AllocationSet(agents, goods, [sum([index[good] for good in allocation[0]])
+                                             for allocation in allocations])
+
+    def masks(self):
+        """
+        :return: the sorted masks of the allocations
+        """
+        return list(self._masks)
+
+    def __len__(self):
+        return len(self._masks)
+
+    def __iter__(self):
+        for mask in self._masks:
+            yield Allocation.from_mask(self.agents, self.goods, mask)
+
+    def __contains__(self, alloc):
+        if not isinstance(alloc, Allocation) or alloc.a1 != self.agents[0] or alloc.a2 != self.agents[1] \
+                or tuple(sorted(alloc.g1 + alloc.g2)) != self.goods:
+            return False
+        return alloc.to_mask(self.goods) in self._mask_set
+
+    def __repr__(self):
+        return "AllocationSet({})".format(list(self))
+
+    def _same_problem(self, other):
+        """
+        :param other: a set
+        :return: other as an AllocationSet of the same problem, None if it isn't possible
+        """
+        if isinstance(other, AllocationSet):
+            if other.agents == self.agents and (other.goods == self.goods or len(other) == 0 or len(self) == 0):
+                return other
+            return None
+        # Allocations are checked from their bundles, without building the possible allocations of the problem
+        index = {good: 1 << i for i, good in enumerate(self.goods)}
+        masks = set()
+        for alloc in other:
+            if not isinstance(alloc, Allocation) or alloc.a1 != self.agents[0] or alloc.a2 != self.agents[1] \
+                    or len(alloc.g1) != len(self.goods) // 2 or len(alloc.g1) + len(alloc.g2) != len(self.goods):
+                return None
+            seen = 0
+            for good in itertools.chain(alloc.g1, alloc.g2):
+                bit = index.get(good, 0)
+                if bit == 0 or seen & bit:
+                    # Not a good of the problem, or a good given twice
+                    return None
+                seen |= bit
+            masks.add(sum([index[good] for good in alloc.g1]))
+        result = AllocationSet(self.agents, self.goods)
+        result._set_masks(masks)
+        return result
+
+    @property
+    def view(self):
+        """
+        :return: all the possible allocations of the problem, see :class:`AllocationView`
+        """
+        return AllocationView(self.agents, self.goods)
+
+    def _combine(self, other, operation):
+        """
+        :param other: a set
+        :param operation: a function combining two sets of masks
+        :return: the AllocationSet of the combined masks, a set of allocations if other is not a set of allocations
+                 of the same problem, NotImplemented if it isn't a set
+        """
+        if not isinstance(other, collections.abc.Set):
+            return NotImplemented
+        same = self._same_problem(other)
+        if same is None:
+            return operation(set(self), set(other))
+        result = AllocationSet(self.agents, self.goods if len(self) > 0 else same.goods)
+        result._set_masks(operation(self._mask_set, same._mask_set))
+        return result
+
+    def __and__(self, other):
+        return self._combine(other, lambda a, b: a & b)
+
+    def __or__(self, other):
+        return self._combine(other, lambda a, b: a | b)
+
+    def __sub__(self, other):
+        return self._combine(other, lambda a, b: a - b)
+
+    def __xor__(self, other):
+        return self._combine(other, lambda a, b: a ^ b)
+
+    __rand__ = __and__
+    __ror__ = __or__
+    __rxor__ = __xor__
+
+    def __rsub__(self, other):
+        return self._combine(other, lambda a, b: b - a)
+
+    def __le__(self, other):
+        same = self._same_problem(other) if isinstance(other, collections.abc.Set) else None
+        if same is None:
+            return super().__le__(other)
+        return self._mask_set <= same._mask_set
+
+    def __ge__(self, other):
+        same = self._same_problem(other) if isinstance(other, collections.abc.Set) else None
+        if same is None:
+            return super().__ge__(other)
+        return self._mask_set >= same._mask_set
+
+    def __lt__(self, other):
+        return self <= other and len(self) < len(other)
+
+    def __gt__(self, other):
+        return self >= other and len(self) > len(other)
+
+    def __eq__(self, other):
+        if not isinstance(other, collections.abc.Set):
+            return NotImplemented
+        return len(self) == len(other) and self <= other
+
+    __hash__ = None
+
+    def union(self, *others):
+        result = self
+        for other in others:
+            result = result | _as_set(other)
+        return result
+
+    def intersection(self, *others):
+        result = self
+        for other in others:
+            result = result & _as_set(other)
         return result
 
+    def difference(self, *others):
+        result = self
+        for other in others:
+            result = result - _as_set(other)
+        return result
+
+    def symmetric_difference(self, other):
+        return self ^ _as_set(other)
+
+    def issubset(self, other):
+        return self <= _as_set(other)
+
+    def issuperset(self, other):
+        return self >= _as_set(other)
+
+    def count(self, other):
+        """
+        :param other: a set of allocations
+        :return: the number of allocations of this set that are in the other one
+        """
+        same = self._same_problem(_as_set(other))
+        if same is None:
+            return sum([1 for alloc in self if alloc in other])
+        return len(self._mask_set & same._mask_set)
+
+
+def _as_set(other):
+    """
+    :return: other if it is a set, else a set of its elements
+    """
+    return other if isinstance(other, collections.abc.Set) else set(other)
+
 
 def max_min_rank(agents, goods):
     """
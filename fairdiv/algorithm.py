@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
 import itertools
 from properties import is_envy_free_ordinally
-from fairdiv import Allocation, max_min_rank
+from fairdiv import Allocation, AllocationSet, max_min_rank
 from cacheUtils import *
+from instrumentation import Instrumentation
+from budget import Budget
 
 
-@cache
+@set_cache
 def original_sequential(agents, goods):
     """
     Use the Original Sequential Algorithm to compute a fair division of provided goods.
@@ -19,6 +21,10 @@ def original_sequential(agents, goods):
     allocations = set()
 
     def inner(z, u, l):
+        if Instrumentation.enabled:
+            Instrumentation.count("original_sequential.nodes")
+        if Budget.active:
+            Budget.tick()
         if len(u) == 0:
             allocations.add((tuple(z[0]), tuple(z[1])))
             return
@@ -50,10 +56,10 @@ def original_sequential(agents, goods):
             inner(z, u, l+1)
 
     inner(([], []), goods, 1)
-    return Allocation.get_allocations(agents, allocations)
+    return Allocation.get_allocations(agents, allocations, goods)
 
 
-@cache
+@set_cache
 def restricted_sequential(agents, goods):
     """
     Uses the Restricted Sequential Algorithm to compute a fair division of provided goods.
@@ -75,6 +81,10 @@ def restricted_sequential(agents, goods):
         :param l: The max rank of goods to consider
         :return:
         """
+        if Instrumentation.enabled:
+            Instrumentation.count("restricted_sequential.nodes")
+        if Budget.active:
+            Budget.tick()
         if len(u) == 0:
             allocations.add((tuple(z[0]), tuple(z[1])))
             return
@@ -108,9 +118,9 @@ def restricted_sequential(agents, goods):
         if not branched:
             inner(z, u, l+1)
     inner(([], []), goods, 1)
-    return Allocation.get_allocations(agents, allocations)
+    return Allocation.get_allocations(agents, allocations, goods)
 
-@cache
+@set_cache
 def singles_doubles(agents, goods):
     """
     Uses the singles doubles algorithm to compute fair divisions of provided goods
@@ -138,6 +148,10 @@ def singles_doubles(agents, goods):
                 :param u: The list of unallocated items
                 :return:
                 """
+        if Instrumentation.enabled:
+            Instrumentation.count("singles_doubles.nodes")
+        if Budget.active:
+            Budget.tick()
         if len(u) == 0:
             allocations.add((tuple(z[0]), tuple(z[1])))
             return
@@ -172,9 +186,9 @@ def singles_doubles(agents, goods):
                 inner((za, zb), v)
 
     inner((za, zb), u)
-    return Allocation.get_allocations(agents, allocations)
+    return Allocation.get_allocations(agents, allocations, goods)
 
-@cache
+@set_cache
 def bottom_up(agents, goods):
     """
     Use the bottom-up algorithm to calculate allocations.
@@ -196,10 +210,10 @@ def bottom_up(agents, goods):
     return Allocation.get_allocations(agents, [
         inner(0, ([], []), u[:]),
         inner(1, ([], []), u)
-    ])
+    ], goods)
 
 
-@cache
+@set_cache
 def trump_algorithm(agents, goods):
     """
     Use the Trump algorithm to compute a fair division of provided goods.
@@ -224,9 +238,9 @@ def trump_algorithm(agents, goods):
     r1 = inner(agents)
     r2 = inner((agents[1], agents[0]))
     if r1 is None and r2 is None:
-        return set()
+        return AllocationSet(agents, goods)
     r2 = r2[1], r2[0] if r2 is not None else r2  # r2 was inverted
-    return Allocation.get_allocations(agents, [r for r in (r1, r2) if r is not None])
+    return Allocation.get_allocations(agents, [r for r in (r1, r2) if r is not None], goods)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Asyncio driver of a :class:`statistics.Benchmark` : every (problem, algorithm) is run as a task of a process pool,
+at most a fixed number of them being submitted at once, & results are read as an async iterator in completion
+order. A task is only submitted when the consumer asks for more results, so a slow consumer slows the benchmark
+down instead of letting results pile up. Stopping the iteration cancels the tasks that haven't started.
+
+Example::
+
+    async for name, problem, statistics in AsyncBenchmark(benchmark, max_in_flight=8).results():
+        print(name, problem, statistics.satisfied)
+
+Algorithms & properties are sent to the worker processes, so they must be picklable (module level functions).
+Properties registered in :data:`propertyRegistry.DEFAULT_REGISTRY` are sent by name. The workers evaluate them with
+the default registry & materialize the statistics, so benchmarks with another registry or lazy statistics aren't
+supported.
+"""
+import asyncio
+import concurrent.futures
+import os
+
+from propertyRegistry import DEFAULT_REGISTRY
+from instrumentation import Instrumentation
+from fairdiv import Allocation
+from statistics import Benchmark, Statistics
+
+
+def _portable(properties):
+    """
+    :param properties: a dict key -> function, see :class:`statistics.Benchmark`
+    :return: a dict key -> function or name of a property of the default registry
+    """
+    result = dict()
+    for key, func in properties.items():
+        name = DEFAULT_REGISTRY._names.get(func)
+        result[key] = func if name is None else name
+    return result
+
+
+def _run_task(name, algo, problem, properties, time_limit, node_limit, instrumentation):
+    """
+    Runs an algorithm on a problem in a worker process
+    :param properties: a dict key -> function or name of a property of the default registry, see :func:`_portable`
+    :param instrumentation: True if instrumentation is enabled in the benchmark's process
+    :return: a picklable result, see :func:`_statistics`
+    """
+    if instrumentation:
+        Instrumentation.enable()
+    functions = {k: DEFAULT_REGISTRY.function(f) if isinstance(f, str) else f for k, f in properties.items()}
+    statistics = Statistics(Allocation.view(*problem), problem[0], functions)
+    Benchmark._run_algorithm(name, algo, problem, statistics, time_limit, node_limit)
+    keys = list(functions)
+    rows = [(row[Statistics.A_KEY], [row[k] for k in keys]) for row in statistics.data]
+    timeout = None if statistics.timeout is None else str(statistics.timeout)
+    return name, problem[0], keys, rows, statistics.count, statistics.satisfied, statistics.instrumentation, timeout
+
+
+def _statistics(result):
+    """
+    :param result: the result of :func:`_run_task`
+    :return: a tuple (algorithm name, problem, Statistics). The statistics hold the results of the allocations,
+             but neither the possible allocations nor the functions, like the ones of
+             :func:`serialization.load_result`. A timeout is restored as its message.
+    """
+    name, agents, keys, rows, count, satisfied, instrumentation, timeout = result
+    statistics = Statistics(None, agents, dict.fromkeys(keys))
+    for alloc, values in rows:
+        row = {Statistics.A_KEY: alloc}
+        row.update(zip(keys, values))
+        statistics._data.append(row)
+    statistics.count = count
+    statistics.satisfied = satisfied
+    statistics.instrumentation = instrumentation
+    statistics.timeout = timeout
+    return name, str(agents[1].preferences), statistics
+
+
+class AsyncBenchmark(object):
+    """
+    Runs a benchmark in a process pool, see the module documentation
+    """
+
+    def __init__(self, benchmark, max_in_flight=None, executor=None):
+        """
+        :param benchmark: the :class:`statistics.Benchmark` to run. Its problems are read as tasks are submitted,
+                          so they can be a generator. It must use the default registry & not be lazy.
+        :param max_in_flight: the maximal number of tasks submitted & not consumed yet, twice the number of CPUs
+                              if None
+        :param executor: a concurrent.futures executor, a process pool created for the run & shut down after it if
+                         None
+        :raise ValueError: if the benchmark uses another registry than the default one, or lazy statistics
+        """
+        if benchmark.registry is not DEFAULT_REGISTRY:
+            raise ValueError("The workers only evaluate properties with the default registry")
+        if benchmark.lazy:
+            raise ValueError("The statistics of the workers are materialized, lazy benchmarks aren't supported")
+        self.benchmark = benchmark
+        self.max_in_flight = max_in_flight if max_in_flight is not None else 2 * (os.cpu_count() or 1)
+        self.executor = executor
+        # Number of tasks submitted & completed, for progress displays
+        self.submitted = 0
+        self.completed = 0
+
+    def _tasks(self):
+        """
+        :return: a generator of the arguments of :func:`_run_task`
+        """
+        b = self.benchmark
+        properties = _portable(b.properties)
+        for problem in b.problems:
+            for name, algo in b.algorithms.items():
+                yield name, algo, problem, properties, b.time_limit, b.node_limit, Instrumentation.enabled
+
+    async def results(self):
+        """
+        Runs the benchmark
+        :return: an async generator of tuples (algorithm name, problem, Statistics) in completion order, the
+                 problem being identified like in :meth:`statistics.Benchmark.run` & the statistics like in
+                 :func:`_statistics`. Closing it or cancelling the consumer cancels the remaining tasks.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        if executor is None:
+            executor = concurrent.futures.ProcessPoolExecutor()
+        tasks = self._tasks()
+        in_flight = set()
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(in_flight) < self.max_in_flight:
+                    args = next(tasks, None)
+                    if args is None:
+                        exhausted = True
+                        break
+                    in_flight.add(loop.run_in_executor(executor, _run_task, *args))
+                    self.submitted += 1
+                if len(in_flight) == 0:
+                    return
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    self.completed += 1
+                    # Nothing is submitted while the consumer handles the result
+                    yield _statistics(future.result())
+        finally:
+            for future in in_flight:
+                future.cancel()
+            if self.executor is None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self):
+        """
+        Runs the benchmark & gathers the results
+        :return: the same dict as :meth:`statistics.Benchmark.run`, algorithm name -> {problem -> Statistics}
+        """
+        result = {name: dict() for name in self.benchmark.algorithms}
+        async for name, problem, statistics in self.results():
+            result[name][problem] = statistics
+        return result
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+Precomputed results of the algorithms on all the problems of a small size, stored in a binary file read
+through mmap.
+A problem of n goods is identified by the preferences of the second agent relatively to the first one's :
+the goods are relabelled by their rank for the first agent, & the second agent's preferences become a
+permutation of range(n), indexed by its Lehmer code. This index is the position of the problem in
+:func:`problemGenerators.generate_possible_problems`.
+
+File layout (little-endian)::
+
+    magic "FDATLAS1", version (uint16), n (uint16), problems (uint32), algorithms (uint16),
+    properties (uint16), names length (uint32), names (UTF-8, separated by newlines : the algorithms then
+    the properties), then for each algorithm its number of slots (uint16)
+    records, one per problem (in Lehmer order), each made of one block per algorithm :
+        count (uint8), masks (slots * uint16), verdicts (slots * verdict bytes)
+
+A mask has bit r set if the good ranked r+1 by the first agent is allocated to it. The verdicts of an
+allocation have bit k set if it satisfies the k-th property. Records have a fixed size, so a lookup only
+reads the bytes of its record.
+
+Build (from the repository root)::
+
+    PYTHONPATH=.:fairdiv python fairdiv/atlas.py --sizes 2 4 6 8
+
+Limits :
+    - the atlas is only read through an :class:`Atlas`, e.g. an algorithm wrapped by :meth:`Atlas.wrap`. The
+      :func:`cacheUtils.cache` lookups of the algorithms don't use it, so it doesn't replace the cache files of
+      resources/database/.
+    - :func:`build` runs the algorithms in pure Python & keeps the records of all the n! problems in memory before
+      writing them, so it is practical up to n = 8 (40320 problems). The format allows :data:`MAX_SIZE` goods, but
+      the records of the 3628800 problems of n = 10 don't fit in the memory of most machines.
+"""
+import argparse
+import math
+import mmap
+import os
+import struct
+
+from fairdiv import Allocation, AllocationSet
+from problemGenerators import generate_possible_problems, lehmer_index
+import algorithm
+import monteCarlo
+
+MAGIC = b"FDATLAS1"
+FORMAT_VERSION = 1
+MAX_SIZE = 10
+DEFAULT_DIRECTORY = "resources/atlas/"
+_HEADER = struct.Struct("<8sHHIHHI")
+
+ALGORITHMS = {
+    "original_sequential": algorithm.original_sequential,
+    "restricted_sequential": algorithm.restricted_sequential,
+    "singles_doubles": algorithm.singles_doubles,
+    "bottom_up": algorithm.bottom_up,
+    "trump_algorithm": algorithm.trump_algorithm,
+}
+
+
+def problem_index(agents):
+    """
+    :param agents: the two agents of a problem
+    :return: the index of the problem, see the module documentation
+    """
+    order = agents[0].preferences
+    rank = {good: r for r, good in enumerate(order)}
+    return lehmer_index([rank[good] for good in agents[1].preferences])
+
+
+def default_path(n):
+    """
+    :param n: the number of goods
+    :return: the path of the atlas of this size written by the build step
+    """
+    return os.path.join(DEFAULT_DIRECTORY, "atlas-{}.bin".format(n))
+
+
+def build(n, path=None, algorithms=None, functions=None, progress=None):
+    """
+    Computes & writes the atlas of a problem size
+    :param n: the number of goods, at most :data:`MAX_SIZE`
+    :param path: the path of the file, see :func:`default_path` if None
+    :param algorithms: a dict name -> algorithm, :data:`ALGORITHMS` if None. Cache decorators are bypassed.
+    :param functions: a dict key -> property function (alloc, all_allocs, agents) evaluated on the algorithms'
+                      outputs, :data:`monteCarlo.PROPERTIES` if None (they don't need all the allocations)
+    :param progress: an optional function called with the number of problems done
+    :return: the path of the file
+    """
+    if n > MAX_SIZE:
+        raise ValueError("The atlas is limited to {} goods".format(MAX_SIZE))
+    if path is None:
+        path = default_path(n)
+    if algorithms is None:
+        algorithms = ALGORITHMS
+    if functions is None:
+        functions = monteCarlo.PROPERTIES
+    algorithms = {name: getattr(algo, "__wrapped__", algo) for name, algo in algorithms.items()}
+    keys = list(functions)
+    verdict_bytes = max(1, (len(keys) + 7) // 8)
+
+    # Slots depend on the largest outputs, so everything is computed before writing
+    records = []
+    for index, (agents, goods) in enumerate(generate_possible_problems.__wrapped__(n)):
+        order = agents[0].preferences
+        record = []
+        for name, algo in algorithms.items():
+            outputs = sorted(algo(agents, goods), key=lambda X: X.to_mask(order))
+            record.append([(X.to_mask(order),
+                            sum(1 << k for k, key in enumerate(keys) if functions[key](X, None, agents)))
+                           for X in outputs])
+        records.append(record)
+        if progress is not None:
+            progress(index + 1)
+    slots = [max([len(record[a]) for record in records] + [0]) for a in range(len(algorithms))]
+
+    names = "\n".join(list(algorithms) + keys).encode("utf-8")
+    directory = os.path.dirname(path)
+    if directory != "" and not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, n, len(records), len(algorithms), len(keys), len(names)))
+        f.write(names)
+        f.write(struct.pack("<{}H".format(len(slots)), *slots))
+        for record in records:
+            for a, outputs in enumerate(record):
+                f.write(struct.pack("<B", len(outputs)))
+                masks = [mask for mask, _ in outputs] + [0] * (slots[a] - len(outputs))
+                f.write(struct.pack("<{}H".format(slots[a]), *masks))
+                for _, verdicts in outputs:
+                    f.write(verdicts.to_bytes(verdict_bytes, "little"))
+                f.write(bytes(verdict_bytes * (slots[a] - len(outputs))))
+    return path
+
+
+class Atlas(object):
+    """
+    Read access to an atlas file. The file is mapped in memory, a lookup only decodes the record of the
+    problem.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: the path of a file written by :func:`build`
+        """
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.n, self.problems, algorithms, properties, names_length = _HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("{} is not an atlas of a supported version".format(path))
+        offset = _HEADER.size
+        names = bytes(self._map[offset:offset + names_length]).decode("utf-8").split("\n")
+        offset += names_length
+        self.algorithms = names[:algorithms]
+        self.properties = names[algorithms:]
+        slots = struct.unpack_from("<{}H".format(algorithms), self._map, offset)
+        offset += 2 * algorithms
+        self._verdict_bytes = max(1, (properties + 7) // 8)
+        # name -> (offset of the algorithm's block in a record, slots)
+        self._blocks = dict()
+        position = 0
+        for name, s in zip(self.algorithms, slots):
+            self._blocks[name] = (position, s)
+            position += 1 + 2 * s + self._verdict_bytes * s
+        self._records = offset
+        self._record_size = position
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def covers(self, agents, goods):
+        """
+        :return: True if the problem has the size of the atlas
+        """
+        return len(goods) == self.n and len(agents) == 2
+
+    def _block(self, name, index):
+        position, slots = self._blocks[name]
+        offset = self._records + index * self._record_size + position
+        count = self._map[offset]
+        masks = struct.unpack_from("<{}H".format(count), self._map, offset + 1)
+        offset += 1 + 2 * slots
+        size = self._verdict_bytes
+        verdicts = [int.from_bytes(self._map[offset + i * size:offset + (i + 1) * size], "little")
+                    for i in range(count)]
+        return masks, verdicts
+
+    def masks(self, name, index):
+        """
+        :param name: the name of an algorithm
+        :param index: the index of a problem
+        :return: the masks over the goods ordered by the first agent's preferences of the algorithm's outputs
+        """
+        return list(self._block(name, index)[0])
+
+    def allocations(self, name, agents, goods):
+        """
+        :param name: the name of an algorithm
+        :param agents: the agents of a problem of the atlas' size
+        :param goods: the goods
+        :return: the set of allocations returned by the algorithm on the problem, an :class:`fairdiv.AllocationSet`
+        """
+        masks = self.masks(name, problem_index(agents))
+        order = agents[0].preferences
+        return AllocationSet.from_allocations(agents, goods, [Allocation.from_mask(agents, order, mask)
+                                                              for mask in masks])
+
+    def verdicts(self, name, agents, goods):
+        """
+        :param name: the name of an algorithm
+        :param agents: the agents of a problem of the atlas' size
+        :param goods: the goods
+        :return: a dict allocation -> {property: value} for the allocations returned by the algorithm
+        """
+        masks, verdicts = self._block(name, problem_index(agents))
+        order = agents[0].preferences
+        return {
+            Allocation.from_mask(agents, order, mask): {
+                key: bool(bits >> k & 1) for k, key in enumerate(self.properties)
+            } for mask, bits in zip(masks, verdicts)
+        }
+
+    def wrap(self, name, func):
+        """
+        :param name: the name of an algorithm of the atlas
+        :param func: the algorithm, used for the problems the atlas doesn't cover
+        :return: a function (agents, goods) reading the results in the atlas when possible
+        """
+        def wrapped(agents, goods):
+            if self.covers(agents, goods):
+                return self.allocations(name, agents, goods)
+            return func(agents, goods)
+        return wrapped
+
+
+if __name__ == "__main__":
+    import sys
+    parser = argparse.ArgumentParser(description="Builds the atlases of small problems. The atlases are only read "
+                                                 "through atlas.Atlas (e.g. Atlas.wrap), not by the cached "
+                                                 "algorithms.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2, 4, 6, 8],
+                        help="numbers of goods, at most {}. The build is computed in memory in pure Python, so it is "
+                             "practical up to 8.".format(MAX_SIZE))
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        total = math.factorial(size)
+
+        def progress(done):
+            if done % 1000 == 0:
+                print("{} goods: {}/{} problems".format(size, done, total), file=sys.stderr)
+        print("Atlas written to {}".format(build(size, progress=progress)))
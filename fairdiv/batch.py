@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized versions of the deterministic algorithms & of some properties.
+Instead of one (agents, goods) problem per call, these functions work on a whole array of preference
+profiles at once. A profile array has the shape (problems, 2, n) : profiles[p, m, r] is the index of the
+good ranked r+1 by agent m in problem p, ie. the agent's preferences expressed as good indices.
+Allocations are returned as bitmasks : bit i is set if good i is allocated to the first agent.
+Properties are checked for a batch of balanced allocations of one problem given as such bitmasks, each bundle
+being represented by the sorted ranks of its goods for an agent.
+"""
+import numpy as np
+from fairdiv import Allocation
+from propertyRegistry import DEFAULT_REGISTRY
+import properties
+
+
+def profiles_from_problems(problems):
+    """
+    Builds a profile array from problems
+    :param problems: an iterable of problems (agents, goods)
+    :return: an int array of shape (problems, 2, n)
+    """
+    profiles = [
+        [[goods.index(good) for good in agent.preferences] for agent in agents]
+        for agents, goods in problems
+    ]
+    return np.array(profiles, dtype=np.int8)
+
+
+def _permutations(n):
+    """
+    :param n: number of elements
+    :return: an int8 array holding all the permutations of range(n), in lexicographic order
+    """
+    perms = np.zeros((1, 0), dtype=np.int8)
+    for size in range(1, n + 1):
+        # Each permutation of size `size` is a first element followed by a permutation of the others
+        blocks = []
+        for first in range(size):
+            others = np.array([i for i in range(size) if i != first], dtype=np.int8)
+            block = np.empty((len(perms), size), dtype=np.int8)
+            block[:, 0] = first
+            block[:, 1:] = others[perms]
+            blocks.append(block)
+        perms = np.concatenate(blocks)
+    return perms
+
+
+def possible_profiles(n, chunk_size=None):
+    """
+    Builds the profiles of all the problems of a given size, in the same order as
+    :func:`problemGenerators.generate_possible_problems` : agent A ranks goods by index, agent B
+    takes every permutation.
+    :param n: the number of goods
+    :param chunk_size: if set, the profiles are yielded by chunks of at most this number of problems
+    :return: an int array of shape (n!, 2, n), or a generator of such arrays if chunk_size is set
+    """
+    perms = _permutations(n)
+
+    def chunk(start, stop):
+        profiles = np.empty((stop - start, 2, n), dtype=np.int8)
+        profiles[:, 0, :] = np.arange(n, dtype=np.int8)
+        profiles[:, 1, :] = perms[start:stop]
+        return profiles
+
+    if chunk_size is None:
+        return chunk(0, len(perms))
+    return (chunk(start, min(start + chunk_size, len(perms))) for start in range(0, len(perms), chunk_size))
+
+
+def ranks_from_profiles(profiles):
+    """
+    :param profiles: a profile array of shape (problems, 2, n)
+    :return: an int8 array of the same shape where ranks[p, m, g] is the rank of good g for agent m
+    """
+    return (np.argsort(profiles, axis=2) + 1).astype(np.int8)
+
+
+def _bits(goods):
+    """
+    :param goods: an array of good indices
+    :return: the bitmasks having only these goods' bits set
+    """
+    return np.left_shift(np.uint64(1), goods.astype(np.uint64))
+
+
+def batch_bottom_up(profiles):
+    """
+    Vectorized :func:`algorithm.bottom_up`.
+    :param profiles: a profile array of shape (problems, 2, n)
+    :return: a tuple (masks, valid). masks is an uint64 array of shape (problems, 2), column m
+             holding the allocation obtained when agent m starts. valid is a bool array of the same
+             shape, always True for this algorithm.
+    """
+    ranks = ranks_from_profiles(profiles)
+    problems, _, n = ranks.shape
+    rows = np.arange(problems)
+    masks = np.zeros((problems, 2), dtype=np.uint64)
+    for first in (0, 1):
+        remaining = np.ones((problems, n), dtype=bool)
+        m = first
+        for _ in range(n):
+            # Agent m gives its least preferred remaining good to the other agent
+            g = np.where(remaining, ranks[:, m, :], 0).argmax(axis=1)
+            remaining[rows, g] = False
+            if m == 1:
+                masks[:, first] |= _bits(g)
+            m = (m + 1) % 2
+    return masks, np.ones((problems, 2), dtype=bool)
+
+
+def batch_trump_algorithm(profiles):
+    """
+    Vectorized :func:`algorithm.trump_algorithm`.
+    :param profiles: a profile array of shape (problems, 2, n)
+    :return: a tuple (masks, valid). masks is an uint64 array of shape (problems, 2), column m
+             holding the allocation obtained when agent m picks first. valid is a bool array of the
+             same shape telling which of these allocations exist.
+    """
+    ranks = ranks_from_profiles(profiles)
+    problems, _, n = ranks.shape
+    rows = np.arange(problems)
+    masks = np.zeros((problems, 2), dtype=np.uint64)
+    valid = np.ones((problems, 2), dtype=bool)
+    for first in (0, 1):
+        order = (first, (first + 1) % 2)
+        remaining = np.ones((problems, n), dtype=bool)
+        for l in range(1, n, 2):
+            for i, m in enumerate(order):
+                other = order[(i + 1) % 2]
+                # Goods ranked l or better by m, the other agent gives its least preferred one to m
+                candidates = remaining & (ranks[:, m, :] <= l)
+                valid[:, first] &= candidates.any(axis=1)
+                g = np.where(candidates, ranks[:, other, :], 0).argmax(axis=1)
+                remaining[rows, g] = False
+                if m == 0:
+                    masks[:, first] |= _bits(g)
+    masks[~valid] = 0
+    return masks, valid
+
+
+def batch_max_min_rank(profiles):
+    """
+    Vectorized :func:`fairdiv.max_min_rank`.
+    :param profiles: a profile array of shape (problems, 2, n)
+    :return: an int array of shape (problems, ) holding the max-min rank of each problem
+    """
+    return ranks_from_profiles(profiles).min(axis=1).max(axis=1)
+
+
+BATCH_ALGORITHMS = {
+    "bottom_up": batch_bottom_up,
+    "trump_algorithm": batch_trump_algorithm,
+}
+
+
+def run_batch(profiles, algorithms=None):
+    """
+    Runs several vectorized algorithms on the same profiles
+    :param profiles: a profile array of shape (problems, 2, n)
+    :param algorithms: names of the algorithms to run (see :data:`BATCH_ALGORITHMS`). All of them if None.
+    :return: a dict name -> (masks, valid)
+    """
+    if algorithms is None:
+        algorithms = BATCH_ALGORITHMS.keys()
+    return {name: BATCH_ALGORITHMS[name](profiles) for name in algorithms}
+
+
+def masks_to_allocations(masks, valid, agents, goods):
+    """
+    Converts the bitmasks of one problem back to Allocation objects
+    :param masks: the bitmasks of the problem, ie. a row of an algorithm's masks array
+    :param valid: the matching row of the valid array
+    :param agents: the agents of the problem
+    :param goods: the goods of the problem
+    :return: A set of Allocation objects, like the original algorithms return
+    """
+    return set(Allocation.from_mask(agents, goods, mask) for mask, ok in zip(masks, valid) if ok)
+
+
+def ranks_from_agents(agents, goods):
+    """
+    :param agents: the agents of a problem
+    :param goods: the goods, in the order of the masks' bits
+    :return: an int array of shape (2, n) where ranks[m, g] is the rank of good g for agent m
+    """
+    return np.array([[agent.rank(good) for good in goods] for agent in agents], dtype=np.int16)
+
+
+def masks_to_members(masks, n):
+    """
+    :param masks: bitmasks of allocations
+    :param n: the number of goods
+    :return: a bool array of shape (len(masks), n), True where the good belongs to the first agent
+    """
+    masks = np.array(masks, dtype=np.uint64).reshape(-1, 1)
+    return (np.right_shift(masks, np.arange(n, dtype=np.uint64)) & np.uint64(1)).astype(bool)
+
+
+def sorted_bundle_ranks(ranks, members):
+    """
+    :param ranks: the ranks of the goods for an agent, an int array of shape (n, )
+    :param members: a bool array of shape (allocations, n) telling which goods the bundles hold, each bundle
+                    holding n // 2 goods
+    :return: an int array of shape (allocations, n // 2), the sorted ranks of each bundle's goods
+    """
+    n = len(ranks)
+    return np.sort(np.where(members, ranks, n + 1), axis=1)[:, :n // 2]
+
+
+def batch_is_envy_free(ranks, masks):
+    """
+    Vectorized :func:`properties.is_envy_free`, for balanced allocations
+    :param ranks: the ranks of the problem, see :func:`ranks_from_agents`
+    :param masks: bitmasks of allocations
+    :return: a bool array, True for the envy free allocations
+    """
+    members = masks_to_members(masks, ranks.shape[1])
+    result = np.ones(len(members), dtype=bool)
+    for bundle, owner, other in ((members, 0, 1), (~members, 1, 0)):
+        own = sorted_bundle_ranks(ranks[owner], bundle)
+        others = sorted_bundle_ranks(ranks[other], bundle)
+        result &= ~(own > others).any(axis=1)
+    return result
+
+
+def _rank_dominance(x, y):
+    """
+    :param x: sorted ranks of bundles, an int array of shape (candidates, k)
+    :param y: sorted ranks of bundles, an int array of shape (allocations, k)
+    :return: an int array of shape (candidates, allocations) : 1 where the candidate's bundle is better at some
+             position & worse at none, -1 in the opposite case, 0 otherwise
+    """
+    x = x[:, np.newaxis, :]
+    y = y[np.newaxis, :, :]
+    higher = (x < y).any(axis=2)
+    lower = (x > y).any(axis=2)
+    return (higher & ~lower).astype(np.int8) - (lower & ~higher).astype(np.int8)
+
+
+def batch_is_pareto(ranks, masks, possible_masks, chunk_size=256):
+    """
+    Vectorized :func:`properties.is_pareto`, for balanced allocations
+    :param ranks: the ranks of the problem, see :func:`ranks_from_agents`
+    :param masks: bitmasks of the checked allocations
+    :param possible_masks: bitmasks of all the possible allocations
+    :param chunk_size: the number of allocations checked at once, which bounds the memory used
+    :return: a bool array, True for the pareto allocations
+    """
+    n = ranks.shape[1]
+    possible = masks_to_members(possible_masks, n)
+    ya = sorted_bundle_ranks(ranks[0], possible)
+    yb = sorted_bundle_ranks(ranks[1], ~possible)
+    members = masks_to_members(masks, n)
+    result = np.ones(len(members), dtype=bool)
+    for start in range(0, len(members), chunk_size):
+        chunk = members[start:start + chunk_size]
+        xa = sorted_bundle_ranks(ranks[0], chunk)
+        xb = sorted_bundle_ranks(ranks[1], ~chunk)
+        balance = _rank_dominance(xa, ya) + _rank_dominance(xb, yb)
+        result[start:start + chunk_size] = ~(balance < 0).any(axis=1)
+    return result
+
+
+BATCH_PROPERTIES = {
+    "is_envy_free": lambda ranks, masks, possible_masks: batch_is_envy_free(ranks, masks),
+    "is_pareto": batch_is_pareto,
+}
+
+# function -> name of the property in :data:`BATCH_PROPERTIES`, for the functions given to
+# :class:`statistics.Statistics` that have a vectorized version
+BATCH_FUNCTIONS = {
+    properties.is_pareto: "is_pareto",
+    properties.is_pareto.__wrapped__: "is_pareto",
+    DEFAULT_REGISTRY.function("is_pareto"): "is_pareto",
+    DEFAULT_REGISTRY.function("is_envy_free"): "is_envy_free",
+}
+
+
+def batch_keys(functions):
+    """
+    :param functions: a dict key -> function, see :class:`statistics.Statistics`
+    :return: a dict key -> name in :data:`BATCH_PROPERTIES`, for the functions that have a vectorized version
+    """
+    return {k: BATCH_FUNCTIONS[func] for k, func in functions.items() if func in BATCH_FUNCTIONS}
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Performance regression gate : compares benchmark results (see :mod:`benchmarkSuite`) against a baseline & fails
+on significant slowdowns or memory growth.
+
+Usage (from the repository root)::
+
+    PYTHONPATH=.:fairdiv python fairdiv/benchmarkCompare.py --run
+    PYTHONPATH=.:fairdiv python fairdiv/benchmarkCompare.py --current bench.json
+
+Timings depend on the machine, the baseline should be produced on the machine running the comparison
+(use --update-baseline on the reference version).
+"""
+import argparse
+import itertools
+import math
+import sys
+
+import benchmarkSuite
+
+DEFAULT_BASELINE = "resources/benchmarks/baseline.json"
+# A slowdown is reported if the median time grows by more than this ratio...
+TIME_THRESHOLD = 0.5
+# ... by more than this number of seconds, timings below it being mostly noise...
+TIME_NOISE = 1e-3
+# ... & if the times of the two runs differ significantly at this level
+SIGNIFICANCE = 0.05
+# Memory growth is reported if the peak memory grows by more than this ratio & this number of bytes
+MEMORY_THRESHOLD = 0.25
+MEMORY_NOISE = 4096
+# Above this number of sample arrangements, the Mann-Whitney test uses the normal approximation
+EXACT_LIMIT = 20000
+
+
+def _median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2 == 1:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2
+
+
+def _u_statistic(slower, faster):
+    """
+    :return: the Mann-Whitney U statistic of :param:`slower` against :param:`faster`, ties counting for a half
+    """
+    u = 0.0
+    for x in slower:
+        for y in faster:
+            if x > y:
+                u += 1
+            elif x == y:
+                u += 0.5
+    return u
+
+
+def slowdown_p_value(baseline, current):
+    """
+    One-sided Mann-Whitney U test
+    :param baseline: times of the baseline runs
+    :param current: times of the current runs
+    :return: the probability of observing current times at least this much greater than the baseline ones if
+             both came from the same distribution
+    """
+    n1, n2 = len(current), len(baseline)
+    if n1 == 0 or n2 == 0:
+        return 1.0
+    u = _u_statistic(current, baseline)
+    if math.comb(n1 + n2, n1) <= EXACT_LIMIT:
+        # Exact test : count the arrangements of the pooled samples giving a statistic at least as large
+        pooled = list(current) + list(baseline)
+        greater = total = 0
+        for indices in itertools.combinations(range(n1 + n2), n1):
+            chosen = set(indices)
+            total += 1
+            if _u_statistic([pooled[i] for i in indices],
+                            [pooled[i] for i in range(n1 + n2) if i not in chosen]) >= u:
+                greater += 1
+        return greater / total
+    mean = n1 * n2 / 2
+    deviation = math.sqrt(n1 * n2 * (n1 + n2 + 1) / 12)
+    z = (u - 0.5 - mean) / deviation
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def compare(baseline, current, time_threshold=TIME_THRESHOLD, time_noise=TIME_NOISE, significance=SIGNIFICANCE,
+            memory_threshold=MEMORY_THRESHOLD, memory_noise=MEMORY_NOISE):
+    """
+    Compares two benchmark results
+    Current times are first scaled by the ratio of the calibrations of both runs (see
+    :func:`benchmarkSuite.calibrate`), so that a uniformly slower machine doesn't look like a regression. When both
+    results hold the calibration measured before each sample, each time is scaled by its own one instead, which also
+    follows the changes of the load of the machine during a run.
+    :param baseline: the reference results
+    :param current: the results to check
+    :return: a list of dicts, one per (target, family, n) present in both results, with the keys "target",
+             "family", "n", "time_ratio", "p_value", "memory_ratio", "slowdown" & "memory_growth"
+    """
+    scale = baseline.get("calibration", 1.0) / current.get("calibration", 1.0)
+    reference = {(r["target"], r["family"], r["n"]): r for r in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        key = (result["target"], result["family"], result["n"])
+        if key not in reference:
+            continue
+        old = reference[key]
+        if "calibrations" in old and "calibrations" in result:
+            unit = baseline.get("calibration", 1.0)
+            old_times = [t * unit / c for t, c in zip(old["times"], old["calibrations"])]
+            times = [t * unit / c for t, c in zip(result["times"], result["calibrations"])]
+        else:
+            old_times = old["times"]
+            times = [t * scale for t in result["times"]]
+        old_time, new_time = _median(old_times), _median(times)
+        p_value = slowdown_p_value(old_times, times)
+        time_ratio = new_time / old_time if old_time > 0 else float("inf")
+        memory_ratio = result["peak_memory"] / old["peak_memory"] if old["peak_memory"] > 0 else float("inf")
+        rows.append({
+            "target": key[0],
+            "family": key[1],
+            "n": key[2],
+            "time_ratio": time_ratio,
+            "p_value": p_value,
+            "memory_ratio": memory_ratio,
+            "slowdown": time_ratio > 1 + time_threshold and new_time - old_time > time_noise
+                        and p_value < significance,
+            "memory_growth": memory_ratio > 1 + memory_threshold
+                             and result["peak_memory"] - old["peak_memory"] > memory_noise,
+        })
+    return rows
+
+
+def summary(rows, missing=()):
+    """
+    :param rows: the result of :func:`compare`
+    :param missing: the (target, family, n) of the baseline absent from the current results
+    :return: a tuple (passed, text)
+    """
+    failures = [row for row in rows if row["slowdown"] or row["memory_growth"]]
+    text = ""
+    for row in failures:
+        problems = []
+        if row["slowdown"]:
+            problems.append("time x{:.2f} (p={:.3f})".format(row["time_ratio"], row["p_value"]))
+        if row["memory_growth"]:
+            problems.append("peak memory x{:.2f}".format(row["memory_ratio"]))
+        text += "FAIL {} {} n={}: {}\n".format(row["target"], row["family"], row["n"], ", ".join(problems))
+    for target, family, n in missing:
+        text += "MISSING {} {} n={}\n".format(target, family, n)
+    passed = len(failures) == 0
+    text += "{}: {} cells compared, {} regressions\n".format("PASS" if passed else "FAIL", len(rows), len(failures))
+    return passed, text
+
+
+def missing_cells(baseline, current):
+    """
+    :return: the (target, family, n) of the baseline absent from the current results
+    """
+    present = set((r["target"], r["family"], r["n"]) for r in current["results"])
+    return sorted(set((r["target"], r["family"], r["n"]) for r in baseline["results"]) - present)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares benchmark results against a baseline")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--current", help="results to check, written by benchmarkSuite")
+    parser.add_argument("--run", action="store_true", help="run the suite on the baseline's grid & check it")
+    parser.add_argument("--update-baseline", action="store_true", help="run the suite & store it as the baseline")
+    parser.add_argument("--time-threshold", type=float, default=TIME_THRESHOLD)
+    parser.add_argument("--memory-threshold", type=float, default=MEMORY_THRESHOLD)
+    parser.add_argument("--significance", type=float, default=SIGNIFICANCE)
+    args = parser.parse_args()
+
+    if args.update_baseline:
+        benchmarkSuite.save(benchmarkSuite.run_suite(), args.baseline)
+        print("Baseline written to {}".format(args.baseline))
+        sys.exit(0)
+
+    baseline = benchmarkSuite.load(args.baseline)
+    if args.run:
+        sizes = sorted(set(r["n"] for r in baseline["results"]))
+        families = sorted(set(r["family"] for r in baseline["results"]))
+        targets = sorted(set(r["target"] for r in baseline["results"]))
+        current = benchmarkSuite.run_suite(sizes, families, targets, baseline["repeats"], baseline["seed"])
+    elif args.current is not None:
+        current = benchmarkSuite.load(args.current)
+    else:
+        parser.error("either --current or --run is required")
+
+    passed, text = summary(compare(baseline, current, args.time_threshold, TIME_NOISE, args.significance,
+                                   args.memory_threshold), missing_cells(baseline, current))
+    print(text, end="")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""
+Scaling benchmarks of the algorithms, the properties, the allocations generation & the cache layer.
+Each target is measured over a grid of problem sizes & preference families. Results are written as JSON so that
+they can be compared across versions (see :mod:`benchmarkCompare`).
+
+Usage (from the repository root)::
+
+    PYTHONPATH=.:fairdiv python fairdiv/benchmarkSuite.py --sizes 2 4 6 8 --repeats 5 --output bench.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from fairdiv import Agent, Good, Allocation, max_min_rank
+from cacheUtils import Database, cache, mem_cache
+import algorithm
+import properties
+
+FORMAT_VERSION = 2
+DEFAULT_OUTPUT = "resources/benchmarks/latest.json"
+FAMILIES = ("identical", "reversed", "random")
+DEFAULT_SIZES = (2, 4, 6, 8)
+# Number of allocations each property is checked on
+PROPERTY_SAMPLE = 4
+# Each timed sample averages as many calls as needed to last at least this number of seconds
+MIN_SAMPLE_TIME = 0.02
+
+
+def make_problem(family, n, seed=0):
+    """
+    Builds a problem of a preference family
+    :param family: "identical" (both agents share preferences), "reversed" (B's preferences are the reverse
+                   of A's) or "random" (B's preferences are a random permutation, seeded by n & seed)
+    :param n: the number of goods
+    :param seed: the seed of the random family
+    :return: a problem (agents, goods)
+    """
+    goods = [Good(str(i)) for i in range(n)]
+    if family == "identical":
+        b_pref = goods[:]
+    elif family == "reversed":
+        b_pref = goods[::-1]
+    elif family == "random":
+        b_pref = goods[:]
+        random.Random("{}-{}".format(seed, n)).shuffle(b_pref)
+    else:
+        raise ValueError("Unknown preference family: {}".format(family))
+    return (Agent("A", goods[:]), Agent("B", b_pref)), goods
+
+
+def _uncached(func):
+    """
+    :param func: a function, possibly wrapped by a cache decorator
+    :return: the original function
+    """
+    return getattr(func, "__wrapped__", func)
+
+
+def _sample(agents, goods):
+    """
+    :return: PROPERTY_SAMPLE allocations of the problem, spread over all the possible ones
+    """
+    A = sorted(Allocation.generate_all_allocations(agents, goods), key=lambda X: X.to_mask(goods))
+    step = max(1, len(A) // PROPERTY_SAMPLE)
+    return A, A[::step][:PROPERTY_SAMPLE]
+
+
+def _algorithm_target(func):
+    func = _uncached(func)
+
+    def prepare(agents, goods):
+        return lambda: func(agents, goods)
+    return prepare
+
+
+def _property_target(func, uses_allocations):
+    func = _uncached(func)
+
+    def prepare(agents, goods):
+        A, sample = _sample(agents, goods)
+        if uses_allocations:
+            return lambda: [func(X, A, agents) for X in sample]
+        return lambda: [func(X, agents) for X in sample]
+    return prepare
+
+
+def _generate_target(agents, goods):
+    return lambda: _uncached(Allocation.generate_all_allocations)(agents, goods)
+
+
+def _file_cache_target(agents, goods):
+    func = cache(_square)
+
+    def run():
+        # Misses then hits of the file cache, including saving & loading the file
+        for i in range(len(goods) * 10):
+            func(i)
+        Database.save_files()
+        for i in range(len(goods) * 10):
+            func(i)
+    return run
+
+
+def _mem_cache_target(agents, goods):
+    func = mem_cache(cache_size=len(goods) * 5)(_square)
+
+    def run():
+        for i in range(len(goods) * 10):
+            func(i)
+            func(i // 2)
+    return run
+
+
+def _square(x):
+    return x * x
+
+
+TARGETS = {
+    "algorithm.original_sequential": _algorithm_target(algorithm.original_sequential),
+    "algorithm.restricted_sequential": _algorithm_target(algorithm.restricted_sequential),
+    "algorithm.singles_doubles": _algorithm_target(algorithm.singles_doubles),
+    "algorithm.bottom_up": _algorithm_target(algorithm.bottom_up),
+    "algorithm.trump_algorithm": _algorithm_target(algorithm.trump_algorithm),
+    "algorithm.max_min_rank": _algorithm_target(max_min_rank),
+    "properties.is_pareto": _property_target(properties.is_pareto, True),
+    "properties.is_envy_free": _property_target(properties.is_envy_free, False),
+    "properties.is_pareto_ordinally": _property_target(properties.is_pareto_ordinally, True),
+    "properties.is_envy_free_ordinally": _property_target(properties.is_envy_free_ordinally, False),
+    "properties.is_max_min": _property_target(properties.is_max_min, True),
+    "properties.is_borda_pareto": _property_target(properties.is_borda_pareto, True),
+    "properties.is_maximal_borda_sum": _property_target(properties.is_maximal_borda_sum, True),
+    "properties.is_borda_envy_free": _property_target(properties.is_borda_envy_free, False),
+    "properties.is_borda_max_min": _property_target(properties.is_borda_max_min, True),
+    "properties.is_borda_nash": _property_target(properties.is_borda_nash, True),
+    "properties.is_borda_egalitarian": _property_target(properties.is_borda_egalitarian, False),
+    "Allocation.generate_all_allocations": _generate_target,
+    "cache.file": _file_cache_target,
+    "cache.mem": _mem_cache_target,
+}
+
+
+class _ColdCaches(object):
+    """
+    Context manager redirecting the caches to empty ones, the file cache being redirected to a temporary
+    directory. The caches are restored afterwards, so measures neither benefit from nor pollute them.
+    """
+
+    def __enter__(self):
+        self._saved = (Database._db_files_root, Database._open_files, Database._saved, Database._segments,
+                       Database._mem_cache, Database._mem_cache_sizes, Database._mem_cache_accesses)
+        self._directory = tempfile.TemporaryDirectory()
+        Database._db_files_root = self._directory.name + os.sep
+        self.clear()
+        return self
+
+    def clear(self):
+        """
+        Empties the caches
+        """
+        Database._open_files = dict()
+        Database._saved = dict()
+        Database._segments = dict()
+        Database._mem_cache = dict()
+        Database._mem_cache_sizes = dict()
+        Database._mem_cache_accesses = dict()
+        for name in os.listdir(self._directory.name):
+            os.remove(os.path.join(self._directory.name, name))
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        (Database._db_files_root, Database._open_files, Database._saved, Database._segments,
+         Database._mem_cache, Database._mem_cache_sizes, Database._mem_cache_accesses) = self._saved
+        self._directory.cleanup()
+        return False
+
+
+def measure(target, agents, goods, repeats=5, min_sample_time=MIN_SAMPLE_TIME, memory=True):
+    """
+    Measures a target on a problem, each call starting with cold caches
+    :param target: a function (agents, goods) preparing the measured call, which it returns as a function
+                   without arguments
+    :param agents: the agents
+    :param goods: the goods
+    :param repeats: the number of timed samples
+    :param min_sample_time: the minimal duration of a sample, short calls are repeated & averaged
+    :param memory: False to only measure the times
+    :return: a dict with the wall time of a call for each sample ("times", in seconds), the time of the calibration
+             workload run just before each sample ("calibrations", see :func:`calibrate`), the peak traced memory
+             ("peak_memory", in bytes) & the number of memory blocks allocated by a call & still alive at its end
+             ("allocations")
+    """
+    times = []
+    calibrations = []
+    with _ColdCaches() as caches:
+        for _ in range(repeats):
+            calibrations.append(_workload())
+            elapsed = 0.0
+            calls = 0
+            while elapsed < min_sample_time or calls == 0:
+                caches.clear()
+                call = target(agents, goods)
+                # Like timeit, the garbage collector is disabled so that its runs don't depend on what was
+                # allocated before the measure
+                gc_was_enabled = gc.isenabled()
+                gc.disable()
+                try:
+                    start = time.perf_counter()
+                    call()
+                    elapsed += time.perf_counter() - start
+                finally:
+                    if gc_was_enabled:
+                        gc.enable()
+                calls += 1
+            times.append(elapsed / calls)
+    if not memory:
+        return {"times": times, "calibrations": calibrations}
+
+    # Memory is measured on a separate run, tracing slows the code down
+    with _ColdCaches():
+        call = target(agents, goods)
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        base = tracemalloc.get_traced_memory()[0]
+        call()
+        peak = tracemalloc.get_traced_memory()[1] - base
+        after = tracemalloc.take_snapshot()
+        if not was_tracing:
+            tracemalloc.stop()
+    allocations = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+    return {"times": times, "calibrations": calibrations, "peak_memory": peak, "allocations": allocations}
+
+
+def _workload():
+    """
+    :return: the time of a fixed pure Python workload, in seconds
+    """
+    start = time.perf_counter()
+    total = 0
+    for i in range(200000):
+        total += i * i
+    return time.perf_counter() - start
+
+
+def calibrate(repeats=5):
+    """
+    Times a fixed pure Python workload, to compare results of runs on machines (or under loads) of different speeds
+    :param repeats: the number of measures
+    :return: the median time of the workload, in seconds
+    """
+    times = [_workload() for _ in range(repeats)]
+    return sorted(times)[len(times) // 2]
+
+
+def run_suite(sizes=DEFAULT_SIZES, families=FAMILIES, targets=None, repeats=5, seed=0, progress=None):
+    """
+    Runs the benchmarks
+    :param sizes: the problem sizes
+    :param families: the preference families, see :func:`make_problem`
+    :param targets: names of the targets to run (see :data:`TARGETS`), or prefixes of names. All if None
+    :param repeats: the number of timed runs of each (target, family, size). They are taken in successive rounds
+                    over all the measures, so that a slower period of the machine only affects some of them.
+    :param seed: the seed of the random family
+    :param progress: an optional function called with a message before each measure
+    :return: a dict ready to be dumped as JSON
+    """
+    names = [name for name in TARGETS if targets is None or any(name.startswith(t) for t in targets)]
+    results = [{"target": name, "family": family, "n": n, "times": []}
+               for name in names for family in families for n in sizes]
+    calibration = calibrate()
+    for i in range(repeats):
+        for result in results:
+            if progress is not None:
+                progress("{} {} n={} ({}/{})".format(result["target"], result["family"], result["n"], i + 1, repeats))
+            agents, goods = make_problem(result["family"], result["n"], seed)
+            measured = measure(TARGETS[result["target"]], agents, goods, 1, memory=i == 0)
+            result["times"] += measured.pop("times")
+            result.setdefault("calibrations", []).extend(measured.pop("calibrations"))
+            result.update(measured)
+    return {
+        "version": FORMAT_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "repeats": repeats,
+        "seed": seed,
+        # Measured before & after the targets
+        "calibration": (calibration + calibrate()) / 2,
+        "results": results,
+    }
+
+
+def save(data, path=DEFAULT_OUTPUT):
+    """
+    Writes benchmark results as JSON
+    :param data: the result of :func:`run_suite`
+    :param path: the path of the file
+    """
+    directory = os.path.dirname(path)
+    if directory != "" and not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+
+
+def load(path):
+    """
+    :param path: the path of a file written by :func:`save`
+    :return: the benchmark results
+    """
+    with open(path) as f:
+        data = json.load(f)
+    if data.get("version") != FORMAT_VERSION:
+        raise ValueError("Unsupported benchmark format in {}".format(path))
+    return data
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs the scaling benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--families", nargs="+", default=list(FAMILIES), choices=FAMILIES)
+    parser.add_argument("--targets", nargs="+", default=None, help="target names or prefixes, e.g. properties")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    save(run_suite(args.sizes, args.families, args.targets, args.repeats, args.seed,
+                   lambda message: print(message, file=sys.stderr)), args.output)
+    print("Results written to {}".format(args.output))
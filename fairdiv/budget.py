@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+
+class BudgetExceeded(Exception):
+    """
+    Raised by :meth:`Budget.tick` when the current budget is exhausted
+    """
+
+    def __init__(self, reason, nodes, seconds):
+        """
+        :param reason: "time" or "nodes"
+        :param nodes: the number of nodes visited under the budget
+        :param seconds: the time spent under the budget
+        """
+        super().__init__("{} budget exceeded after {} nodes & {:.3f}s".format(reason, nodes, seconds))
+        self.reason = reason
+        self.nodes = nodes
+        self.seconds = seconds
+
+
+class _Limit(object):
+    """
+    Context manager setting a budget of :class:`Budget` for its block, in the current thread
+    """
+
+    def __init__(self, seconds, nodes):
+        self.seconds = seconds
+        self.max_nodes = nodes
+        self._saved = None
+
+    def __enter__(self):
+        state = Budget._state
+        self._saved = (state.active, state.deadline, state.nodes_left, state.nodes, state.start)
+        now = time.perf_counter()
+        deadline = None if self.seconds is None else now + self.seconds
+        nodes_left = self.max_nodes
+        # A nested budget can't extend the enclosing one
+        if state.active:
+            if state.deadline is not None and (deadline is None or state.deadline < deadline):
+                deadline = state.deadline
+            if state.nodes_left is not None and (nodes_left is None or state.nodes_left < nodes_left):
+                nodes_left = state.nodes_left
+        Budget._set_active(deadline is not None or nodes_left is not None)
+        state.deadline = deadline
+        state.nodes_left = nodes_left
+        state.nodes = 0
+        state.start = now
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        state = Budget._state
+        nodes = state.nodes
+        active, state.deadline, state.nodes_left, state.nodes, state.start = self._saved
+        Budget._set_active(active)
+        # The nodes visited in this block also count for the enclosing budget
+        state.nodes += nodes
+        if state.nodes_left is not None:
+            state.nodes_left = max(0, state.nodes_left - nodes)
+        return False
+
+
+class _State(threading.local):
+    """
+    The budget of a thread
+    """
+    active = False
+    # perf_counter() value after which ticks fail, None if there is no time limit
+    deadline = None
+    # Number of ticks left, None if there is no node limit
+    nodes_left = None
+    # Number of ticks since the budget was set
+    nodes = 0
+    start = 0.0
+
+
+class _BudgetType(type):
+    """
+    Exposes the budget of the current thread as attributes of :class:`Budget`
+    """
+    deadline = property(lambda cls: cls._state.deadline)
+    nodes_left = property(lambda cls: cls._state.nodes_left)
+    nodes = property(lambda cls: cls._state.nodes)
+    start = property(lambda cls: cls._state.start)
+
+
+class Budget(object, metaclass=_BudgetType):
+    """
+    Time & search-node budgets for long computations.
+    Branching code is expected to call :meth:`tick` at each node it visits, after checking :attr:`active` so
+    that the cost without budget is a single attribute lookup. When the budget is exhausted, :meth:`tick` raises
+    :class:`BudgetExceeded`, which cancels the computation : since it propagates through the cache decorators,
+    nothing partial is cached.
+    Budgets are set per thread : the deadline, nodes_left, nodes & start attributes are the ones of the current
+    thread, & ticks only count for the budget of their thread.
+    """
+    # Number of threads with a budget, so that ticks are skipped with a single lookup when there is none
+    active = 0
+    _state = _State()
+    _active_lock = threading.Lock()
+
+    @staticmethod
+    def _set_active(active):
+        """
+        Sets whether the current thread has a budget
+        """
+        state = Budget._state
+        if active != state.active:
+            with Budget._active_lock:
+                Budget.active += 1 if active else -1
+            state.active = active
+
+    @staticmethod
+    def limit(seconds=None, nodes=None):
+        """
+        :param seconds: the maximal duration of the block, None for no limit
+        :param nodes: the maximal number of ticks in the block, None for no limit
+        :return: a context manager applying the budget to its block, in the current thread
+        """
+        return _Limit(seconds, nodes)
+
+    @staticmethod
+    def tick(n=1):
+        """
+        Counts visited nodes & checks the budget of the current thread
+        :param n: the number of nodes
+        :raise BudgetExceeded: if the budget is exhausted
+        """
+        state = Budget._state
+        if not state.active:
+            # Another thread has a budget
+            return
+        state.nodes += n
+        if state.nodes_left is not None:
+            state.nodes_left -= n
+            if state.nodes_left < 0:
+                raise BudgetExceeded("nodes", state.nodes, time.perf_counter() - state.start)
+        if state.deadline is not None:
+            now = time.perf_counter()
+            if now > state.deadline:
+                raise BudgetExceeded("time", state.nodes, now - state.start)
@@ -1,6 +1,42 @@
 import pickle
 import atexit
-import collections
+import collections.abc
+import functools
+import itertools
+import threading
+from instrumentation import Instrumentation
+from serialization import PackedAllocations, compact, expand, is_allocation_set, load_segments, repack, upgrade_sets
+
+# Marks a missing result, since None can be one
+_MISSING = object()
+
+
+class _BypassState(threading.local):
+    """
+    Whether the current thread bypasses the file cache
+    """
+    active = False
+
+
+class _Bypass(object):
+    """
+    Context manager bypassing the file cache in the current thread for its block, see :meth:`Database.bypass`
+    """
+
+    def __enter__(self):
+        self._saved = Database._bypassed.active
+        if not self._saved:
+            with Database._lock:
+                Database._bypassing += 1
+        Database._bypassed.active = True
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        Database._bypassed.active = self._saved
+        if not self._saved:
+            with Database._lock:
+                Database._bypassing -= 1
+        return False
 
 
 class Database(object):
@@ -9,6 +45,9 @@ class Database(object):
     Instead of re-computing the result of a function, just store it in one of the caches & retrieve it later.
     The two provided caches are memory cache & file cache.
     Basically the later is persistent across executions while the former is not.
+    Files store lists of allocations packed as bitmasks (see :mod:`serialization`), they are unpacked when
+    first retrieved. The results computed by a run are appended to the files as a new pickle, & a file is only
+    rewritten as a single pickle once it holds :attr:`max_segments` of them.
     """
     _db_files_root = "resources/database/"
     _db_files_extension = ".db"
@@ -17,6 +56,165 @@ class Database(object):
     _mem_cache_sizes = dict()
     _mem_cache_accesses = dict()
     _is_at_exit_set = False
+    # Guards the creation of the per-function structures below & the loading of the files. It may be acquired
+    # while holding a function's lock, but not the other way around.
+    _lock = threading.Lock()
+    # Serializes the saves of the files
+    _save_lock = threading.Lock()
+    # qualname -> lock guarding the cache structures of the function
+    _function_locks = dict()
+    # (qualname, args key) -> lock held by the thread computing the result
+    _in_flight = dict()
+    # qualname -> number of results of the file cache already in the file. Results are only added to the dicts, which
+    # keep the insertion order, so the new ones are the last ones.
+    _saved = dict()
+    # qualname -> number of pickles in the file
+    _segments = dict()
+    # qualnames of the functions returning an AllocationSet, see :func:`set_cache`
+    _set_functions = set()
+    # Number of threads bypassing the file cache, so that the others only check it
+    _bypassing = 0
+    _bypassed = _BypassState()
+    max_segments = 16
+
+    @staticmethod
+    def _function_lock(name):
+        """
+        :param name: the qualname of a function
+        :return: the lock of the function's cache structures
+        """
+        lock = Database._function_locks.get(name)
+        if lock is None:
+            with Database._lock:
+                lock = Database._function_locks.setdefault(name, threading.Lock())
+        return lock
+
+    @staticmethod
+    def _get_or_compute(kind, func, args, func_dict):
+        """
+        Retrieves a result from a cache, or computes it. A hit is a lookup in the dict of the function, without
+        locking. On a miss, when several threads miss the same key, only one computes the result, the others wait
+        for it. Locks are not held while computing, so cached functions can call each other.
+        :param kind: "file_cache" or "mem_cache"
+        :param func: The function whose result is desired
+        :param args: The arguments to pass to the function
+        :param func_dict: the dict args key -> result of the function
+        :return: The result of applying the function to the given arguments
+        """
+        args_key = Database.get_args_key(args)
+        # Reading a dict doesn't need the lock, results are only added or removed as a whole
+        result = func_dict.get(args_key, _MISSING)
+        if result is not _MISSING and not isinstance(result, PackedAllocations):
+            if Instrumentation.enabled:
+                Instrumentation.count("{}.{}.hits".format(kind, func.__qualname__))
+            return result
+        return Database._miss(kind, func, args, args_key, func_dict)
+
+    @staticmethod
+    def _hit(kind, name, func_dict, args_key):
+        """
+        :return: a result found in a cache, unpacked if it is packed
+        """
+        if Instrumentation.enabled:
+            Instrumentation.count("{}.{}.hits".format(kind, name))
+        if isinstance(func_dict[args_key], PackedAllocations):
+            func_dict[args_key] = expand(func_dict[args_key])
+        return func_dict[args_key]
+
+    @staticmethod
+    def _compute(kind, func, args):
+        """
+        :return: the result of the function, iterables being stored as lists
+        """
+        if Instrumentation.enabled:
+            Instrumentation.count("{}.{}.misses".format(kind, func.__qualname__))
+        temp = func(*args)
+        if isinstance(temp, collections.abc.Iterable) and not is_allocation_set(temp):
+            temp = list(temp)
+        return temp
+
+    @staticmethod
+    def _store(kind, name, func_dict, args_key, temp):
+        """
+        Stores a result, with the function's lock held if there are several threads
+        """
+        func_dict[args_key] = temp
+        if kind == "mem_cache":
+            accesses = Database._mem_cache_accesses[name]
+            if len(func_dict) > Database._mem_cache_sizes[name]:
+                del(func_dict[accesses.pop(0)])
+            if args_key in accesses:
+                accesses.remove(args_key)
+            accesses.append(args_key)
+
+    @staticmethod
+    def _miss(kind, func, args, args_key, func_dict):
+        """
+        The slow path of :meth:`_get_or_compute` : unpacks a packed result, or computes a missing one once
+        """
+        name = func.__qualname__
+        if threading.active_count() == 1:
+            # No other thread can use the caches, nothing to lock
+            if args_key in func_dict:
+                return Database._hit(kind, name, func_dict, args_key)
+            temp = Database._compute(kind, func, args)
+            Database._store(kind, name, func_dict, args_key, temp)
+            return temp
+        lock = Database._function_lock(name)
+        while True:
+            with lock:
+                if args_key in func_dict:
+                    return Database._hit(kind, name, func_dict, args_key)
+                flight = Database._in_flight.get((name, args_key))
+                if flight is None:
+                    # Held while the result is computed
+                    flight = Database._in_flight[(name, args_key)] = threading.Lock()
+                    flight.acquire()
+                    break
+            # Another thread is computing the result, if it fails the result is computed again
+            flight.acquire()
+            flight.release()
+        try:
+            temp = Database._compute(kind, func, args)
+        except BaseException:
+            with lock:
+                del Database._in_flight[(name, args_key)]
+            flight.release()
+            raise
+        with lock:
+            Database._store(kind, name, func_dict, args_key, temp)
+            del Database._in_flight[(name, args_key)]
+        flight.release()
+        return temp
+
+    @staticmethod
+    def _file_dict(name):
+        """
+        :param name: the qualname of a function
+        :return: the dict of the function's file cache, loaded if necessary
+        """
+        func_dict = Database._open_files.get(name)
+        if func_dict is None:
+            with Database._lock:
+                # Check if the file is already loaded
+                if name not in Database._open_files:
+                    # If not, we try to load it.
+
+                    # We make sure that the file will be re-written into disk when the program finishes
+                    if not Database._is_at_exit_set:
+                        atexit.register(Database.save_files)
+                        Database._is_at_exit_set = True
+                    try:
+                        with open(Database.get_file_path(name), "rb") as f:
+                            Database._open_files[name], Database._segments[name] = load_segments(f)
+                    except FileNotFoundError:
+                        # If the file doesn't exist, we initialize an empty dictionary for it
+                        Database._open_files[name], Database._segments[name] = dict(), 0
+                    if name in Database._set_functions:
+                        upgrade_sets(Database._open_files[name])
+                    Database._saved[name] = len(Database._open_files[name])
+                func_dict = Database._open_files[name]
+        return func_dict
 
     @staticmethod
     def get_from_file(func, *args):
@@ -24,56 +222,66 @@ class Database(object):
         This method implements the file cache.
         Checks if a function's result for the given arguments is already present in the cache. If so, it's returned.
         If the result is not already in the cache, it's computed & added to it.
+        It can be called from several threads.
         :param func: The function whose result is desired
         :param args: The arguments to pass to the function.
         :return: The result of applying the function to the given arguments
         """
-        # Check if the file is already loaded
-        if func.__qualname__ not in Database._open_files:
-            # If not, we try to load it.
-
-            # We make sure that the file will be re-written into disk when the program finishes
-            if not Database._is_at_exit_set:
-                atexit.register(Database.save_files)
-                Database._is_at_exit_set = True
-            try:
-                with open(Database.get_file_path(func), "rb") as f:
-                    Database._open_files[func.__qualname__] = pickle.load(f)
-            except FileNotFoundError:
-                # If the file doesn't exist, we initialize an empty dictionary for it
-                Database._open_files[func.__qualname__] = dict()
-
-        func_dict = Database._open_files[func.__qualname__]
-
-        # We retrieve the key for the args in the function dictionary
-        args_key = Database.get_args_key(args)
-        if args_key not in func_dict:
-            # If the functions's result with the given params wasn't already computed
+        if Database._bypassing and Database._bypassed.active:
             temp = func(*args)
-            if isinstance(temp, collections.Iterable):
+            if isinstance(temp, collections.abc.Iterable) and not is_allocation_set(temp):
                 temp = list(temp)
-            func_dict[args_key] = temp
-        # Return the result
-        return func_dict[args_key]
+            return temp
+        func_dict = Database._open_files.get(func.__qualname__)
+        if func_dict is None:
+            func_dict = Database._file_dict(func.__qualname__)
+        return Database._get_or_compute("file_cache", func, args, func_dict)
+
+    @staticmethod
+    def bypass():
+        """
+        Used in a with statement, computes the functions wrapped with the file cache without looking up nor storing
+        their results in the current thread, so that memory doesn't grow with the number of calls. The memory
+        cache, whose size is bounded, is still used.
+        :return: a context manager
+        """
+        return _Bypass()
 
     @staticmethod
     def save_files():
         """
-        Saves the files that are loaded in memory (& so may have changed) into disk
-        """
-        for func in Database._open_files:
-            try:
-                f = open(Database.get_file_path(func), "rb+")
-                changed = pickle.load(f)
-                if changed is not None and isinstance(changed, dict):
-                    for key in changed:
-                        if key not in Database._open_files[func]:
-                            Database._open_files[func][key] = changed[key]
-            except FileNotFoundError:
-                f = open(Database.get_file_path(func), "wb")
-            pickle.dump(Database._open_files[func], f)
-            f.close()
-        Database._open_files.clear()
+        Saves the results computed since the files were loaded or saved into disk. Only these results are packed
+        & appended to the files, so saving doesn't depend on the size of the files.
+        """
+        with Database._save_lock:
+            for name in list(Database._open_files):
+                with Database._function_lock(name):
+                    values = Database._open_files.get(name)
+                    if values is None or len(values) == Database._saved[name]:
+                        continue
+                    new = dict(itertools.islice(values.items(), Database._saved[name], None))
+                    Database._saved[name] = len(values)
+                new = compact(new)
+                path = Database.get_file_path(name)
+                if Database._segments.get(name, 0) < Database.max_segments:
+                    with open(path, "ab") as f:
+                        pickle.dump(new, f, pickle.HIGHEST_PROTOCOL)
+                    Database._segments[name] = Database._segments.get(name, 0) + 1
+                    continue
+                # The file is rewritten as a single pickle, keeping what other processes appended meanwhile. Legacy
+                # values are packed then.
+                try:
+                    with open(path, "rb") as f:
+                        values = load_segments(f)[0]
+                    if name in Database._set_functions:
+                        upgrade_sets(values)
+                    values = repack(values)
+                except FileNotFoundError:
+                    values = dict()
+                values.update(new)
+                with open(path, "wb") as f:
+                    pickle.dump(values, f, pickle.HIGHEST_PROTOCOL)
+                Database._segments[name] = 1
 
     @staticmethod
     def get_mem(func, *args, cache_size=1000):
@@ -81,27 +289,22 @@ class Database(object):
         This method implements the memory cache
         Checks if a function's result for the given arguments is already present in the cache. If so, it's returned.
         If the result is not already in the cache, it's computed & added to it.
+        It can be called from several threads.
         :param func: The function whose result is desired
         :param args: The arguments to pass to the function
         :param cache_size: The size of the cache. ie, the maximum number of results to store.
         :return: The result of applying the function to the given arguments
         """
-        if func.__qualname__ not in Database._mem_cache:
-            Database._mem_cache[func.__qualname__] = dict()
-            Database._mem_cache_accesses[func.__qualname__] = []
-        Database._mem_cache_sizes[func.__qualname__] = cache_size
-        args_key = Database.get_args_key(args)
-        if args_key not in Database._mem_cache[func.__qualname__]:
-            temp = func(*args)
-            if isinstance(temp, collections.Iterable):
-                temp = list(temp)
-            Database._mem_cache[func.__qualname__][args_key] = temp
-            if len(Database._mem_cache[func.__qualname__]) > Database._mem_cache_sizes[func.__qualname__]:
-                del(Database._mem_cache[func.__qualname__][Database._mem_cache_accesses[func.__qualname__].pop(0)])
-            if args_key in Database._mem_cache_accesses[func.__qualname__]:
-                Database._mem_cache_accesses[func.__qualname__].remove(args_key)
-            Database._mem_cache_accesses[func.__qualname__].append(args_key)
-        return Database._mem_cache[func.__qualname__][args_key]
+        name = func.__qualname__
+        func_dict = Database._mem_cache.get(name)
+        if func_dict is None:
+            with Database._function_lock(name):
+                if name not in Database._mem_cache:
+                    Database._mem_cache_accesses[name] = []
+                    Database._mem_cache[name] = dict()
+                func_dict = Database._mem_cache[name]
+        Database._mem_cache_sizes[name] = cache_size
+        return Database._get_or_compute("mem_cache", func, args, func_dict)
 
     @staticmethod
     def get_file_path(func):
@@ -121,7 +324,7 @@ class Database(object):
         """
         # Since lists are not hashable,
         # We make sure to convert them to tuples, (& also their contents)
-        if isinstance(args, collections.Iterable):
+        if isinstance(args, collections.abc.Iterable):
             args = tuple([Database.get_args_key(arg) for arg in args])
         return args
 
@@ -133,11 +336,24 @@ def cache(func):
     :param func: The function to wrap
     :return: The given function wrapped with the file cache
     """
+    @functools.wraps(func)
     def inner(*args):
         return Database.get_from_file(func, *args)
     return inner
 
 
+def set_cache(func):
+    """
+    Wraps a function (agents, goods) returning an :class:`fairdiv.AllocationSet` with the file cache, like
+    :func:`cache`. Its results stored as lists of allocations by older versions are turned into sets when the file
+    is loaded.
+    :param func: The function to wrap
+    :return: The given function wrapped with the file cache
+    """
+    Database._set_functions.add(func.__qualname__)
+    return cache(func)
+
+
 class mem_cache(object):
     """
     This class is meant to be used as a decorator to make a function's result be stored in a cache in the memory.
@@ -156,6 +372,7 @@ class mem_cache(object):
         """
         decorator_self = self
 
+        @functools.wraps(original_func)
         def wrappee(*args):
             return Database.get_mem(original_func, *args, cache_size=decorator_self.cache_size)
         return wrappee
\ No newline at end of file
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+Search of a counterexample to "the allocations returned by an algorithm always satisfy a property".
+Problems are built one at a time from their index (see :func:`problemGenerators.generate_problem`), the algorithm is
+run & only the property is evaluated on its allocations. The search stops at the first allocation that doesn't
+satisfy it. When there is none, the result counts the problems & allocations checked, which proves the property
+for the sizes searched.
+
+Example::
+
+    result = search("bottom_up", "is_borda_pareto", [4, 6, 8])
+    print(result.allocation if result.found else "{} problems checked".format(result.problems))
+"""
+import concurrent.futures
+import math
+import os
+import random
+
+from fairdiv import Allocation
+from cacheUtils import Database
+from propertyRegistry import DEFAULT_REGISTRY
+from problemGenerators import generate_problem
+import atlas
+
+ORDERS = ["size", "random"]
+
+
+class SearchResult(object):
+    """
+    The result of :func:`search`
+    """
+
+    def __init__(self, problems=0, allocations=0, size=None, index=None, allocation=None):
+        """
+        :param problems: the number of problems checked
+        :param allocations: the number of allocations the property was evaluated on
+        :param size: the number of goods of the counterexample, None if there is none
+        :param index: the index of the counterexample among the problems of its size
+        :param allocation: the allocation returned by the algorithm that doesn't satisfy the property
+        """
+        self.problems = problems
+        self.allocations = allocations
+        self.size = size
+        self.index = index
+        self.allocation = allocation
+
+    @property
+    def found(self):
+        """
+        :return: True if a counterexample was found
+        """
+        return self.allocation is not None
+
+    @property
+    def problem(self):
+        """
+        :return: the problem (agents, goods) of the counterexample, None if there is none
+        """
+        return None if self.index is None else generate_problem(self.size, self.index)
+
+    def formatted_text(self):
+        if self.found:
+            return "Counterexample (problem {} of size {}, after {} problems):\n{}".format(
+                self.index, self.size, self.problems, self.allocation)
+        return "No counterexample: {} problems & {} allocations checked".format(self.problems, self.allocations)
+
+    def __repr__(self):
+        return self.formatted_text()
+
+
+class _Feistel(object):
+    """
+    A pseudo-random permutation of [0, total) that isn't stored: a balanced Feistel network over the smallest even
+    number of bits covering the range, whose outputs out of the range are encrypted again until they are in it (cycle
+    walking). Any round function makes a Feistel network a bijection, so this is a permutation whatever the keys.
+    """
+    ROUNDS = 4
+    MASK64 = (1 << 64) - 1
+
+    def __init__(self, total, rng):
+        """
+        :param total: the size of the range
+        :param rng: the :class:`random.Random` drawing the round keys
+        """
+        self.total = total
+        self.half = max(1, ((total - 1).bit_length() + 1) // 2)
+        self.mask = (1 << self.half) - 1
+        self.keys = [rng.getrandbits(64) for _ in range(self.ROUNDS)]
+
+    def _round(self, value, key):
+        # splitmix64 finalizer, so that close values give unrelated outputs
+        value = (value ^ key) & self.MASK64
+        value = ((value ^ (value >> 30)) * 0xbf58476d1ce4e5b9) & self.MASK64
+        value = ((value ^ (value >> 27)) * 0x94d049bb133111eb) & self.MASK64
+        return (value ^ (value >> 31)) & self.mask
+
+    def _encrypt(self, value):
+        left, right = value >> self.half, value & self.mask
+        for key in self.keys:
+            left, right = right, left ^ self._round(right, key)
+        return (left << self.half) | right
+
+    def __getitem__(self, index):
+        """
+        :param index: a position in [0, total)
+        :return: the value at this position of the permutation
+        """
+        value = self._encrypt(index)
+        while value >= self.total:
+            value = self._encrypt(value)
+        return value
+
+
+def problem_indices(sizes, order="size", seed=None):
+    """
+    :param sizes: numbers of goods
+    :param order: "size" for the problems of the smallest size first, in index order, or "random" for all the
+                  problems in random order
+    :param seed: the seed of the random order
+    :return: a generator of tuples (size, index) going through all the problems of the sizes once.
+             The random order is a pseudo-random permutation of the problems of each size (see :class:`_Feistel`),
+             determined by the seed & without any fixed stride between consecutive indices, interleaved with sizes
+             drawn in proportion to their remaining problems. It is computed on the fly in constant memory, so it is
+             one of the permutations a seed can give rather than a uniform draw among all of them.
+    """
+    if order not in ORDERS:
+        raise ValueError("Unknown order {}, expected one of {}".format(order, ORDERS))
+    sizes = sorted(set(sizes))
+    if order == "size":
+        for size in sizes:
+            for index in range(math.factorial(size)):
+                yield size, index
+        return
+    rng = random.Random(seed)
+    totals = [math.factorial(size) for size in sizes]
+    permutations = [_Feistel(total, rng) for total in totals]
+    done = [0 for _ in sizes]
+    remaining = sum(totals)
+    while remaining > 0:
+        # Sizes are drawn in proportion to their remaining problems, so that all the problems are equally likely
+        draw = rng.randrange(remaining)
+        i = 0
+        while draw >= totals[i] - done[i]:
+            draw -= totals[i] - done[i]
+            i += 1
+        yield sizes[i], permutations[i][done[i]]
+        done[i] += 1
+        remaining -= 1
+
+
+def _resolve(algo, prop):
+    """
+    :return: the algorithm & property functions, given as functions or as names of :data:`atlas.ALGORITHMS` & of
+             :data:`propertyRegistry.DEFAULT_REGISTRY`
+    """
+    algo = atlas.ALGORITHMS[algo] if isinstance(algo, str) else algo
+    prop = DEFAULT_REGISTRY.function(prop) if isinstance(prop, str) else prop
+    return algo, prop
+
+
+def check(algo, prop, tasks, expected=True):
+    """
+    Runs the algorithm on problems until one of its allocations doesn't satisfy the property. The file cache is
+    bypassed (see :meth:`cacheUtils.Database.bypass`), so the results of the problems checked aren't kept in it.
+    :param algo: a function (agents, goods) returning allocations, or the name of one of :data:`atlas.ALGORITHMS`
+    :param prop: a function (alloc, all_allocs, agents), or the name of a property of
+                 :data:`propertyRegistry.DEFAULT_REGISTRY`
+    :param tasks: an iterable of tuples (size, index), see :func:`problem_indices`
+    :param expected: the value the property should have
+    :return: a :class:`SearchResult`
+    """
+    algo, prop = _resolve(algo, prop)
+    result = SearchResult()
+    with Database.bypass():
+        for size, index in tasks:
+            agents, goods = generate_problem(size, index)
+            allocations = Allocation.view(agents, goods)
+            result.problems += 1
+            for X in algo(agents, goods):
+                result.allocations += 1
+                if prop(X, allocations, agents) != expected:
+                    result.size, result.index, result.allocation = size, index, X
+                    return result
+    return result
+
+
+def _chunks(tasks, chunk_size):
+    chunk = []
+    for task in tasks:
+        chunk.append(task)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def search(algo, prop, sizes, order="size", seed=None, expected=True, workers=1, chunk_size=100):
+    """
+    Searches a problem on which an allocation returned by the algorithm doesn't satisfy the property
+    :param algo: see :func:`check`. It must be picklable (a name or a module level function) if workers > 1.
+    :param prop: see :func:`check`, with the same restriction
+    :param sizes: the numbers of goods of the problems searched
+    :param order: the order of the problems, see :func:`problem_indices`
+    :param seed: the seed of the random order
+    :param expected: the value the property should have
+    :param workers: the number of processes checking problems, the number of CPUs if None
+    :param chunk_size: the number of problems checked by a process at once
+    :return: a :class:`SearchResult`. With several processes, the counterexample is the first one found, which may
+             not be the first one in order, & the counts include the chunks checked at the same time.
+    """
+    tasks = problem_indices(sizes, order, seed)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return check(algo, prop, tasks, expected)
+    result = SearchResult()
+    chunks = _chunks(tasks, chunk_size)
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        in_flight = set()
+        try:
+            while True:
+                for chunk in chunks:
+                    in_flight.add(executor.submit(check, algo, prop, chunk, expected))
+                    if len(in_flight) >= 2 * workers:
+                        break
+                if len(in_flight) == 0:
+                    return result
+                done, in_flight = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    partial = future.result()
+                    result.problems += partial.problems
+                    result.allocations += partial.allocations
+                    if partial.found and not result.found:
+                        result.size, result.index, result.allocation = partial.size, partial.index, partial.allocation
+                if result.found:
+                    return result
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Searches a problem on which an algorithm doesn't satisfy a property")
+    parser.add_argument("algorithm", choices=sorted(atlas.ALGORITHMS))
+    parser.add_argument("property", choices=sorted(DEFAULT_REGISTRY.functions()))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2, 4, 6, 8])
+    parser.add_argument("--order", choices=ORDERS, default="size")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--expected", choices=["true", "false"], default="true")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    print(search(args.algorithm, args.property, args.sizes, args.order, args.seed, args.expected == "true",
+                 args.workers))
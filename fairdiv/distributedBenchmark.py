@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of all the problems of a size split between workers, possibly on several hosts.
+The problems of :func:`problemGenerators.generate_possible_problems` are numbered by the Lehmer index of the second
+agent's preferences, so a range of indices is enough for a worker to build its problems. A :class:`Coordinator`
+splits [0, n!) into ranges & hands them to the workers connecting to it over TCP (or a Unix socket), each worker
+sending back the :class:`statistics.Aggregate` of its range. A range whose worker disconnects or doesn't answer
+in time is handed to another worker, & the aggregates are merged once every range is done.
+
+The protocol is made of JSON lines, so workers & coordinator only share the names of the algorithms (see
+:data:`atlas.ALGORITHMS`) & of the properties (see :data:`propertyRegistry.DEFAULT_REGISTRY`) :
+    worker -> coordinator : {"type": "request"} or {"type": "result", "range": [start, stop], "aggregate": {...}}
+    coordinator -> worker : {"type": "task", "range": [start, stop], ...}, {"type": "wait", "delay": seconds} if
+                            every range is assigned but some aren't done, or {"type": "done"}
+
+Example, on one host::
+
+    python distributedBenchmark.py local --size 8 --workers 4
+
+or on several ones::
+
+    python distributedBenchmark.py coordinator --size 10 --host 0.0.0.0 --port 5000
+    python distributedBenchmark.py worker --host coordinator-host --port 5000
+"""
+import argparse
+import collections
+import json
+import math
+import multiprocessing
+import os
+import socket
+import socketserver
+import threading
+import time
+
+from cacheUtils import Database
+from propertyRegistry import DEFAULT_REGISTRY
+from instrumentation import Instrumentation
+from problemGenerators import generate_problems_range
+from statistics import Aggregate, Benchmark
+import atlas
+
+
+def _send(stream, message):
+    stream.write(json.dumps(message).encode("utf-8") + b"\n")
+    stream.flush()
+
+
+def _receive(stream):
+    """
+    :return: the next message of the stream, None if it is closed
+    """
+    line = stream.readline()
+    return json.loads(line.decode("utf-8")) if line else None
+
+
+class Coordinator(object):
+    """
+    Hands ranges of problems to workers & merges their results, see the module documentation
+    """
+
+    def __init__(self, size, algorithms, properties, address=("127.0.0.1", 0), range_size=100, start=0, stop=None,
+                 lease=None, time_limit=None, node_limit=None):
+        """
+        :param size: the number of goods of the problems
+        :param algorithms: names of algorithms of :data:`atlas.ALGORITHMS`
+        :param properties: names of properties of :data:`propertyRegistry.DEFAULT_REGISTRY`
+        :param address: a (host, port) tuple to listen on TCP, the port being chosen by the system if 0, or the
+                        path of a Unix socket
+        :param range_size: the number of problems handed at once to a worker
+        :param start: the index of the first problem
+        :param stop: the index after the last problem, size! if None
+        :param lease: the number of seconds after which a range not done is handed to another worker, None to only
+                      hand it again when its worker disconnects
+        :param time_limit: see :class:`statistics.Benchmark`
+        :param node_limit: see :class:`statistics.Benchmark`
+        """
+        self.size = size
+        self.algorithms = list(algorithms)
+        self.properties = list(properties)
+        self.lease = lease
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        stop = math.factorial(size) if stop is None else stop
+        self._pending = collections.deque((i, min(i + range_size, stop)) for i in range(start, stop, range_size))
+        self._total = len(self._pending)
+        # range -> deadline of the lease, for the ranges handed to a worker & not done
+        self._assigned = dict()
+        self._done = set()
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+        if self._total == 0:
+            self._finished.set()
+        self.aggregate = Aggregate()
+        # Number of ranges handed again after their worker failed
+        self.requeued = 0
+        self._server = self._make_server(address)
+        self._thread = None
+
+    def _make_server(self, address):
+        coordinator = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                coordinator._handle(self.rfile, self.wfile)
+
+        if isinstance(address, str):
+            if os.path.exists(address):
+                os.remove(address)
+            server_class = socketserver.ThreadingUnixStreamServer
+        else:
+            server_class = socketserver.ThreadingTCPServer
+
+        class Server(server_class):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        return Server(address, Handler)
+
+    @property
+    def address(self):
+        """
+        :return: the address workers connect to
+        """
+        return self._server.server_address
+
+    def _task(self, chunk):
+        return {"type": "task", "range": list(chunk), "size": self.size, "algorithms": self.algorithms,
+                "properties": self.properties, "time_limit": self.time_limit, "node_limit": self.node_limit,
+                "instrumentation": Instrumentation.enabled}
+
+    def _next(self):
+        """
+        :return: the next message to a worker asking for a range, & the range handed if any
+        """
+        with self._lock:
+            now = time.monotonic()
+            for chunk, deadline in list(self._assigned.items()):
+                if deadline is not None and deadline < now:
+                    self._requeue(chunk)
+            if self._pending:
+                chunk = self._pending.popleft()
+                self._assigned[chunk] = None if self.lease is None else now + self.lease
+                return self._task(chunk), chunk
+            if self._finished.is_set():
+                return {"type": "done"}, None
+            return {"type": "wait", "delay": 0.1}, None
+
+    def _requeue(self, chunk):
+        """
+        Hands a range again, the lock being held
+        """
+        if chunk in self._assigned:
+            del self._assigned[chunk]
+            self._pending.appendleft(chunk)
+            self.requeued += 1
+
+    def _complete(self, chunk, data):
+        with self._lock:
+            # A range handed twice is only counted once
+            if chunk in self._done:
+                return
+            self._assigned.pop(chunk, None)
+            if chunk in self._pending:
+                self._pending.remove(chunk)
+            self._done.add(chunk)
+            self.aggregate.merge(Aggregate.from_dict(data))
+            if len(self._done) == self._total:
+                self._finished.set()
+
+    def _handle(self, rfile, wfile):
+        """
+        Talks to a worker until it disconnects, handing its ranges again if it didn't finish them
+        """
+        held = set()
+        try:
+            while True:
+                message = _receive(rfile)
+                if message is None:
+                    return
+                if message["type"] == "request":
+                    reply, chunk = self._next()
+                    if chunk is not None:
+                        held.add(chunk)
+                    _send(wfile, reply)
+                elif message["type"] == "result":
+                    chunk = tuple(message["range"])
+                    self._complete(chunk, message["aggregate"])
+                    held.discard(chunk)
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self._lock:
+                for chunk in held:
+                    self._requeue(chunk)
+
+    def start(self):
+        """
+        Starts listening in a background thread
+        :return: this coordinator
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        """
+        :param timeout: the maximal number of seconds to wait, None to wait until every range is done
+        :return: the merged aggregate, None if the timeout expired first
+        """
+        if not self._finished.wait(timeout):
+            return None
+        return self.aggregate
+
+    @property
+    def progress(self):
+        """
+        :return: a tuple (ranges done, ranges)
+        """
+        return len(self._done), self._total
+
+    def close(self):
+        """
+        Stops listening. Workers asking for a range afterwards get disconnected.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+
+
+def run_range(size, start, stop, algorithms, properties, time_limit=None, node_limit=None):
+    """
+    Runs a benchmark on a range of problems. The algorithms & properties are file cached, so the file cache is bypassed
+    (see :meth:`cacheUtils.Database.bypass`) for the memory of a worker not to grow with the ranges it runs.
+    :param size: the number of goods of the problems
+    :param start: the index of the first problem
+    :param stop: the index after the last problem
+    :param algorithms: names of algorithms of :data:`atlas.ALGORITHMS`
+    :param properties: names of properties of :data:`propertyRegistry.DEFAULT_REGISTRY`
+    :return: the :class:`statistics.Aggregate` of the range
+    """
+    algorithms = {name: atlas.ALGORITHMS[name] for name in algorithms}
+    properties = {name: DEFAULT_REGISTRY.function(name) for name in properties}
+    benchmark = Benchmark(generate_problems_range(size, start, stop), algorithms, properties,
+                          time_limit=time_limit, node_limit=node_limit)
+    with Database.bypass():
+        return benchmark.run_aggregate()
+
+
+def _connect(address, retries):
+    for attempt in range(retries + 1):
+        try:
+            if isinstance(address, str):
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(address)
+                return sock
+            return socket.create_connection(tuple(address))
+        except OSError:
+            if attempt == retries:
+                raise
+            time.sleep(0.5)
+
+
+def run_worker(address, retries=10):
+    """
+    Asks a coordinator for ranges of problems & sends it their results until every range is done
+    :param address: the address of the coordinator, see :class:`Coordinator`
+    :param retries: the number of failed connections before giving up, e.g. if the coordinator isn't started yet
+    :return: the number of ranges run
+    """
+    done = 0
+    with _connect(address, retries) as sock:
+        stream = sock.makefile("rwb")
+        while True:
+            _send(stream, {"type": "request"})
+            message = _receive(stream)
+            if message is None or message["type"] == "done":
+                return done
+            if message["type"] == "wait":
+                time.sleep(message["delay"])
+                continue
+            if message["instrumentation"]:
+                Instrumentation.enable()
+            start, stop = message["range"]
+            aggregate = run_range(message["size"], start, stop, message["algorithms"], message["properties"],
+                                  message["time_limit"], message["node_limit"])
+            _send(stream, {"type": "result", "range": message["range"], "aggregate": aggregate.to_dict()})
+            done += 1
+
+
+def run_local(size, algorithms, properties, workers=None, **kwargs):
+    """
+    Runs a coordinator & worker processes on this host
+    :param size: the number of goods of the problems
+    :param algorithms: names of algorithms of :data:`atlas.ALGORITHMS`
+    :param properties: names of properties of :data:`propertyRegistry.DEFAULT_REGISTRY`
+    :param workers: the number of worker processes, the number of CPUs if None
+    :param kwargs: the other parameters of :class:`Coordinator`
+    :return: the merged :class:`statistics.Aggregate`
+    """
+    coordinator = Coordinator(size, algorithms, properties, **kwargs).start()
+    processes = [multiprocessing.Process(target=run_worker, args=(coordinator.address,), daemon=True)
+                 for _ in range(workers or os.cpu_count() or 1)]
+    try:
+        for process in processes:
+            process.start()
+        return coordinator.wait()
+    finally:
+        coordinator.close()
+        for process in processes:
+            process.join(1)
+            if process.is_alive():
+                process.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs a benchmark of all the problems of a size on several workers")
+    parser.add_argument("mode", choices=["coordinator", "worker", "local"])
+    parser.add_argument("--size", type=int, default=6)
+    parser.add_argument("--algorithms", nargs="+", default=sorted(atlas.ALGORITHMS))
+    parser.add_argument("--properties", nargs="+", default=sorted(DEFAULT_REGISTRY.functions()))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--socket", help="path of a Unix socket, used instead of the host & port")
+    parser.add_argument("--range-size", type=int, default=100)
+    parser.add_argument("--lease", type=float)
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+    address = args.socket if args.socket else (args.host, args.port)
+
+    if args.mode == "worker":
+        print("{} ranges run".format(run_worker(address)))
+    elif args.mode == "coordinator":
+        coordinator = Coordinator(args.size, args.algorithms, args.properties, address, args.range_size,
+                                  lease=args.lease).start()
+        print("Listening on {}".format(coordinator.address))
+        try:
+            print(coordinator.wait())
+        finally:
+            coordinator.close()
+    else:
+        print(run_local(args.size, args.algorithms, args.properties, args.workers, range_size=args.range_size,
+                        lease=args.lease))
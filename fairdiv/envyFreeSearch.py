@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Direct enumeration of the ordinally envy-free allocations of a problem.
+Goods are given to the agents one by one & a partial allocation is dropped as soon as one of the requested
+properties can't be satisfied by any of its completions, so only the allocations in the result (and the
+partial allocations leading to them) are built.
+"""
+from fairdiv import Allocation
+from paretoSearch import ParetoSearch
+from budget import Budget
+
+
+class EnvyFreeSearch(object):
+    """
+    Enumerates the allocations of a problem that are ordinally envy-free (see
+    :func:`properties.is_envy_free_ordinally`) for some agents, possibly with additional constraints.
+
+    An agent doesn't envy the other one as long as its bundle is not ordinally less than the other bundle,
+    that is, going through its preferences, there is a good it gets while it holds at least as many of the
+    goods seen so far as the other agent.
+    """
+
+    def __init__(self, agents, goods):
+        """
+        :param agents: The agents
+        :param goods: The goods
+        """
+        self.agents = agents
+        self.goods = goods
+        self.half = len(goods) // 2
+        self.nodes = 0
+        index = {good: i for i, good in enumerate(goods)}
+        # The goods' indices, from the most preferred to the less preferred one, for each agent
+        self._order = [[index[good] for good in agent.preferences] for agent in agents]
+        self._weights = [[len(goods) + 1 - agent.rank(good) for good in goods] for agent in agents]
+
+    def _can_be_envy_free(self, a, owner, counts, free):
+        """
+        :param a: the index of an agent
+        :param owner: the owner of each good, None for the goods that are not allocated yet
+        :param counts: the number of goods each agent holds
+        :param free: the number of goods that are not allocated yet
+        :return: True if the partial allocation can be completed into one where agent a is envy-free
+        """
+        held = given = seen = 0
+        for g in self._order[a]:
+            if owner[g] != (a + 1) % 2:
+                # Give agent a enough of the free goods seen so far to catch up with the other one, then g
+                unallocated = 1 if owner[g] is None else 0
+                low = max(0, -((held - given - seen) // 2), self.half - counts[a] - free + seen)
+                high = min(seen, self.half - counts[a] - unallocated)
+                if low <= high:
+                    return True
+            if owner[g] is None:
+                seen += 1
+            elif owner[g] == a:
+                held += 1
+            else:
+                given += 1
+        return False
+
+    def _can_be_borda_envy_free(self, a, owner, counts):
+        """
+        :param a: the index of an agent
+        :param owner: the owner of each good, None for the goods that are not allocated yet
+        :param counts: the number of goods each agent holds
+        :return: True if the partial allocation can be completed into one where agent a is Borda-envy-free
+        """
+        weights = self._weights[a]
+        score = sum([w for g, w in enumerate(weights) if owner[g] == a])
+        best = sorted([w for g, w in enumerate(weights) if owner[g] is None], reverse=True)
+        return 2 * (score + sum(best[:self.half - counts[a]])) >= sum(weights)
+
+    def is_envy_free(self, alloc):
+        """
+        :param alloc: an allocation of the problem
+        :return: True if the allocation is ordinally envy-free, computed in O(n) instead of going through the
+                 injections between the bundles
+        """
+        owner = [0 if good in alloc[0] else 1 for good in self.goods]
+        return all(self._can_be_envy_free(a, owner, [self.half, self.half], 0) for a in range(2))
+
+    def allocations(self, envy_free=(0, 1), borda_envy_free=False, pareto=False, constraints=()):
+        """
+        Generates the allocations satisfying the given constraints
+        :param envy_free: the indices of the agents that must not envy the other one
+        :param borda_envy_free: if True, the allocations must also be Borda-envy-free
+        :param pareto: if True, the allocations must also be pareto (see :func:`properties.is_pareto`)
+        :param constraints: additional functions (alloc, agents) -> bool the allocations must satisfy
+        :return: a generator of Allocation objects
+        """
+        n = len(self.goods)
+        owner = [None] * n
+        counts = [0, 0]
+        pareto_search = ParetoSearch(self.agents, self.goods) if pareto else None
+
+        def viable(free):
+            for a in envy_free:
+                if not self._can_be_envy_free(a, owner, counts, free):
+                    return False
+            if borda_envy_free:
+                for a in range(2):
+                    if not self._can_be_borda_envy_free(a, owner, counts):
+                        return False
+            return True
+
+        def explore(position):
+            self.nodes += 1
+            if Budget.active:
+                Budget.tick()
+            if position == n:
+                alloc = Allocation(self.agents[0], [good for g, good in enumerate(self.goods) if owner[g] == 0],
+                                   self.agents[1], [good for g, good in enumerate(self.goods) if owner[g] == 1])
+                if pareto_search is not None and pareto_search.find_dominator(alloc) is not None:
+                    return
+                if all(constraint(alloc, self.agents) for constraint in constraints):
+                    yield alloc
+                return
+            g = self._order[0][position]
+            for a in range(2):
+                if counts[a] == self.half:
+                    continue
+                owner[g] = a
+                counts[a] += 1
+                if viable(n - position - 1):
+                    yield from explore(position + 1)
+                counts[a] -= 1
+                owner[g] = None
+
+        if viable(n):
+            yield from explore(0)
+
+
+def generate_envy_free_allocations(agents, goods, envy_free=(0, 1), borda_envy_free=False, pareto=False,
+                                   constraints=()):
+    """
+    Generates the ordinally envy-free allocations of a problem. See :meth:`EnvyFreeSearch.allocations`
+    :param agents: The agents
+    :param goods: The goods
+    :param envy_free: the indices of the agents that must not envy the other one
+    :param borda_envy_free: if True, the allocations must also be Borda-envy-free
+    :param pareto: if True, the allocations must also be pareto
+    :param constraints: additional functions (alloc, agents) -> bool the allocations must satisfy
+    :return: a generator of Allocation objects
+    """
+    return EnvyFreeSearch(agents, goods).allocations(envy_free, borda_envy_free, pareto, constraints)
+
+
+def is_envy_free_ordinally(alloc, agents):
+    """
+    Search based version of :func:`properties.is_envy_free_ordinally`, usable on large problems
+    :param alloc: An allocation
+    :param agents: The agents
+    :return: True if the allocation verifies the ordinally envy free property
+    """
+    return EnvyFreeSearch(agents, sorted(list(alloc[0]) + list(alloc[1]))).is_envy_free(alloc)
+
+
+def fair_set(agents, goods, **kwargs):
+    """
+    :param agents: The agents
+    :param goods: The goods
+    :param kwargs: the constraints, see :func:`generate_envy_free_allocations`
+    :return: The set of the allocations of the problem satisfying the constraints
+    """
+    return set(generate_envy_free_allocations(agents, goods, **kwargs))
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Evaluation of all the properties that scan the possible allocations in a single pass over them.
+The properties of :data:`FUSED` only compare the allocation to the optima of the problem (max-min rank,
+Borda sum, Borda max-min & Borda product) or to the allocations that are not dominated, which are all computed
+while going through the possible allocations once. Each candidate is then decided without scanning them again.
+A bundle is summed up by its Borda score & its rank set (see :class:`revolvingDoor.RevolvingDoorScan`).
+"""
+from fairdiv import AllocationView
+from budget import Budget
+from instrumentation import Instrumentation
+from revolvingDoor import RevolvingDoorScan, compare_rank_sets
+import properties
+
+FUSED_PROPERTIES = ["is_pareto", "is_max_min", "is_maximal_borda_sum", "is_borda_max_min", "is_borda_nash",
+                    "is_borda_pareto"]
+
+# function -> name of the property, the cached & uncached versions being recognized
+FUSED = dict()
+for _name in FUSED_PROPERTIES:
+    FUSED[getattr(properties, _name)] = _name
+    FUSED[getattr(properties, _name).__wrapped__] = _name
+
+
+def fused_keys(functions):
+    """
+    :param functions: a dict key -> function, see :class:`statistics.Statistics`
+    :return: a dict key -> name of the fused property, for the functions that can be fused
+    """
+    return {k: FUSED[func] for k, func in functions.items() if func in FUSED}
+
+
+def _dominates(p, q):
+    """
+    :param p: a profile (first agent's rank set, second agent's rank set)
+    :param q: a profile
+    :return: True if no i-th best rank of p is worse than the i-th best rank of q, for both agents
+    """
+    return not compare_rank_sets(p[0], q[0])[1] and not compare_rank_sets(p[1], q[1])[1]
+
+
+class FusedEvaluator(object):
+    """
+    The optima & the non dominated allocations of a problem, computed once from its possible allocations
+    """
+
+    def __init__(self, allocs, agents, goods):
+        """
+        :param allocs: All possible allocations
+        :param agents: The agents
+        :param goods: The goods
+        """
+        self.agents = agents
+        self._scan = RevolvingDoorScan(agents, goods)
+        self.max_min_rank = None
+        self.maximal_borda_sum = None
+        self.borda_max_min = None
+        self.borda_nash = None
+        scores = set()
+        profiles = set()
+        for _, b0, b1, r0, r1 in self._states(allocs, goods):
+            if Budget.active:
+                Budget.tick()
+            worst = max(r0, r1).bit_length()
+            if self.max_min_rank is None or worst < self.max_min_rank:
+                self.max_min_rank = worst
+            if self.maximal_borda_sum is None or b0 + b1 > self.maximal_borda_sum:
+                self.maximal_borda_sum = b0 + b1
+            if self.borda_max_min is None or min(b0, b1) > self.borda_max_min:
+                self.borda_max_min = min(b0, b1)
+            if self.borda_nash is None or b0 * b1 > self.borda_nash:
+                self.borda_nash = b0 * b1
+            scores.add((b0, b1))
+            profiles.add((r0, r1))
+        # Borda scores that can't be improved for an agent without the other one losing
+        self.borda_frontier = [s for s in scores
+                               if not any(t != s and t[0] >= s[0] and t[1] >= s[1] for t in scores)]
+        # Rank profiles dominated by no other one. A dominating profile has a lower sum of ranks, so the
+        # profiles are checked in that order against the non dominated ones already found.
+        self.pareto_frontier = []
+        for p in sorted(profiles, key=lambda p: self._rank_sum(p[0]) + self._rank_sum(p[1])):
+            if not any(_dominates(q, p) for q in self.pareto_frontier):
+                self.pareto_frontier.append(p)
+
+    def _states(self, allocs, goods):
+        """
+        :return: the tuples (mask, Borda scores, rank sets) of the possible allocations, see
+                 :meth:`revolvingDoor.RevolvingDoorScan.states`
+        """
+        if isinstance(allocs, AllocationView) and len(allocs.goods) == len(goods):
+            # All the balanced allocations, whatever their order
+            return self._scan.states()
+        return (self._scan.state(Y) for Y in allocs)
+
+    @staticmethod
+    def _rank_sum(rank_set):
+        return sum([r + 1 for r in range(rank_set.bit_length()) if rank_set >> r & 1])
+
+    def values(self, X, names=None):
+        """
+        :param X: an allocation of the problem
+        :param names: names of properties of :data:`FUSED_PROPERTIES`, all of them if None
+        :return: a dict name -> value, the same as the one of the function of :mod:`properties`
+        """
+        if names is None:
+            names = FUSED_PROPERTIES
+        _, b0, b1, r0, r1 = self._scan.state(X)
+        result = dict()
+        for name in names:
+            if name == "is_pareto":
+                result[name] = self._is_pareto(r0, r1)
+            elif name == "is_max_min":
+                result[name] = max(r0, r1).bit_length() == self.max_min_rank
+            elif name == "is_maximal_borda_sum":
+                result[name] = b0 + b1 == self.maximal_borda_sum
+            elif name == "is_borda_max_min":
+                result[name] = min(b0, b1) == self.borda_max_min
+            elif name == "is_borda_nash":
+                result[name] = b0 * b1 == self.borda_nash
+            elif name == "is_borda_pareto":
+                result[name] = not any((t0 > b0 and t1 >= b1) or (t1 > b1 and t0 >= b0)
+                                       for t0, t1 in self.borda_frontier)
+            else:
+                raise KeyError(name)
+        return result
+
+    def _is_pareto(self, xa, xb):
+        """
+        An allocation better for an agent & not worse for the other one is dominated by a non dominated one
+        that is also better for the first agent & not worse for the second one, so only them are compared
+        """
+        for ra, rb in self.pareto_frontier:
+            result = 0
+            for x, r in ((xa, ra), (xb, rb)):
+                higher, lower = compare_rank_sets(x, r)
+                if higher and not lower:
+                    result += 1
+                elif lower and not higher:
+                    result -= 1
+            if result < 0:
+                return False
+        return True
+
+    def evaluate(self, candidates, names=None):
+        """
+        :param candidates: allocations of the problem
+        :param names: see :meth:`values`
+        :return: the list of the dicts name -> value of the candidates
+        """
+        return [self.values(X, names) for X in candidates]
+
+    @staticmethod
+    def build(allocs, agents, goods):
+        """
+        Builds an evaluator, timing it if instrumentation is enabled
+        """
+        with Instrumentation.timer("property.fused"):
+            return FusedEvaluator(allocs, agents, goods)
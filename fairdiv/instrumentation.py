@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+import json
+import threading
+import time
+
+
+class _Timer(object):
+    """
+    Context manager adding the time spent in its block to a timer of :class:`Instrumentation`
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._start = None
+
+    def __enter__(self):
+        if Instrumentation.enabled:
+            self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._start is not None:
+            Instrumentation.add_time(self.name, time.perf_counter() - self._start)
+            self._start = None
+        return False
+
+
+class Instrumentation(object):
+    """
+    Opt-in named counters & timers for the hot paths of algorithms, properties & caches.
+    Nothing is recorded unless instrumentation is enabled, & instrumented code is expected to check
+    :attr:`enabled` before calling :meth:`count` so that the disabled cost is a single attribute lookup.
+    """
+    enabled = False
+    counters = dict()
+    # name -> [total time in seconds, number of measures]
+    timers = dict()
+    # The values recorded by the current thread, see :meth:`snapshot`
+    _thread = threading.local()
+
+    @staticmethod
+    def enable():
+        """
+        Starts recording
+        """
+        Instrumentation.enabled = True
+
+    @staticmethod
+    def disable():
+        """
+        Stops recording, recorded values are kept
+        """
+        Instrumentation.enabled = False
+
+    @staticmethod
+    def reset():
+        """
+        Forgets all recorded values
+        """
+        Instrumentation.counters.clear()
+        Instrumentation.timers.clear()
+        Instrumentation._thread = threading.local()
+
+    @staticmethod
+    def _thread_values():
+        """
+        :return: the dicts (counters, timers) of the current thread
+        """
+        local = Instrumentation._thread
+        if not hasattr(local, "counters"):
+            local.counters = dict()
+            local.timers = dict()
+        return local.counters, local.timers
+
+    @staticmethod
+    def count(name, n=1):
+        """
+        Increments a counter
+        :param name: the name of the counter
+        :param n: the increment
+        """
+        for counters in (Instrumentation.counters, Instrumentation._thread_values()[0]):
+            counters[name] = counters.get(name, 0) + n
+
+    @staticmethod
+    def add_time(name, seconds):
+        """
+        Adds a measure to a timer
+        :param name: the name of the timer
+        :param seconds: the measured time
+        """
+        for timers in (Instrumentation.timers, Instrumentation._thread_values()[1]):
+            timer = timers.setdefault(name, [0.0, 0])
+            timer[0] += seconds
+            timer[1] += 1
+
+    @staticmethod
+    def timer(name):
+        """
+        :param name: the name of a timer
+        :return: a context manager measuring the time spent in its block, if instrumentation is enabled
+        """
+        return _Timer(name)
+
+    @staticmethod
+    def snapshot(thread=False):
+        """
+        :param thread: if True, only the values recorded by the current thread
+        :return: a copy of the recorded values, as a dict {"counters": {name: value},
+                 "timers": {name: [seconds, measures]}}
+        """
+        counters, timers = Instrumentation._thread_values() if thread else \
+            (Instrumentation.counters, Instrumentation.timers)
+        return {
+            "counters": dict(counters),
+            "timers": {name: timer[:] for name, timer in timers.items()}
+        }
+
+    @staticmethod
+    def since(before, thread=False):
+        """
+        :param before: a snapshot
+        :param thread: if True, only the values recorded by the current thread, :param:`before` being a snapshot
+                       of them
+        :return: a snapshot of what has been recorded since :param:`before` was taken
+        """
+        now = Instrumentation.snapshot(thread)
+        counters = {name: value - before["counters"].get(name, 0) for name, value in now["counters"].items()}
+        timers = dict()
+        for name, (seconds, measures) in now["timers"].items():
+            old = before["timers"].get(name, [0.0, 0])
+            timers[name] = [seconds - old[0], measures - old[1]]
+        return {
+            "counters": {name: value for name, value in counters.items() if value != 0},
+            "timers": {name: timer for name, timer in timers.items() if timer[1] != 0}
+        }
+
+    @staticmethod
+    def merge(snapshots):
+        """
+        :param snapshots: an iterable of snapshots
+        :return: a snapshot summing them
+        """
+        result = {"counters": dict(), "timers": dict()}
+        for snapshot in snapshots:
+            for name, value in snapshot["counters"].items():
+                result["counters"][name] = result["counters"].get(name, 0) + value
+            for name, (seconds, measures) in snapshot["timers"].items():
+                timer = result["timers"].setdefault(name, [0.0, 0])
+                timer[0] += seconds
+                timer[1] += measures
+        return result
+
+    @staticmethod
+    def report(snapshot=None):
+        """
+        :param snapshot: the values to report, the current ones if None
+        :return: a text report, timers from the most to the less time consuming, then counters
+        """
+        if snapshot is None:
+            snapshot = Instrumentation.snapshot()
+        result = "Timers:\n"
+        for name, (seconds, measures) in sorted(snapshot["timers"].items(), key=lambda item: -item[1][0]):
+            result += "\t{}: {:.6f}s ({} calls)\n".format(name, seconds, measures)
+        result += "Counters:\n"
+        for name, value in sorted(snapshot["counters"].items()):
+            result += "\t{}: {}\n".format(name, value)
+        return result
+
+    @staticmethod
+    def export(path, snapshot=None):
+        """
+        Writes recorded values as JSON
+        :param path: the path of the file to write
+        :param snapshot: the values to export, the current ones if None
+        """
+        if snapshot is None:
+            snapshot = Instrumentation.snapshot()
+        with open(path, "w") as f:
+            json.dump(snapshot, f, indent=2, sort_keys=True)
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Monte Carlo estimation of how often properties are satisfied, for problems too large to enumerate all the
+allocations.
+Random allocations (of a fixed problem or of random problems, possibly returned by an algorithm) are drawn
+until the Wilson confidence interval of every estimated rate is narrow enough.
+The properties are evaluated with the versions that don't scan the possible allocations (see
+:mod:`optimizers`, :mod:`paretoSearch` & :mod:`envyFreeSearch`) & without the file cache, which would
+otherwise store every sampled allocation.
+"""
+import math
+import random
+
+from fairdiv import Agent, Good, Allocation
+import envyFreeSearch
+import optimizers
+import paretoSearch
+import properties
+
+# Properties that can be evaluated without the possible allocations, with the arguments alloc, all_allocs,
+# agents like in :class:`statistics.Statistics` (all_allocs is ignored)
+PROPERTIES = {
+    "is_pareto": paretoSearch.is_pareto,
+    "is_envy_free": lambda X, A, M: properties.is_envy_free.__wrapped__(X, M),
+    "is_pareto_ordinally": paretoSearch.is_pareto_ordinally,
+    "is_envy_free_ordinally": lambda X, A, M: envyFreeSearch.is_envy_free_ordinally(X, M),
+    "is_max_min": optimizers.is_max_min,
+    "is_borda_pareto": optimizers.is_borda_pareto,
+    "is_maximal_borda_sum": optimizers.is_maximal_borda_sum,
+    "is_borda_envy_free": lambda X, A, M: properties.is_borda_envy_free.__wrapped__(X, M),
+    "is_borda_max_min": optimizers.is_borda_max_min,
+    "is_borda_nash": optimizers.is_borda_nash,
+    "is_borda_egalitarian": lambda X, A, M: properties.is_borda_egalitarian.__wrapped__(X, M),
+}
+
+
+def wilson_interval(successes, trials, confidence=0.95):
+    """
+    :param successes: the number of trials satisfying the property
+    :param trials: the number of trials
+    :param confidence: the confidence level of the interval
+    :return: the Wilson score interval (low, high) of the success rate
+    """
+    if trials == 0:
+        return 0.0, 1.0
+    z = _z_score(confidence)
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denominator
+    half_width = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, center - half_width), min(1.0, center + half_width)
+
+
+def _z_score(confidence):
+    """
+    :return: the z such that a standard normal variable falls in [-z, z] with probability :param:`confidence`
+    """
+    # Bisection on erf, precise enough for an interval
+    low, high = 0.0, 10.0
+    for _ in range(60):
+        z = (low + high) / 2
+        if math.erf(z / math.sqrt(2)) < confidence:
+            low = z
+        else:
+            high = z
+    return (low + high) / 2
+
+
+class Estimate(object):
+    """
+    The estimated satisfaction rate of a property
+    """
+
+    def __init__(self, name, successes, trials, confidence):
+        self.name = name
+        self.successes = successes
+        self.trials = trials
+        self.confidence = confidence
+        self.interval = wilson_interval(successes, trials, confidence)
+
+    @property
+    def rate(self):
+        return self.successes / self.trials if self.trials > 0 else None
+
+    @property
+    def half_width(self):
+        return (self.interval[1] - self.interval[0]) / 2
+
+    def __repr__(self):
+        if self.trials == 0:
+            return "{}: no sample".format(self.name)
+        return "{}: {:.4f} [{:.4f}, {:.4f}] ({} samples)".format(self.name, self.rate, self.interval[0],
+                                                                 self.interval[1], self.trials)
+
+
+def random_problem(n, rng=random):
+    """
+    :param n: the number of goods
+    :param rng: the random generator
+    :return: a problem (agents, goods) where the first agent ranks the goods in order & the second one
+             randomly, like the problems of :func:`problemGenerators.generate_possible_problems`
+    """
+    goods = [Good(str(i)) for i in range(n)]
+    preferences_b = goods[:]
+    rng.shuffle(preferences_b)
+    return (Agent("A", goods[:]), Agent("B", preferences_b)), goods
+
+
+def random_allocation(agents, goods, rng=random):
+    """
+    :param agents: The agents
+    :param goods: The goods
+    :param rng: the random generator
+    :return: an allocation drawn uniformly among the balanced allocations of the problem
+    """
+    g1 = rng.sample(goods, len(goods) // 2)
+    return Allocation(agents[0], g1, agents[1], [good for good in goods if good not in g1])
+
+
+def allocation_sampler(agents, goods):
+    """
+    :return: a sampler of uniformly random allocations of a problem
+    """
+    return lambda rng: (random_allocation(agents, goods, rng), agents)
+
+
+def problem_sampler(n):
+    """
+    :param n: the number of goods
+    :return: a sampler of uniformly random allocations of random problems
+    """
+    def sample(rng):
+        agents, goods = random_problem(n, rng)
+        return random_allocation(agents, goods, rng), agents
+    return sample
+
+
+def algorithm_sampler(algorithm, n):
+    """
+    :param algorithm: a function (agents, goods) returning allocations, e.g. :func:`algorithm.bottom_up`.
+                      Cache decorators are bypassed.
+    :param n: the number of goods
+    :return: a sampler drawing a random problem & one of the allocations returned by the algorithm. Problems
+             for which the algorithm returns nothing give no sample.
+    """
+    algorithm = getattr(algorithm, "__wrapped__", algorithm)
+
+    def sample(rng):
+        agents, goods = random_problem(n, rng)
+        allocations = sorted(algorithm(agents, goods), key=lambda X: X.to_mask(goods))
+        if len(allocations) == 0:
+            return None
+        return rng.choice(allocations), agents
+    return sample
+
+
+def estimate(sampler, functions=None, precision=0.01, confidence=0.95, min_samples=100, max_samples=100000,
+             batch=100, seed=None):
+    """
+    Estimates the satisfaction rate of properties, drawing samples until the half width of every confidence
+    interval is at most :param:`precision`
+    :param sampler: a function taking a random generator & returning a sample (alloc, agents), or None if
+                    the draw gives no sample. See :func:`allocation_sampler`, :func:`problem_sampler` &
+                    :func:`algorithm_sampler`.
+    :param functions: a dict key -> function (alloc, all_allocs, agents), all_allocs being None. All the
+                      :data:`PROPERTIES` if None.
+    :param precision: the desired half width of the intervals
+    :param confidence: the confidence level of the intervals
+    :param min_samples: the number of samples drawn before checking the precision
+    :param max_samples: the maximal number of draws, whatever the precision reached
+    :param batch: the number of draws between two checks of the precision
+    :param seed: the seed of the random generator
+    :return: a dict key -> :class:`Estimate`
+    """
+    if functions is None:
+        functions = PROPERTIES
+    rng = random.Random(seed)
+    successes = {k: 0 for k in functions}
+    trials = 0
+    draws = 0
+    while draws < max_samples:
+        for _ in range(min(batch, max_samples - draws)):
+            draws += 1
+            sample = sampler(rng)
+            if sample is None:
+                continue
+            alloc, agents = sample
+            trials += 1
+            for k, func in functions.items():
+                if func(alloc, None, agents):
+                    successes[k] += 1
+        if trials >= min_samples and all(
+                Estimate(k, successes[k], trials, confidence).half_width <= precision for k in functions):
+            break
+    return {k: Estimate(k, successes[k], trials, confidence) for k in functions}
+
+
+if __name__ == "__main__":
+    import algorithm
+
+    for estimated in estimate(problem_sampler(16), precision=0.05, seed=0).values():
+        print(estimated)
+    print(estimate(algorithm_sampler(algorithm.bottom_up, 16), {"is_borda_pareto": optimizers.is_borda_pareto},
+                   precision=0.02, seed=0))
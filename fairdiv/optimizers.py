@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Direct computation of the optimal values used by the properties that compare an allocation to all the
+possible ones (see :mod:`properties`).
+The optimal value of a problem is computed once, without enumerating the allocations, & stored in the
+memory cache. The predicates of this module have the same signature as the ones of :mod:`properties` so
+they can be used in place of them, but A is never scanned : the whole set of allocations is assumed.
+"""
+import functools
+from cacheUtils import mem_cache
+
+
+def _problem(X, M):
+    """
+    :param X: An allocation
+    :param M: The agents
+    :return: the problem (agents, goods) the allocation belongs to
+    """
+    return tuple(M), tuple(sorted(list(X[0]) + list(X[1])))
+
+
+@mem_cache(cache_size=1000)
+def max_min_value(agents, goods):
+    """
+    Computes the smallest possible value of the worst rank an agent gets, ie. the optimum of
+    :func:`properties.is_max_min`. The value is found by a threshold search : a threshold t is reachable if
+    every good is ranked t or better by an agent & none of the agents is forced more than half the goods.
+    :param agents: The agents
+    :param goods: The goods
+    :return: the max-min value of the problem
+    """
+    half = len(goods) // 2
+    ranks = [[agent.rank(good) for agent in agents] for good in goods]
+
+    def reachable(t):
+        forced = [0, 0]
+        for ra, rb in ranks:
+            if ra > t and rb > t:
+                return False
+            if rb > t:
+                forced[0] += 1
+            elif ra > t:
+                forced[1] += 1
+        return forced[0] <= half and forced[1] <= half
+
+    low, high = half, len(goods)
+    while low < high:
+        t = (low + high) // 2
+        if reachable(t):
+            high = t
+        else:
+            low = t + 1
+    return low
+
+
+@mem_cache(cache_size=1000)
+def borda_frontier(agents, goods):
+    """
+    Computes, for each Borda score the first agent can get, the best Borda score the second agent can get
+    at the same time. This is a balanced partition dynamic programming over the goods.
+    :param agents: The agents
+    :param goods: The goods
+    :return: a list of pairs (score of agents[0], best score of agents[1]), sorted by the first score
+    """
+    n = len(goods)
+    half = n // 2
+    weights = [[n + 1 - agent.rank(good) for agent in agents] for good in goods]
+    total_b = sum(wb for _, wb in weights)
+
+    # lost[c][sa] is the smallest score the second agent loses when the first one gets c goods scoring sa
+    lost = [dict() for _ in range(half + 1)]
+    lost[0][0] = 0
+    for wa, wb in weights:
+        for c in range(half, 0, -1):
+            for sa, sb in lost[c - 1].items():
+                if sa + wa not in lost[c] or lost[c][sa + wa] > sb + wb:
+                    lost[c][sa + wa] = sb + wb
+    return sorted((sa, total_b - sb) for sa, sb in lost[half].items())
+
+
+@mem_cache(cache_size=1000)
+def maximal_borda_sum_value(agents, goods):
+    """
+    :param agents: The agents
+    :param goods: The goods
+    :return: the best sum of Borda scores, ie. the optimum of :func:`properties.is_maximal_borda_sum`
+    """
+    n = len(goods)
+    scores = [[n + 1 - agent.rank(good) for agent in agents] for good in goods]
+    # The first agent gets the half of the goods for which it gains the most compared to the second one
+    gains = sorted([wa - wb for wa, wb in scores], reverse=True)
+    return sum(wb for _, wb in scores) + sum(gains[:n // 2])
+
+
+@mem_cache(cache_size=1000)
+def borda_max_min_value(agents, goods):
+    """
+    :param agents: The agents
+    :param goods: The goods
+    :return: the best Borda score of the worst-off agent, ie. the optimum of :func:`properties.is_borda_max_min`
+    """
+    return max([min(sa, sb) for sa, sb in borda_frontier(agents, goods)])
+
+
+@mem_cache(cache_size=1000)
+def borda_nash_value(agents, goods):
+    """
+    :param agents: The agents
+    :param goods: The goods
+    :return: the best product of Borda scores, ie. the optimum of :func:`properties.is_borda_nash`
+    """
+    return max([sa * sb for sa, sb in borda_frontier(agents, goods)])
+
+
+def is_max_min(X, A, M):
+    """
+    :param X: An allocation
+    :param A: Ignored, all the possible allocations are considered
+    :param M: The agents
+    :return: True if the allocation verifies the max min property
+    """
+    return max([max([m.rank(i) for i in X[ind]]) for ind, m in enumerate(M)]) == max_min_value(*_problem(X, M))
+
+
+def is_maximal_borda_sum(X, A, M):
+    """
+    :param X: An allocation
+    :param A: Ignored, all the possible allocations are considered
+    :param M: The agents
+    :return: True if X is maximal Borda sum
+    """
+    return sum([M[i].borda(X[i]) for i in range(len(M))]) == maximal_borda_sum_value(*_problem(X, M))
+
+
+def is_borda_max_min(X, A, M):
+    """
+    :param X: An allocation
+    :param A: Ignored, all the possible allocations are considered
+    :param M: The agents
+    :return: True if allocation is Borda max-min, else False
+    """
+    return min([M[i].borda(X[i]) for i in range(len(M))]) == borda_max_min_value(*_problem(X, M))
+
+
+def is_borda_nash(X, A, M):
+    """
+    :param X: An allocation
+    :param A: Ignored, all the possible allocations are considered
+    :param M: The agents
+    :return: True if allocation is Borda-Nash, else False
+    """
+    return functools.reduce(lambda a, b: a * b, [M[i].borda(X[i]) for i in range(len(M))]) == \
+        borda_nash_value(*_problem(X, M))
+
+
+def is_borda_pareto(X, A, M):
+    """
+    :param X: An allocation
+    :param A: Ignored, all the possible allocations are considered
+    :param M: The agents
+    :return: True if X is Borda pareto
+    """
+    ba = M[0].borda(X[0])
+    bb = M[1].borda(X[1])
+    for sa, sb in borda_frontier(*_problem(X, M)):
+        if (sa > ba and sb >= bb) or (sb > bb and sa >= ba):
+            return False
+    return True
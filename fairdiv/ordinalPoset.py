@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+The "ordinally less" relation of an agent (see :meth:`fairdiv.Agent.is_ordinally_less`) over the bundles of
+half the goods, computed once & stored as bitsets.
+A bundle of k goods is ordinally less than another one iff its i-th best rank is worse than the other one's
+for every i. The relation thus only depends on the sets of ranks of the bundles : it is computed once per
+number of goods over the k-subsets of ranks (see :func:`rank_relation`), & an agent only maps its bundles to
+their rank sets.
+"""
+import itertools
+from fairdiv import AllocationView
+from cacheUtils import mem_cache
+from budget import Budget
+
+
+@mem_cache(cache_size=20)
+def rank_relation(n):
+    """
+    The "ordinally less" relation over the sets of n // 2 ranks among n
+    :param n: the number of goods
+    :return: a list [rank sets, better] : the rank sets in the order of :func:`itertools.combinations` (bit r-1
+             is set for the rank r), & for each of them the bitset of the indices of the rank sets that are
+             strictly better at every position
+    """
+    k = n // 2
+    rank_sets = [sum([1 << r for r in ranks]) for ranks in itertools.combinations(range(n), k)]
+    index = {rank_set: i for i, rank_set in enumerate(rank_sets)}
+    # weak[s] : the rank sets whose i-th best rank is at least as good as the one of s for every i. They are
+    # the ones reached by improving one rank at a time, so they are computed from the best sets to the worst.
+    weak = dict()
+    for s in sorted(rank_sets, key=lambda s: sum([r for r in range(n) if s >> r & 1])):
+        result = 1 << index[s]
+        for r in range(1, n):
+            if s >> r & 1 and not s >> (r - 1) & 1:
+                result |= weak[s ^ (1 << r) ^ (1 << (r - 1))]
+        weak[s] = result
+    # Being better at every position is being at least as good as the set with each rank improved by one
+    better = [0 if s & 1 else weak[s >> 1] for s in rank_sets]
+    return [rank_sets, better]
+
+
+class OrdinalPoset(object):
+    """
+    The "ordinally less" relation of an agent over the bundles of n // 2 goods of a problem. Bundles are
+    identified by their index in :func:`rank_relation`, relation queries are lookups in bitsets.
+    Bundles of other sizes are compared with :meth:`fairdiv.Agent.is_ordinally_less`.
+    """
+
+    def __init__(self, agent, goods):
+        """
+        :param agent: The agent
+        :param goods: The goods of the problem
+        """
+        self.agent = agent
+        self.goods = goods
+        self.size = len(goods) // 2
+        rank_sets, self._better = rank_relation(len(goods))
+        self._index = {rank_set: i for i, rank_set in enumerate(rank_sets)}
+        # Only the order of the goods matters, so the ranks are relative to the goods of the problem
+        self._bits = {good: 1 << r for r, good in enumerate(sorted(goods, key=agent.rank))}
+
+    def index(self, bundle):
+        """
+        :param bundle: an iterable of goods
+        :return: the index of the bundle, None if it doesn't have n // 2 goods
+        """
+        bundle = list(bundle)
+        if len(bundle) != self.size:
+            return None
+        return self._index[sum([self._bits[good] for good in bundle])]
+
+    def members(self, bundles):
+        """
+        :param bundles: bundles of n // 2 goods
+        :return: the bitset of their indices
+        """
+        result = 0
+        for bundle in bundles:
+            result |= 1 << self.index(bundle)
+        return result
+
+    def dominators(self, bundle):
+        """
+        :param bundle: a bundle of n // 2 goods
+        :return: the bitset of the indices of the bundles it is ordinally less than
+        """
+        return self._better[self.index(bundle)]
+
+    def is_less(self, bundle1, bundle2=None):
+        """
+        Same as :meth:`fairdiv.Agent.is_ordinally_less`
+        :param bundle1: a bundle
+        :param bundle2: a bundle, if None the goods of the problem that are not in bundle1
+        :return: True if bundle1 is ordinally less than bundle2 for the agent
+        """
+        if bundle2 is None:
+            bundle2 = [good for good in self.goods if good not in bundle1]
+        i, j = self.index(bundle1), self.index(bundle2)
+        if i is None or j is None:
+            return self.agent.is_ordinally_less(tuple(bundle1), tuple(bundle2))
+        return self._better[i] >> j & 1 == 1
+
+    def is_dominated(self, bundle, among=None):
+        """
+        :param bundle: a bundle of n // 2 goods
+        :param among: a bitset of bundles (see :meth:`members`), all the bundles if None
+        :return: True if the bundle is ordinally less than one of them
+        """
+        dominators = self.dominators(bundle)
+        return dominators != 0 if among is None else dominators & among != 0
+
+
+@mem_cache(cache_size=100)
+def ordinal_poset(agent, goods):
+    """
+    :param agent: an agent
+    :param goods: the goods of a problem, sorted
+    :return: the :class:`OrdinalPoset` of the agent over the problem
+    """
+    return OrdinalPoset(agent, goods)
+
+
+def _posets(X, M):
+    """
+    :param X: An allocation
+    :param M: The agents
+    :return: the posets of the agents over the problem X belongs to
+    """
+    goods = sorted(list(X[0]) + list(X[1]))
+    return [ordinal_poset(agent, goods) for agent in M]
+
+
+def is_pareto_ordinally(X, A, M):
+    """
+    Poset based version of :func:`properties.is_pareto_ordinally`, for balanced allocations
+    :param X: A balanced allocation
+    :param A: The possible allocations
+    :param M: The agents
+    :return: True if the allocation verifies the ordinally pareto property
+    """
+    posets = _posets(X, M)
+    if isinstance(A, AllocationView) and len(A.goods) == len(posets[0].goods):
+        # Every bundle of half the goods belongs to both agents in some allocation
+        return not any(poset.is_dominated(X[j]) for j, poset in enumerate(posets))
+    members = [0 for _ in posets]
+    for Y in A:
+        if Budget.active:
+            Budget.tick()
+        for j, poset in enumerate(posets):
+            members[j] |= 1 << poset.index(Y[j])
+    return not any(poset.is_dominated(X[j], members[j]) for j, poset in enumerate(posets))
+
+
+def is_envy_free_ordinally(alloc, agents):
+    """
+    Poset based version of :func:`properties.is_envy_free_ordinally`, for balanced allocations
+    :param alloc: A balanced allocation
+    :param agents: The agents
+    :return: True if the allocation verifies the ordinally envy free property
+    """
+    posets = _posets(alloc, agents)
+    return not posets[0].is_less(alloc[0], alloc[1]) and not posets[1].is_less(alloc[1], alloc[0])
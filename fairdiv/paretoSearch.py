@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Search based Pareto checks.
+Instead of scanning all the possible allocations, a dominating allocation is built good by good & partial
+bundles that can't beat the checked allocation anymore are pruned. The search stops at the first dominating
+allocation found, which is returned as a witness.
+"""
+from fairdiv import Allocation
+from budget import Budget
+
+
+class ParetoSearch(object):
+    """
+    Looks for allocations dominating a given one in a problem.
+    Bundles are explored in rank space : a bundle dominates another one for an agent if its i-th best good is
+    ranked better than (or as good as) the i-th best good of the other, for every i.
+    """
+
+    def __init__(self, agents, goods):
+        """
+        :param agents: The agents
+        :param goods: The goods
+        """
+        self.agents = agents
+        self.goods = goods
+        self.nodes = 0
+        self._ranks = [{good: agent.rank(good) for good in goods} for agent in agents]
+        self._by_rank = [agent.preferences for agent in agents]
+
+    def _sorted_ranks(self, j, bundle):
+        """
+        :param j: the index of an agent
+        :param bundle: some goods
+        :return: the sorted ranks of the goods for the agent
+        """
+        return sorted([self._ranks[j][good] for good in bundle])
+
+    def dominating_bundles(self, j, bundle, strict=False, viable=None):
+        """
+        Generates the bundles of the same size as :param:`bundle` that dominate it for agent j, including
+        the bundle itself if strict is False.
+        :param j: the index of the agent
+        :param bundle: the bundle to dominate
+        :param strict: if True, each good of the generated bundles must be strictly better than the matching
+                       good of :param:`bundle` (ie. :param:`bundle` is ordinally less than them)
+        :param viable: an optional function (t, chosen) -> bool telling if a partial bundle, made of the goods
+                       ranked in chosen among the t-1 first ones, is worth completing
+        :return: a generator of tuples of goods
+        """
+        n = len(self.goods)
+        k = len(bundle)
+        shift = 1 if strict else 0
+        held = [0] * (n + 2)
+        for good in bundle:
+            held[self._ranks[j][good]] = 1
+        # need[t] is the number of goods ranked t or better that a dominating bundle must hold
+        need = [0] * (n + 1)
+        count = 0
+        for t in range(1, n + 2):
+            count += held[t]
+            if t - shift <= n and t - shift >= 0:
+                need[t - shift] = count
+        need[n] = k
+        chosen = []
+
+        def explore(t, count):
+            self.nodes += 1
+            if Budget.active:
+                Budget.tick()
+            if count == k:
+                yield tuple(self._by_rank[j][r - 1] for r in chosen)
+                return
+            if viable is not None and not viable(t, chosen):
+                return
+            # The worse goods are tried first, so bundles close to the dominated one come first
+            if count >= need[t]:
+                yield from explore(t + 1, count)
+            chosen.append(t)
+            yield from explore(t + 1, count + 1)
+            chosen.pop()
+
+        if need[0] > 0:
+            # The bundle holds the best good, nothing is strictly better
+            return iter(())
+        return explore(1, 0)
+
+    def find_dominator(self, X):
+        """
+        Looks for an allocation that makes X fail :func:`properties.is_pareto`, ie. an allocation that is
+        strictly better for one agent & not strictly worse for the other one.
+        :param X: An allocation
+        :return: A dominating Allocation, or None if X is pareto
+        """
+        for j in range(len(self.agents)):
+            o = (j + 1) % 2
+            xj = set(X[j])
+            xo = self._sorted_ranks(o, X[o])
+            k = len(xo)
+            held_o = set(X[o])
+            order_o = self._by_rank[o]
+
+            def viable(t, chosen):
+                # Goods ranked before t by agent j & not chosen go to agent o. If even by giving it the best
+                # undecided goods agent o can't avoid being strictly worse off, prune
+                decided = set(self._by_rank[j][:t - 1])
+                taken = set(self._by_rank[j][r - 1] for r in chosen)
+                capacity = k - (len(decided) - len(taken))
+                fixed = undecided = held = 0
+                for good in order_o:
+                    if good in held_o:
+                        held += 1
+                    if good not in decided:
+                        undecided += 1
+                    elif good not in taken:
+                        fixed += 1
+                    if fixed + min(undecided, capacity) > held:
+                        return True
+                return False
+
+            for yj in self.dominating_bundles(j, X[j], viable=viable):
+                if set(yj) == xj:
+                    continue
+                yo = [good for good in self.goods if good not in yj]
+                ro = self._sorted_ranks(o, yo)
+                if all(a <= b for a, b in zip(xo, ro)):
+                    # X is strictly better for agent o
+                    continue
+                bundles = (yj, yo) if j == 0 else (yo, yj)
+                return Allocation(self.agents[0], bundles[0], self.agents[1], bundles[1])
+        return None
+
+    def find_ordinal_dominator(self, X):
+        """
+        Looks for an allocation that makes X fail :func:`properties.is_pareto_ordinally`, ie. an allocation
+        in which the bundle of X of an agent is ordinally less than its new bundle.
+        :param X: An allocation
+        :return: A dominating Allocation, or None if X is ordinally pareto
+        """
+        for j in range(len(self.agents)):
+            for yj in self.dominating_bundles(j, X[j], strict=True):
+                yo = [good for good in self.goods if good not in yj]
+                bundles = (yj, yo) if j == 0 else (yo, yj)
+                return Allocation(self.agents[0], bundles[0], self.agents[1], bundles[1])
+        return None
+
+
+def _search(X, M):
+    """
+    :param X: An allocation
+    :param M: The agents
+    :return: a ParetoSearch over the problem X belongs to
+    """
+    return ParetoSearch(M, sorted(list(X[0]) + list(X[1])))
+
+
+def is_pareto(X, A, M):
+    """
+    Search based version of :func:`properties.is_pareto`
+    :param X: An allocation
+    :param A: Ignored, all the possible allocations are considered
+    :param M: The agents
+    :return: True if the allocation verifies the pareto property
+    """
+    return _search(X, M).find_dominator(X) is None
+
+
+def is_pareto_ordinally(X, A, M):
+    """
+    Search based version of :func:`properties.is_pareto_ordinally`
+    :param X: An allocation
+    :param A: Ignored, all the possible allocations are considered
+    :param M: The agents
+    :return: True if the allocation verifies the ordinally pareto property
+    """
+    return _search(X, M).find_ordinal_dominator(X) is None
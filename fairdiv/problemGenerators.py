@@ -2,6 +2,7 @@ from cacheUtils import cache
 from fairdiv import Good, Agent
 from algorithm import trump_algorithm
 import itertools
+import math
 
 
 @cache
@@ -18,3 +19,54 @@ def generate_possible_problems(problems_size=2):
         problem = ((a, b), goods)
         problems.append(problem)
     return problems
+
+
+def lehmer_index(permutation):
+    """
+    :param permutation: a permutation of range(n)
+    :return: its index among the permutations of range(n) in lexicographic order
+    """
+    n = len(permutation)
+    index = 0
+    for i, value in enumerate(permutation):
+        smaller = sum(1 for later in permutation[i + 1:] if later < value)
+        index += smaller * math.factorial(n - 1 - i)
+    return index
+
+
+def permutation_from_index(n, index):
+    """
+    :param n: the number of elements
+    :param index: a Lehmer index, see :func:`lehmer_index`
+    :return: the permutation of range(n) with this index
+    """
+    remaining = list(range(n))
+    permutation = []
+    for i in range(n):
+        position, index = divmod(index, math.factorial(n - 1 - i))
+        permutation.append(remaining.pop(position))
+    return permutation
+
+
+def generate_problem(problems_size, index):
+    """
+    :param problems_size: The size of the problem
+    :param index: The index of the problem in :func:`generate_possible_problems`, ie. the Lehmer index of the
+                  preferences of the second agent (see :func:`lehmer_index`)
+    :return: The problem, built without generating the others
+    """
+    goods = [Good(str(i)) for i in range(problems_size)]
+    a = Agent("A", goods[:])
+    b = Agent("B", [goods[i] for i in permutation_from_index(problems_size, index)])
+    return (a, b), goods
+
+
+def generate_problems_range(problems_size, start, stop):
+    """
+    :param problems_size: The size of the problems
+    :param start: the index of the first problem
+    :param stop: the index after the last problem
+    :return: a generator of the problems of :func:`generate_possible_problems` whose index is in [start, stop)
+    """
+    for index in range(start, stop):
+        yield generate_problem(problems_size, index)
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 import functools
 from cacheUtils import cache
+from budget import Budget
+import ordinalPoset
 
 
 @cache
@@ -15,6 +17,8 @@ def is_pareto(X, A, M):
     xb = sorted([M[1].rank(g) for g in X[1]])
 
     for x in A:
+        if Budget.active:
+            Budget.tick()
         if X == x:
             continue
 
@@ -83,6 +87,17 @@ def is_envy_free(X, M):
     return True
 
 
+def _is_balanced(X, M):
+    """
+    :param X: An allocation
+    :param M: The agents
+    :return: True if X shares all the goods between two bundles of the same size, the allocations handled by
+             :mod:`ordinalPoset`. Partial allocations, e.g. those of :func:`algorithm.singles_doubles`, are compared
+             to the complement of their bundles over all the goods, which the posets don't know.
+    """
+    return len(X[0]) == len(X[1]) and len(X[0]) + len(X[1]) == len(M[0].preferences)
+
+
 @cache
 def is_pareto_ordinally(X, A, M):
     """
@@ -91,10 +106,14 @@ def is_pareto_ordinally(X, A, M):
     :param M: The agents
     :return: True if the allocation verifies the ordinally pareto property
     """
+    if _is_balanced(X, M):
+        return ordinalPoset.is_pareto_ordinally(X, A, M)
     found = False
     i = 0
 
     while not found and i < len(A):
+        if Budget.active:
+            Budget.tick()
         for j in range(len(M)):
             found = found or M[j].is_ordinally_less(X[j], A[i][j])
         i += 1
@@ -108,6 +127,8 @@ def is_envy_free_ordinally(alloc, agents):
     :param agents: The agents
     :return: True if the allocation verifies the ordinally envy free property
     """
+    if _is_balanced(alloc, agents):
+        return ordinalPoset.is_envy_free_ordinally(alloc, agents)
     if agents[0].is_ordinally_less(alloc[0]) or agents[1].is_ordinally_less(alloc[1]):
         return False
     return True
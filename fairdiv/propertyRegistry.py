@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+import properties
+from instrumentation import Instrumentation
+
+
+# Relative costs of the properties
+CHEAP = 1           # Only depends on the allocation & the agents
+ORDINAL = 10        # Compares bundles ordinally, ie. goes through injections
+SCAN = 100          # Scans all the possible allocations
+ORDINAL_SCAN = 1000  # Scans all the possible allocations & compares bundles ordinally
+
+
+class PropertyRegistry(object):
+    """
+    Stores properties with their cost & the logical links between them, so that the value of a property can
+    sometimes be inferred from the values of others instead of being computed.
+    The registered functions take the arguments alloc, all_allocs, agents, like the ones expected by
+    :class:`statistics.Statistics`.
+    Declared implications must hold whatever the set of possible allocations is.
+    """
+
+    def __init__(self):
+        self._functions = dict()
+        self._names = dict()
+        self._costs = dict()
+        self._implications = dict()
+
+    def register(self, name, func, cost):
+        """
+        Registers a property
+        :param name: the name of the property
+        :param func: a function (alloc, all_allocs, agents) -> bool
+        :param cost: the relative cost of the function, cheap properties are evaluated first
+        """
+        self._functions[name] = func
+        self._names[func] = name
+        self._costs[name] = cost
+
+    def function(self, name):
+        """
+        :param name: the name of a registered property
+        :return: the function of the property
+        """
+        return self._functions[name]
+
+    def functions(self, names=None):
+        """
+        :param names: names of registered properties. All of them if None
+        :return: a dict name -> function, that can be given to :class:`statistics.Statistics`
+        """
+        if names is None:
+            names = self._functions.keys()
+        return {name: self._functions[name] for name in names}
+
+    def add_implication(self, premise, conclusion, premise_value=True, conclusion_value=True):
+        """
+        Declares that if the property premise has the value premise_value, the property conclusion has the
+        value conclusion_value. The contrapositive is declared too.
+        :param premise: the name of a property
+        :param conclusion: the name of a property
+        :param premise_value: the value of premise
+        :param conclusion_value: the value of conclusion implied by premise_value
+        """
+        self._implications.setdefault((premise, premise_value), []).append((conclusion, conclusion_value))
+        self._implications.setdefault((conclusion, not conclusion_value), []).append((premise, not premise_value))
+
+    def infer(self, known):
+        """
+        Completes property values using the declared implications
+        :param known: a dict name -> value. It is updated with the inferred values
+        :return: known
+        """
+        pending = list(known.items())
+        while len(pending) > 0:
+            for name, value in self._implications.get(pending.pop(), []):
+                if name not in known:
+                    known[name] = value
+                    pending.append((name, value))
+        return known
+
+    def _priority(self, name):
+        """
+        :param name: the name of a property, None if it is not registered
+        :return: a sort key, cheaper properties first & among equally expensive ones, those from which the
+                 most values can be inferred
+        """
+        if name is None:
+            return 0, 0
+        consequences = len(self._implications.get((name, True), [])) + \
+            len(self._implications.get((name, False), []))
+        return self._costs[name], -consequences
+
+    def evaluate(self, functions, alloc, allocs, agents):
+        """
+        Computes the value of several properties for an allocation. Functions that are not registered are
+        always evaluated, the others are evaluated from the cheapest to the most expensive one & skipped if
+        their value can be inferred from the ones already known.
+        :param functions: a dict key -> function (alloc, all_allocs, agents) -> value
+        :param alloc: the allocation
+        :param allocs: all possible allocations
+        :param agents: the agents
+        :return: a dict key -> value, keys being in the same order as in functions
+        """
+        known = dict()
+        values = dict()
+        order = sorted(functions.keys(), key=lambda k: self._priority(self._names.get(functions[k])))
+        for key in order:
+            name = self._names.get(functions[key])
+            if name is None:
+                values[key] = self._call(key, functions[key], alloc, allocs, agents)
+            elif name in known:
+                if Instrumentation.enabled:
+                    Instrumentation.count("property.{}.inferred".format(key))
+                values[key] = known[name]
+            else:
+                known[name] = self._call(key, functions[key], alloc, allocs, agents)
+                self.infer(known)
+                values[key] = known[name]
+        return {key: values[key] for key in functions}
+
+    @staticmethod
+    def _call(key, func, alloc, allocs, agents):
+        """
+        Applies a property function, timing it if instrumentation is enabled
+        """
+        if not Instrumentation.enabled:
+            return func(alloc, allocs, agents)
+        with Instrumentation.timer("property.{}".format(key)):
+            return func(alloc, allocs, agents)
+
+
+DEFAULT_REGISTRY = PropertyRegistry()
+
+DEFAULT_REGISTRY.register("is_pareto", properties.is_pareto, SCAN)
+DEFAULT_REGISTRY.register("is_envy_free", lambda X, A, M: properties.is_envy_free(X, M), CHEAP)
+DEFAULT_REGISTRY.register("is_pareto_ordinally", properties.is_pareto_ordinally, ORDINAL_SCAN)
+DEFAULT_REGISTRY.register("is_envy_free_ordinally",
+                          lambda X, A, M: properties.is_envy_free_ordinally(X, M), ORDINAL)
+DEFAULT_REGISTRY.register("is_max_min", properties.is_max_min, SCAN)
+DEFAULT_REGISTRY.register("is_borda_pareto", properties.is_borda_pareto, SCAN)
+DEFAULT_REGISTRY.register("is_maximal_borda_sum", properties.is_maximal_borda_sum, SCAN)
+DEFAULT_REGISTRY.register("is_borda_envy_free", lambda X, A, M: properties.is_borda_envy_free(X, M), CHEAP)
+DEFAULT_REGISTRY.register("is_borda_max_min", properties.is_borda_max_min, SCAN)
+DEFAULT_REGISTRY.register("is_borda_nash", properties.is_borda_nash, SCAN)
+DEFAULT_REGISTRY.register("is_borda_egalitarian", lambda X, A, M: properties.is_borda_egalitarian(X, M), CHEAP)
+
+# Nobody can be better off without the sum or the product of the Borda scores increasing
+DEFAULT_REGISTRY.add_implication("is_maximal_borda_sum", "is_borda_pareto")
+DEFAULT_REGISTRY.add_implication("is_borda_nash", "is_borda_pareto")
+# If the other bundle is ordinally better, its Borda score is better
+DEFAULT_REGISTRY.add_implication("is_borda_envy_free", "is_envy_free_ordinally")
+# Getting half of the Borda score of all the goods is harder than beating the other bundle
+DEFAULT_REGISTRY.add_implication("is_borda_egalitarian", "is_borda_envy_free")
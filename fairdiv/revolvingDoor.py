@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Scans of all the balanced allocations of a problem in revolving-door order : two consecutive allocations
+differ by a single good going from the first agent's bundle to the second one's & another good going back.
+The Borda scores, the worst ranks & the sets of ranks of both bundles are thus updated in constant time at
+each step, instead of being recomputed from the goods.
+The predicates of this module have the same signature as the ones of :mod:`properties` so they can be used
+in place of them, but A is never scanned : the whole set of allocations is enumerated.
+"""
+from cacheUtils import mem_cache
+
+
+def _revolving_door(n, k, reverse=False):
+    """
+    Generates the k-subsets of range(n) in revolving-door order, defined recursively as the (n-1, k) order
+    followed by the reversed (n-1, k-1) order with n-1 added to each subset
+    :param reverse: if True, the order is reversed
+    :return: a generator of bitmasks
+    """
+    if k == 0:
+        yield 0
+    elif k == n:
+        yield (1 << n) - 1
+    elif not reverse:
+        yield from _revolving_door(n - 1, k)
+        for mask in _revolving_door(n - 1, k - 1, True):
+            yield mask | 1 << (n - 1)
+    else:
+        for mask in _revolving_door(n - 1, k - 1):
+            yield mask | 1 << (n - 1)
+        yield from _revolving_door(n - 1, k, True)
+
+
+@mem_cache(cache_size=20)
+def door_swaps(n):
+    """
+    The revolving-door order of the balanced allocations of n goods, which doesn't depend on the problem
+    :param n: the number of goods
+    :return: a list [first mask, (out, in), (out, in)...] : the mask of the first allocation (bit i is set if
+             good i is allocated to the first agent), then for each step the indices of the good leaving the
+             first agent's bundle & of the good entering it
+    """
+    masks = _revolving_door(n, n // 2)
+    previous = next(masks)
+    result = [previous]
+    for mask in masks:
+        result.append(((previous & ~mask).bit_length() - 1, (mask & ~previous).bit_length() - 1))
+        previous = mask
+    return result
+
+
+class RevolvingDoorScan(object):
+    """
+    Enumerates the allocations of a problem with their Borda scores & ranks, see :meth:`states`
+    """
+
+    def __init__(self, agents, goods):
+        """
+        :param agents: The agents
+        :param goods: The goods
+        """
+        self.agents = agents
+        self.goods = goods
+        n = len(goods)
+        ranks = [[agent.rank(good) for good in goods] for agent in agents]
+        # Borda weights of the goods for balanced bundles, see :meth:`fairdiv.Agent.borda`
+        self._weights = [[n + 1 - r for r in agent_ranks] for agent_ranks in ranks]
+        # The bit of the rank of each good in the rank sets
+        self._rank_bits = [[1 << (r - 1) for r in agent_ranks] for agent_ranks in ranks]
+
+    def rank_set(self, a, mask):
+        """
+        :param a: the index of an agent
+        :param mask: a bitmask over the goods
+        :return: the bitmask whose bit r-1 is set if a good of the mask is ranked r by the agent
+        """
+        return sum([bit for g, bit in enumerate(self._rank_bits[a]) if mask >> g & 1])
+
+    def borda(self, a, mask):
+        """
+        :param a: the index of an agent
+        :param mask: a bitmask over the goods
+        :return: the Borda score of the goods of the mask for the agent
+        """
+        return sum([w for g, w in enumerate(self._weights[a]) if mask >> g & 1])
+
+    def states(self):
+        """
+        Enumerates the allocations, updating their scores at each step
+        :return: a generator of tuples (mask, first agent's Borda score, second agent's Borda score, first
+                 agent's rank set, second agent's rank set), see :meth:`borda` & :meth:`rank_set`. The worst rank
+                 of an agent is the bit length of its rank set.
+        """
+        swaps = door_swaps(len(self.goods))
+        mask = swaps[0]
+        other = ((1 << len(self.goods)) - 1) & ~mask
+        w0, w1 = self._weights
+        bits0, bits1 = self._rank_bits
+        b0, b1 = self.borda(0, mask), self.borda(1, other)
+        r0, r1 = self.rank_set(0, mask), self.rank_set(1, other)
+        yield mask, b0, b1, r0, r1
+        for i in range(1, len(swaps)):
+            out, into = swaps[i]
+            mask ^= 1 << out | 1 << into
+            b0 += w0[into] - w0[out]
+            b1 += w1[out] - w1[into]
+            r0 ^= bits0[out] | bits0[into]
+            r1 ^= bits1[out] | bits1[into]
+            yield mask, b0, b1, r0, r1
+
+    def state(self, X):
+        """
+        :param X: an allocation of the problem
+        :return: its tuple (mask, Borda scores, rank sets), see :meth:`states`
+        """
+        mask = X.to_mask(self.goods) if hasattr(X, "to_mask") else \
+            sum([1 << g for g, good in enumerate(self.goods) if good in X[0]])
+        other = ((1 << len(self.goods)) - 1) & ~mask
+        return mask, self.borda(0, mask), self.borda(1, other), self.rank_set(0, mask), self.rank_set(1, other)
+
+
+def compare_rank_sets(x, y):
+    """
+    Compares the sorted ranks of two bundles of the same size, given as rank sets, like :func:`properties.is_pareto`
+    :param x: a rank set
+    :param y: a rank set
+    :return: a tuple (higher, lower) : higher is True if some i-th best rank of x is better than the i-th best
+             rank of y, lower if some is worse
+    """
+    # The i-th best ranks differ somewhere in favour of y iff y has more of the goods ranked t or better for
+    # some t. Ranks in both sets don't change the difference.
+    higher = lower = False
+    difference = 0
+    diff = x ^ y
+    while diff:
+        low = diff & -diff
+        difference += 1 if y & low else -1
+        if difference > 0:
+            lower = True
+        elif difference < 0:
+            higher = True
+        diff ^= low
+    return higher, lower
+
+
+def _scan(X, M):
+    """
+    :param X: An allocation
+    :param M: The agents
+    :return: a RevolvingDoorScan over the problem X belongs to
+    """
+    return RevolvingDoorScan(M, sorted(list(X[0]) + list(X[1])))
+
+
+def is_pareto(X, A, M):
+    """
+    Revolving-door version of :func:`properties.is_pareto`
+    :param X: An allocation
+    :param A: Ignored, all the possible allocations are considered
+    :param M: The agents
+    :return: True if the allocation verifies the pareto property
+    """
+    scan = _scan(X, M)
+    _, _, _, xa, xb = scan.state(X)
+    for _, _, _, ra, rb in scan.states():
+        result = 0
+        for x, r in ((xa, ra), (xb, rb)):
+            higher, lower = compare_rank_sets(x, r)
+            if higher and not lower:
+                result += 1
+            elif lower and not higher:
+                result -= 1
+        if result < 0:
+            return False
+    return True
+
+
+def is_max_min(X, A, M):
+    """
+    Revolving-door version of :func:`properties.is_max_min`
+    :param X: An allocation
+    :param A: Ignored, all the possible allocations are considered
+    :param M: The agents
+    :return: True if the allocation verifies the max min property
+    """
+    scan = _scan(X, M)
+    _, _, _, xa, xb = scan.state(X)
+    return max(xa, xb).bit_length() == min(max(ra, rb).bit_length() for _, _, _, ra, rb in scan.states())
+
+
+def is_borda_pareto(X, A, M):
+    """
+    Revolving-door version of :func:`properties.is_borda_pareto`
+    :param X: An allocation
+    :param A: Ignored, all the possible allocations are considered
+    :param M: The agents
+    :return: True if X is Borda pareto
+    """
+    scan = _scan(X, M)
+    _, ba, bb, _, _ = scan.state(X)
+    for _, bai, bbi, _, _ in scan.states():
+        if (bai > ba and bbi >= bb) or (bbi > bb and bai >= ba):
+            return False
+    return True
+
+
+def is_maximal_borda_sum(X, A, M):
+    """
+    Revolving-door version of :func:`properties.is_maximal_borda_sum`
+    :param X: An allocation
+    :param A: Ignored, all the possible allocations are considered
+    :param M: The agents
+    :return: True if X is maximal Borda sum
+    """
+    scan = _scan(X, M)
+    _, ba, bb, _, _ = scan.state(X)
+    return ba + bb == max(bai + bbi for _, bai, bbi, _, _ in scan.states())
+
+
+def is_borda_max_min(X, A, M):
+    """
+    Revolving-door version of :func:`properties.is_borda_max_min`
+    :param X: An allocation
+    :param A: Ignored, all the possible allocations are considered
+    :param M: The agents
+    :return: True if allocation is Borda max-min, else False
+    """
+    scan = _scan(X, M)
+    _, ba, bb, _, _ = scan.state(X)
+    return min(ba, bb) == max(min(bai, bbi) for _, bai, bbi, _, _ in scan.states())
+
+
+def is_borda_nash(X, A, M):
+    """
+    Revolving-door version of :func:`properties.is_borda_nash`
+    :param X: An allocation
+    :param A: Ignored, all the possible allocations are considered
+    :param M: The agents
+    :return: True if allocation is Borda-Nash, else False
+    """
+    scan = _scan(X, M)
+    _, ba, bb, _, _ = scan.state(X)
+    return ba * bb == max(bai * bbi for _, bai, bbi, _, _ in scan.states())
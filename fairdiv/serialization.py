@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+Compact storage of allocation sets, used by the file cache (see :mod:`cacheUtils`) & to save benchmark results.
+A set of allocations of one problem is stored as a header (the agents & the goods) followed by the packed
+bitmasks of the allocations (see :meth:`fairdiv.Allocation.to_mask`), instead of one pickled Allocation
+object per allocation.
+Before pickling, equal agents, goods, allocations & tuples are replaced by a single instance, so that pickle writes them
+once & refers to them afterwards.
+"""
+import pickle
+
+FORMAT_VERSION = 1
+# Values left as they are by :func:`intern`
+_SCALARS = frozenset([int, float, str, bytes, bool, type(None)])
+
+
+class PackedAllocations(object):
+    """
+    Allocations of one problem, packed as bitmasks over the goods
+    """
+
+    # What the allocations were stored in : "list", or "set" for an :class:`fairdiv.AllocationSet`. Packs of older
+    # versions don't have it, they hold the outputs of algorithms, which are sets.
+    container = None
+
+    def __init__(self, agents, goods, masks, container="list"):
+        """
+        :param agents: the two agents
+        :param goods: the goods, in the order of the masks' bits
+        :param masks: the masks of the allocations
+        :param container: see :attr:`container`
+        """
+        self.container = container
+        self.agents = tuple(agents)
+        self.goods = tuple(goods)
+        self.width = max(1, (len(goods) + 7) // 8)
+        self.data = b"".join(mask.to_bytes(self.width, "little") for mask in masks)
+
+    def __len__(self):
+        return len(self.data) // self.width
+
+    def masks(self):
+        """
+        :return: the list of the masks
+        """
+        return [int.from_bytes(self.data[i:i + self.width], "little") for i in range(0, len(self.data), self.width)]
+
+    def unpack(self):
+        """
+        :return: the list of the allocations, in the order they were packed
+        """
+        from fairdiv import Allocation
+        return [Allocation.from_mask(self.agents, self.goods, mask) for mask in self.masks()]
+
+    def to_set(self):
+        """
+        :return: the allocations as an :class:`fairdiv.AllocationSet`
+        """
+        from fairdiv import AllocationSet
+        return AllocationSet(self.agents, self.goods, self.masks())
+
+    @staticmethod
+    def pack(allocations):
+        """
+        :param allocations: an iterable of allocations
+        :return: a PackedAllocations object, or None if the allocations are not all Allocation objects of the
+                 same problem
+        """
+        allocations = list(allocations)
+        if len(allocations) == 0 or not all(hasattr(X, "to_mask") for X in allocations):
+            return None
+        first = allocations[0]
+        agents = (first.a1, first.a2)
+        goods = tuple(sorted(first.g1 + first.g2))
+        for X in allocations:
+            if X.a1 != agents[0] or X.a2 != agents[1] or tuple(sorted(X.g1 + X.g2)) != goods:
+                return None
+        return PackedAllocations(agents, goods, [X.to_mask(goods) for X in allocations])
+
+
+# fairdiv.AllocationSet, imported on first use since fairdiv imports the caches
+_allocation_set = None
+
+
+def is_allocation_set(value):
+    """
+    :return: True if value is an :class:`fairdiv.AllocationSet`
+    """
+    global _allocation_set
+    if _allocation_set is None:
+        from fairdiv import AllocationSet
+        _allocation_set = AllocationSet
+    return isinstance(value, _allocation_set)
+
+
+def intern(obj, table):
+    """
+    Replaces equal sub-objects by a single instance. Live agents & allocations are not modified, equal copies
+    are used.
+    :param obj: a value, tuples & lists are processed recursively
+    :param table: a dict identifying the single instances, shared by the calls of a same pickling
+    :return: the value with its sub-objects replaced
+    """
+    if type(obj) in _SCALARS:
+        # Pickle gains nothing from sharing them
+        return obj
+    if isinstance(obj, list):
+        return [intern(item, table) for item in obj]
+    if isinstance(obj, PackedAllocations):
+        obj.agents = intern(obj.agents, table)
+        obj.goods = intern(obj.goods, table)
+        return obj
+    if isinstance(obj, tuple):
+        if all([type(item) in _SCALARS for item in obj]):
+            return obj
+        items = tuple([intern(item, table) for item in obj])
+        # Items are single instances at this point, so they are identified by their id. Comparing them
+        # by value would mix up True & 1.
+        return table.setdefault(("tuple", ) + tuple([id(item) for item in items]), items)
+    if hasattr(obj, "to_mask"):
+        parts = [intern(part, table) for part in (obj.a1, obj.g1, obj.a2, obj.g2)]
+        key = ("allocation", ) + tuple([id(part) for part in parts])
+        if key not in table:
+            table[key] = type(obj)(*parts)
+        return table[key]
+    if hasattr(obj, "preferences"):
+        preferences = [intern(good, table) for good in obj.preferences]
+        key = ("agent", obj.name) + tuple([id(good) for good in preferences])
+        if key not in table:
+            table[key] = type(obj)(obj.name, preferences)
+        return table[key]
+    try:
+        return table.setdefault((type(obj), obj), obj)
+    except TypeError:
+        return obj
+
+
+def _pack(value):
+    """
+    :param value: a cached value
+    :return: the value packed if it is a list or an :class:`fairdiv.AllocationSet` of allocations, else the value
+    """
+    if isinstance(value, list):
+        packed = PackedAllocations.pack(value)
+        if packed is not None:
+            return packed
+    elif is_allocation_set(value):
+        return PackedAllocations(value.agents, value.goods, value.masks(), "set")
+    return value
+
+
+def compact(values):
+    """
+    :param values: a dict args key -> cached value, see :class:`cacheUtils.Database`
+    :return: an equal dict ready to be pickled, lists & :class:`fairdiv.AllocationSet` of allocations being packed
+    """
+    table = dict()
+    compacted = dict()
+    for key, value in values.items():
+        # Keys of scalars & scalar values, which intern would return as they are, are kept without a call
+        if type(key) is not tuple or not all([type(item) in _SCALARS for item in key]):
+            key = intern(key, table)
+        if type(value) not in _SCALARS:
+            value = intern(_pack(value), table)
+        compacted[key] = value
+    return compacted
+
+
+def repack(values):
+    """
+    Packs the values loaded from a file, without interning them again : keys & values read from a pickle already
+    share their equal sub-objects, & packed values are kept as they are
+    :param values: a dict args key -> cached value, see :func:`load_all`
+    :return: an equal dict ready to be pickled
+    """
+    return {key: value if isinstance(value, PackedAllocations) else _pack(value) for key, value in values.items()}
+
+
+def expand(value):
+    """
+    :param value: a value stored by :func:`compact`
+    :return: the original value
+    """
+    if isinstance(value, PackedAllocations):
+        return value.unpack() if value.container == "list" else value.to_set()
+    return value
+
+
+def upgrade_sets(values):
+    """
+    Turns the results of a function returning :class:`fairdiv.AllocationSet` stored by older versions, lists of
+    allocations or packs of lists, into sets
+    :param values: a dict args key -> cached value, the args being (agents, goods)
+    :return: the dict, modified in place
+    """
+    from fairdiv import AllocationSet
+    for key, value in values.items():
+        if isinstance(value, list):
+            values[key] = AllocationSet.from_allocations(key[0], key[1], value)
+        elif isinstance(value, PackedAllocations):
+            value.container = "set"
+    return values
+
+
+def load_segments(f):
+    """
+    Loads the successive pickles of a file : the file cache appends the new results of each run, & older
+    versions of it appended the whole dictionary
+    :param f: a file opened in binary mode
+    :return: a tuple (union of the dictionaries, the later ones having priority, number of dictionaries)
+    """
+    result = dict()
+    segments = 0
+    while True:
+        try:
+            values = pickle.load(f)
+        except (EOFError, pickle.UnpicklingError, ValueError, IndexError):
+            return result, segments
+        if not isinstance(values, dict):
+            return result, segments
+        result.update(values)
+        segments += 1
+
+
+def load_all(f):
+    """
+    :param f: a file opened in binary mode
+    :return: the union of the dictionaries pickled in the file, see :func:`load_segments`
+    """
+    return load_segments(f)[0]
+
+
+def dump_result(result, f):
+    """
+    Writes the result of :meth:`statistics.Benchmark.run` to a file, allocations being packed & boolean
+    property values stored as bits
+    :param result: a dict algorithm name -> {problem -> Statistics}
+    :param f: a file opened in binary mode
+    """
+    table = dict()
+    packed = dict()
+    for name, stats in result.items():
+        packed[name] = dict()
+        for problem, statistics in stats.items():
+            rows = statistics.data
+            keys = list(statistics.functions)
+            values = [[row[k] for k in keys] for row in rows]
+            if all(isinstance(v, bool) for row in values for v in row):
+                values = [sum(1 << i for i, v in enumerate(row) if v) for row in values]
+            packed[name][problem] = intern((
+                PackedAllocations.pack([row[statistics.A_KEY] for row in rows]), tuple(statistics.agents),
+                tuple(keys), values, statistics.count, dict(statistics.satisfied), statistics.instrumentation,
+                None if statistics.timeout is None else str(statistics.timeout)
+            ), table)
+    pickle.dump({"version": FORMAT_VERSION, "result": packed}, f, pickle.HIGHEST_PROTOCOL)
+
+
+def load_result(f):
+    """
+    Reads a file written by :func:`dump_result`
+    :param f: a file opened in binary mode
+    :return: a dict algorithm name -> {problem -> Statistics}. The statistics hold the data, counters &
+             instrumentation of the saved ones, but neither the possible allocations nor the functions, so
+             no allocation can be added to them. A timeout is restored as its message.
+    """
+    from statistics import Statistics
+    data = pickle.load(f)
+    if data.get("version") != FORMAT_VERSION:
+        raise ValueError("Unsupported benchmark result format")
+    result = dict()
+    for name, stats in data["result"].items():
+        result[name] = dict()
+        for problem, packed in stats.items():
+            allocations, agents, keys, values, count, satisfied, instrumentation, timeout = packed
+            statistics = Statistics(None, agents, dict.fromkeys(keys))
+            allocations = [] if allocations is None else allocations.unpack()
+            for i, alloc in enumerate(allocations):
+                row = {Statistics.A_KEY: alloc}
+                if isinstance(values[i], list):
+                    row.update(zip(keys, values[i]))
+                else:
+                    row.update((k, bool(values[i] >> j & 1)) for j, k in enumerate(keys))
+                statistics._data.append(row)
+            statistics.count = count
+            statistics.satisfied = satisfied
+            statistics.instrumentation = instrumentation
+            statistics.timeout = timeout
+            result[name][problem] = statistics
+    return result
@@ -1,12 +1,166 @@
 # -*- coding: utf-8 -*-
-from fairdiv import Allocation
+import collections.abc
+from fairdiv import Allocation, AllocationView
+from cacheUtils import Database
+from propertyRegistry import DEFAULT_REGISTRY
+from instrumentation import Instrumentation
+from budget import Budget, BudgetExceeded
+from fusedEvaluator import FusedEvaluator, fused_keys
+try:
+    import batch
+except ImportError:
+    # Without NumPy, allocations are always checked one at a time
+    batch = None
+
+# The number of allocations of a problem from which properties with a vectorized version (see
+# :data:`batch.BATCH_PROPERTIES`) are checked all at once
+BATCH_THRESHOLD = 100
+
+
+def _batch_keys(functions):
+    """
+    :return: the keys of the functions that have a vectorized version, see :func:`batch.batch_keys`
+    """
+    return dict() if batch is None else batch.batch_keys(functions)
+
+
+class PropertyTable(object):
+    """
+    Stores the values of properties for the allocations of one problem, so that they are computed only once
+    even if several algorithms return the same allocation.
+    Allocations are identified by their bitmask over the goods (see :meth:`fairdiv.Allocation.to_mask`).
+    The properties that scan the possible allocations are computed together by a
+    :class:`fusedEvaluator.FusedEvaluator`, built the first time one of them is needed.
+    """
+
+    def __init__(self, allocs, agents, goods, functions, registry=DEFAULT_REGISTRY):
+        """
+        :param allocs: All possible allocations
+        :param agents: Agents
+        :param goods: Goods of the problem
+        :param functions: a dict key -> function, see :class:`Statistics`
+        :param registry: the registry used to evaluate the functions, see :class:`Statistics`
+        """
+        self.allocs = allocs
+        self.agents = agents
+        self.goods = goods
+        self.functions = functions
+        self.registry = registry
+        self._rows = dict()
+        self._fused = None
+        self._possible_masks = None
+
+    def __len__(self):
+        return len(self._rows)
+
+    def values(self, alloc, keys=None):
+        """
+        Retrieves property values of an allocation, computing the ones that are not known yet
+        :param alloc: an allocation of the problem
+        :param keys: the keys of the desired properties, all of them if None
+        :return: a dict key -> value
+        """
+        if keys is None:
+            keys = self.functions.keys()
+        row = self._rows.setdefault(alloc.to_mask(self.goods), dict())
+        missing = {k: self.functions[k] for k in keys if k not in row}
+        fused = fused_keys(missing)
+        if len(fused) > 0:
+            if self._fused is None:
+                self._fused = FusedEvaluator.build(self.allocs, self.agents, self.goods)
+            values = self._fused.values(alloc, set(fused.values()))
+            row.update({k: values[name] for k, name in fused.items()})
+            missing = {k: func for k, func in missing.items() if k not in fused}
+        if len(missing) > 0:
+            row.update(self.registry.evaluate(missing, alloc, self.allocs, self.agents))
+        return {k: row[k] for k in keys}
+
+    def prefetch(self, allocations, keys=None):
+        """
+        Computes at once, with NumPy, the properties having a vectorized version (see :mod:`batch`) for many
+        allocations. Nothing is done for less than :data:`BATCH_THRESHOLD` allocations, or if the allocations
+        are not balanced, the values being computed when retrieved in this case.
+        :param allocations: allocations of the problem
+        :param keys: the keys of the desired properties, all of them if None
+        """
+        if keys is None:
+            keys = self.functions.keys()
+        batched = _batch_keys({k: self.functions[k] for k in keys})
+        n = len(self.goods)
+        if len(batched) == 0 or n % 2 == 1 or n > 64:
+            return
+        masks = []
+        for alloc in allocations:
+            if len(alloc[0]) != n // 2:
+                return
+            mask = alloc.to_mask(self.goods)
+            if any(k not in self._rows.get(mask, ()) for k in batched):
+                masks.append(mask)
+        masks = list(dict.fromkeys(masks))
+        if len(masks) < BATCH_THRESHOLD or self._possible() is None:
+            return
+        if Budget.active:
+            # As many comparisons as the scalar versions
+            Budget.tick(len(masks) * len(self._possible_masks))
+        with Instrumentation.timer("property.batch"):
+            ranks = batch.ranks_from_agents(self.agents, self.goods)
+            for name in set(batched.values()):
+                values = batch.BATCH_PROPERTIES[name](ranks, masks, self._possible_masks)
+                for mask, value in zip(masks, values):
+                    row = self._rows.setdefault(mask, dict())
+                    row.update({k: bool(value) for k, other in batched.items() if other == name})
+
+    def _possible(self):
+        """
+        :return: the masks of the possible allocations, None if they are not all balanced
+        """
+        if self._possible_masks is None:
+            if isinstance(self.allocs, AllocationView) and self.allocs.goods == self.goods:
+                masks = self.allocs.masks()
+            else:
+                masks = [Y.to_mask(self.goods) for Y in self.allocs]
+            if all(bin(mask).count("1") == len(self.goods) // 2 for mask in masks):
+                self._possible_masks = masks
+        return self._possible_masks
+
+
+class LazyRow(collections.abc.Mapping):
+    """
+    The result of an allocation added to a lazy :class:`Statistics` object, like the dicts of eager ones. The
+    value of a property is computed when it is first read.
+    """
+
+    def __init__(self, statistics, alloc):
+        """
+        :param statistics: the Statistics object
+        :param alloc: the allocation
+        """
+        self._statistics = statistics
+        self._alloc = alloc
+
+    def __getitem__(self, key):
+        if key == Statistics.A_KEY:
+            return self._alloc
+        if key not in self._statistics.functions:
+            raise KeyError(key)
+        return self._statistics._values(self._alloc, [key])[key]
+
+    def __iter__(self):
+        yield Statistics.A_KEY
+        yield from self._statistics.functions
+
+    def __len__(self):
+        return len(self._statistics.functions) + 1
+
+    def __repr__(self):
+        return dict(self).__repr__()
 
 
 class Statistics(object):
 
     A_KEY = "Allocation"
 
-    def __init__(self, allocs, agents, functions):
+    def __init__(self, allocs, agents, functions, registry=DEFAULT_REGISTRY, table=None, keep_data=True, lazy=False):
         """
         Create a new object Statistics, storing allocations for all agents in `agents`.
 
@@ -15,29 +169,156 @@ class Statistics(object):
         :param functions: a dict key -> function that will be applied to new allocations (see
         :meth:`add`). Functions must take these arguments : alloc, all_allocs, agents. Use lambda if
         some parameters aren't used.
+        :param registry: a :class:`propertyRegistry.PropertyRegistry` used to skip the functions whose
+        result can be inferred from the others. Functions that are not registered are always applied.
+        :param table: an optional :class:`PropertyTable` of the same problem & functions, shared with other
+        Statistics objects. Values already in the table are not computed again. Without a table, the properties
+        that scan the possible allocations are still computed in a single pass & the ones with a vectorized
+        version can be checked at once (see :class:`PropertyTable`).
+        :param keep_data: if False, the result of each allocation is not stored, only the counters
+        (see :attr:`count` & :attr:`satisfied`) are updated.
+        :param lazy: if True, the functions are only applied when their result is read : the rows of :attr:`data`
+        are :class:`LazyRow` objects & reading :attr:`satisfied` applies all of them. Results are computed
+        once per allocation & function. See also :meth:`materialize`. Ignored if keep_data is False.
         """
         self.allocs = allocs
         self.agents = agents
         self.functions = functions
+        self.registry = registry
+        self.table = table
+        self.keep_data = keep_data
+        # What instrumentation recorded while the allocations were computed & added, if it was enabled
+        self.instrumentation = None
+        # The BudgetExceeded exception if the benchmark cancelled the algorithm, the data is then partial
+        self.timeout = None
+        self.lazy = lazy and keep_data
+        self.count = 0
+        self._satisfied = {k: 0 for k in functions}
         self._data = []
+        # Allocations added lazily, not counted in satisfied yet
+        self._pending = []
+        # The properties that scan the possible allocations or have a vectorized version, computed by a table of
+        # this object if no table is shared. If lazy, all of them are, so that they are computed once.
+        if table is not None:
+            self._table_keys = dict()
+        elif self.lazy:
+            self._table_keys = dict.fromkeys(functions)
+        else:
+            self._table_keys = dict(fused_keys(functions), **_batch_keys(functions))
+        self._own_table = None
 
     @property
     def data(self):
         return self._data[:]
 
+    @property
+    def satisfied(self):
+        """
+        :return: a dict key -> number of added allocations for which the function returned a true value
+        """
+        if len(self._pending) > 0:
+            pending, self._pending = self._pending, []
+            self._prefetch(pending, self.functions.keys())
+            for alloc in pending:
+                self._count(self._values(alloc, self.functions.keys()))
+        return self._satisfied
+
+    @satisfied.setter
+    def satisfied(self, satisfied):
+        self._satisfied = satisfied
+
+    def _count(self, result):
+        for k in self.functions:
+            if result[k]:
+                self._satisfied[k] += 1
+
+    def _values(self, alloc, keys):
+        """
+        :param alloc: an allocation of the problem
+        :param keys: keys of functions
+        :return: a dict key -> result of the function for the allocation
+        """
+        table = self._table(alloc)
+        if table is self.table:
+            return self.table.values(alloc, keys)
+        values = dict()
+        if table is not None:
+            values.update(table.values(alloc, [k for k in keys if k in self._table_keys]))
+        others = {k: self.functions[k] for k in keys if k not in self._table_keys}
+        values.update(self.registry.evaluate(others, alloc, self.allocs, self.agents))
+        return {k: values[k] for k in keys}
+
+    def materialize(self, keys=None):
+        """
+        Applies functions to all the added allocations at once, so that reading their results later costs nothing.
+        Properties with a vectorized version are checked for all the allocations together (see
+        :meth:`PropertyTable.prefetch`).
+        :param keys: the keys of the functions to apply, all of them if None
+        """
+        if keys is None:
+            keys = list(self.functions.keys())
+        allocations = [row[self.A_KEY] for row in self._data]
+        self._prefetch(allocations, keys)
+        for alloc in allocations:
+            self._values(alloc, keys)
+
     def add(self, alloc):
         """
         Add a new allocation to the ones stored. All functions will be applied and result will be
         stored as a dict, keys being the same as the ones provided in the constructor.
+        The counters are also updated : :attr:`count` is the number of added allocations & :attr:`satisfied`
+        the number of allocations for which each function returned a true value.
+        If the object is lazy, the functions are applied later, see :class:`LazyRow`.
 
         :param alloc: the allocation to add
         """
+        self.count += 1
+        if self.lazy:
+            self._pending.append(alloc)
+            self._data.append(LazyRow(self, alloc))
+            return
         result = {
             self.A_KEY: alloc
         }
-        for k, v in self.functions.items():
-            result[k] = v(alloc, self.allocs, self.agents)
-        self._data.append(result)
+        result.update(self._values(alloc, self.functions.keys()))
+        self._count(result)
+        if self.keep_data:
+            self._data.append(result)
+
+    def add_all(self, allocations):
+        """
+        Adds several allocations, see :meth:`add`. The properties with a vectorized version are checked for all
+        of them at once (see :meth:`PropertyTable.prefetch`).
+
+        :param allocations: an iterable of allocations
+        """
+        allocations = list(allocations)
+        if not self.lazy:
+            self._prefetch(allocations, self.functions.keys())
+        for alloc in allocations:
+            self.add(alloc)
+
+    def _prefetch(self, allocations, keys):
+        """
+        Checks the properties with a vectorized version for several allocations at once, if a table computes them
+        """
+        if len(allocations) > 0:
+            table = self._table(allocations[0])
+            if table is not None:
+                table.prefetch(allocations, [k for k in keys if table is self.table or k in self._table_keys])
+
+    def _table(self, alloc):
+        """
+        :param alloc: an allocation of the problem
+        :return: the shared table, else the table of this object if some properties are computed by one, else None
+        """
+        if self.table is not None:
+            return self.table
+        if len(self._table_keys) > 0 and self._own_table is None:
+            goods = self.allocs.goods if isinstance(self.allocs, AllocationView) else list(alloc[0]) + list(alloc[1])
+            self._own_table = PropertyTable(self.allocs, self.agents, goods,
+                                            {k: self.functions[k] for k in self._table_keys}, self.registry)
+        return self._own_table
 
     def formatted_text(self):
         """
@@ -61,12 +342,164 @@ class Statistics(object):
         return self.formatted_text()
 
 
+class Aggregate(object):
+    """
+    Counters & histograms summing up the results of a benchmark per (algorithm, property, problem size), without
+    keeping the allocations. Aggregates of different runs (e.g. run by different workers) can be merged.
+    """
+
+    def __init__(self):
+        # (algorithm, size) -> number of problems
+        self.problems = dict()
+        # (algorithm, size) -> number of allocations returned
+        self.outputs = dict()
+        # (algorithm, size) -> {number of allocations returned for a problem -> number of problems}
+        self.output_sizes = dict()
+        # (algorithm, property, size) -> number of allocations returned satisfying the property
+        self.satisfied = dict()
+        # (algorithm, property, size) -> {number of allocations of a problem satisfying it -> number of problems}
+        self.distributions = dict()
+        # algorithm -> instrumentation snapshot summed over the problems
+        self.instrumentation = dict()
+        # (algorithm, size) -> number of problems on which the algorithm exceeded its budget
+        self.timeouts = dict()
+
+    @staticmethod
+    def _increment(counters, key, value=1):
+        counters[key] = counters.get(key, 0) + value
+
+    def add(self, algorithm, size, count, satisfied):
+        """
+        Adds the results of an algorithm on one problem
+        :param algorithm: the name of the algorithm
+        :param size: the number of goods of the problem
+        :param count: the number of allocations returned by the algorithm
+        :param satisfied: a dict property -> number of returned allocations satisfying it
+        """
+        self._increment(self.problems, (algorithm, size))
+        self._increment(self.outputs, (algorithm, size), count)
+        self._increment(self.output_sizes.setdefault((algorithm, size), dict()), count)
+        for k, v in satisfied.items():
+            self._increment(self.satisfied, (algorithm, k, size), v)
+            self._increment(self.distributions.setdefault((algorithm, k, size), dict()), v)
+
+    def add_statistics(self, algorithm, size, statistics):
+        """
+        Adds the results of an algorithm on one problem from a :class:`Statistics` object
+        :param algorithm: the name of the algorithm
+        :param size: the number of goods of the problem
+        :param statistics: the Statistics object the algorithm's allocations were added to. If the algorithm
+        was cancelled, only the timeout & the instrumentation are added.
+        """
+        if statistics.timeout is not None:
+            self._increment(self.timeouts, (algorithm, size))
+        else:
+            self.add(algorithm, size, statistics.count, statistics.satisfied)
+        if statistics.instrumentation is not None:
+            self.add_instrumentation(algorithm, statistics.instrumentation)
+
+    def add_instrumentation(self, algorithm, snapshot):
+        """
+        Adds what instrumentation recorded for an algorithm
+        :param algorithm: the name of the algorithm
+        :param snapshot: an instrumentation snapshot (see :meth:`instrumentation.Instrumentation.snapshot`)
+        """
+        self.instrumentation[algorithm] = Instrumentation.merge(
+            [self.instrumentation.get(algorithm, {"counters": dict(), "timers": dict()}), snapshot]
+        )
+
+    def merge(self, other):
+        """
+        Adds the counters of another aggregate to this one
+        :param other: an Aggregate
+        :return: this aggregate
+        """
+        for counters, other_counters in ((self.problems, other.problems), (self.outputs, other.outputs),
+                                         (self.satisfied, other.satisfied), (self.timeouts, other.timeouts)):
+            for key, value in other_counters.items():
+                self._increment(counters, key, value)
+        for histograms, other_histograms in ((self.output_sizes, other.output_sizes),
+                                             (self.distributions, other.distributions)):
+            for key, histogram in other_histograms.items():
+                for value, number in histogram.items():
+                    self._increment(histograms.setdefault(key, dict()), value, number)
+        for algorithm, snapshot in other.instrumentation.items():
+            self.add_instrumentation(algorithm, snapshot)
+        return self
+
+    _COUNTERS = ("problems", "outputs", "satisfied", "timeouts")
+    _HISTOGRAMS = ("output_sizes", "distributions")
+
+    def to_dict(self):
+        """
+        :return: the counters as a dict of lists, that can be written as JSON (see :meth:`from_dict`)
+        """
+        result = {name: [list(key) + [value] for key, value in getattr(self, name).items()]
+                  for name in self._COUNTERS}
+        for name in self._HISTOGRAMS:
+            result[name] = [list(key) + [[[v, n] for v, n in histogram.items()]]
+                            for key, histogram in getattr(self, name).items()]
+        result["instrumentation"] = self.instrumentation
+        return result
+
+    @staticmethod
+    def from_dict(data):
+        """
+        :param data: a dict returned by :meth:`to_dict`
+        :return: an Aggregate
+        """
+        result = Aggregate()
+        for name in Aggregate._COUNTERS:
+            getattr(result, name).update({tuple(item[:-1]): item[-1] for item in data[name]})
+        for name in Aggregate._HISTOGRAMS:
+            getattr(result, name).update({tuple(item[:-1]): {v: n for v, n in item[-1]} for item in data[name]})
+        result.instrumentation.update(data["instrumentation"])
+        return result
+
+    def fraction(self, algorithm, prop, size):
+        """
+        :param algorithm: the name of an algorithm
+        :param prop: the key of a property
+        :param size: a problem size
+        :return: the fraction of the allocations returned by the algorithm that satisfy the property
+        """
+        outputs = self.outputs.get((algorithm, size), 0)
+        if outputs == 0:
+            return None
+        return self.satisfied.get((algorithm, prop, size), 0) / outputs
+
+    def formatted_text(self):
+        """
+        Get a string formatted to print results
+
+        :return: a formatted string
+        :rtype: str
+        """
+        result = "Aggregate:\n"
+        for algorithm, size in sorted(self.problems):
+            result += "\t{} ({} goods): {} problems, {} allocations\n".format(
+                algorithm, size, self.problems[(algorithm, size)], self.outputs[(algorithm, size)]
+            )
+            result += "".join(
+                ["\t\t{}: {:.3f}\n".format(k, self.fraction(algorithm, k, size))
+                 for a, k, s in sorted(self.satisfied) if a == algorithm and s == size and
+                 self.fraction(algorithm, k, size) is not None]
+            )
+        for (algorithm, size), timeouts in sorted(self.timeouts.items()):
+            result += "\t{} ({} goods): {} timeouts\n".format(algorithm, size, timeouts)
+        return result
+
+    def __repr__(self):
+        return self.formatted_text()
+
+
 class Benchmark(object):
     """
     This class is used to benchmark the different algorithms on various problem.
     A benchmark is defined by problems, the algorithms to run on those problems & the properties to test on the solutions
     """
-    def __init__(self, problems, algorithms, properties):
+    def __init__(self, problems, algorithms, properties, registry=DEFAULT_REGISTRY, time_limit=None,
+                 node_limit=None, lazy=False):
         """
         Initializes a benchmark.
         :param problems: The problems that the benchmark should be run on. Should be an iterable of tuples (agents, goods)
@@ -77,29 +510,115 @@ class Benchmark(object):
         :param properties: The properties to test, a dict key -> function that will be applied to new allocations.
         Functions must take these arguments : alloc, all_allocs, agents. Use lambda if some parameters aren't used.
         :type properties: dict
+        :param registry: the registry used by the statistics objects (see :class:`Statistics`)
+        :type registry: propertyRegistry.PropertyRegistry
+        :param time_limit: the maximal time in seconds of each (algorithm, problem), properties evaluation included.
+        None for no limit.
+        :param node_limit: the maximal number of search nodes of each (algorithm, problem), see
+        :class:`budget.Budget`. None for no limit.
+        Algorithms exceeding their budget are cancelled & their statistics object is marked with the timeout
+        (see :attr:`Statistics.timeout`), the benchmark goes on with the next one.
+        :param lazy: if True, the statistics objects returned by :meth:`run` are lazy (see :class:`Statistics`) : the
+        properties are only evaluated when read, outside of the budget of the algorithms.
         """
         self.problems = problems
         self.algorithms = algorithms
         self.properties = properties
+        self.registry = registry
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.lazy = lazy
 
-    def run(self):
+    def run(self, aggregate=False):
         """
         Runs the benchmark
+        :param aggregate: if True, only counters are kept instead of the results of each allocation
         :return: A dictionary where the keys are the qualnames of the algorithms & the values are also dictionaries
-        problem -> statistics object
+        problem -> statistics object. If aggregate is True, an :class:`Aggregate` object.
         """
-        result = dict()
-        for name, algo in self.algorithms.items():
-            result[name] = dict()
-            for problem in self.problems:
-                allocations = Allocation.generate_all_allocations(*problem)
-                result[name][str(problem[0][1].preferences)] = Statistics(
+        if aggregate:
+            return self.run_aggregate()
+        result = {name: dict() for name in self.algorithms}
+        for problem in self.problems:
+            allocations = Allocation.view(*problem)
+            # Algorithms often return the same allocations, their properties are shared through this table
+            table = PropertyTable(allocations, problem[0], problem[1], self.properties, self.registry)
+            for name, algo in self.algorithms.items():
+                statistics = Statistics(
                     allocations,
                     problem[0],
-                    self.properties
+                    self.properties,
+                    self.registry,
+                    table,
+                    lazy=self.lazy
                 )
-                for solution in algo(*problem):
-                    result[name][str(problem[0][1].preferences)].add(solution)
+                self._run_algorithm(name, algo, problem, statistics, self.time_limit, self.node_limit)
+                result[name][str(problem[0][1].preferences)] = statistics
+        return result
+
+    @staticmethod
+    def collect_instrumentation(result):
+        """
+        Sums up what instrumentation recorded during a run
+        :param result: the result of :meth:`run`
+        :return: a dict algorithm name -> instrumentation snapshot summed over the problems
+        """
+        return {
+            name: Instrumentation.merge([s.instrumentation for s in stats.values() if s.instrumentation is not None])
+            for name, stats in result.items()
+        }
+
+    @staticmethod
+    def timeouts(result):
+        """
+        :param result: the result of :meth:`run`
+        :return: a list of (algorithm name, problem) of the cancelled runs
+        """
+        return [(name, problem) for name, stats in result.items()
+                for problem, statistics in stats.items() if statistics.timeout is not None]
+
+    @staticmethod
+    def _run_algorithm(name, algo, problem, statistics, time_limit=None, node_limit=None):
+        """
+        Runs an algorithm on a problem & adds the allocations it returns to a statistics object. If
+        instrumentation is enabled, what it records meanwhile is stored in the statistics object, even if
+        the algorithm is cancelled.
+        :param name: the name of the algorithm
+        :param algo: the algorithm
+        :param problem: the problem
+        :param statistics: the Statistics object
+        :param time_limit: the maximal time in seconds, None for no limit
+        :param node_limit: the maximal number of search nodes, None for no limit
+        """
+        # Other threads may be running benchmarks, only what this one records is kept
+        before = Instrumentation.snapshot(True) if Instrumentation.enabled else None
+        try:
+            with Budget.limit(time_limit, node_limit):
+                with Instrumentation.timer("algorithm.{}".format(name)):
+                    solutions = algo(*problem)
+                statistics.add_all(solutions)
+        except BudgetExceeded as e:
+            statistics.timeout = e
+            if Instrumentation.enabled:
+                Instrumentation.count("budget.timeouts")
+        if before is not None:
+            statistics.instrumentation = Instrumentation.since(before, True)
+
+    def run_aggregate(self):
+        """
+        Runs the benchmark, keeping only counters. The file cache is bypassed (see :meth:`cacheUtils.Database.bypass`),
+        so memory only grows until the memory caches, whose sizes are bounded, are full.
+        :return: an :class:`Aggregate` object
+        """
+        result = Aggregate()
+        with Database.bypass():
+            for problem in self.problems:
+                allocations = Allocation.view(*problem)
+                table = PropertyTable(allocations, problem[0], problem[1], self.properties, self.registry)
+                for name, algo in self.algorithms.items():
+                    statistics = Statistics(allocations, problem[0], self.properties, self.registry, table, False)
+                    self._run_algorithm(name, algo, problem, statistics, self.time_limit, self.node_limit)
+                    result.add_statistics(name, len(problem[1]), statistics)
         return result
 
 
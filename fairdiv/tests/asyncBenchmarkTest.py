@@ -0,0 +1,58 @@
+from fairdiv import *
+from fairdiv.problemGenerators import generate_possible_problems
+from asyncBenchmark import AsyncBenchmark
+from propertyRegistry import DEFAULT_REGISTRY, PropertyRegistry
+from statistics import Benchmark
+import algorithm
+import asyncio
+import concurrent.futures
+
+
+async def consume_slowly(driver, window):
+    results = []
+    async for result in driver.results():
+        # Tasks are only submitted when results are consumed
+        assert driver.submitted - driver.completed <= window
+        await asyncio.sleep(0.01)
+        results.append(result)
+    return results
+
+
+async def stop_early(driver):
+    async for _ in driver.results():
+        break
+
+
+if __name__ == "__main__":
+    problems = generate_possible_problems(6)[::40]
+    algorithms = {"os": algorithm.original_sequential, "bu": algorithm.bottom_up}
+    functions = DEFAULT_REGISTRY.functions(["is_pareto", "is_envy_free", "is_borda_pareto"])
+    benchmark = Benchmark(problems, algorithms, functions)
+    expected = benchmark.run()
+
+    with concurrent.futures.ProcessPoolExecutor(2) as executor:
+        result = asyncio.run(AsyncBenchmark(benchmark, executor=executor).run())
+        for name in algorithms:
+            assert result[name].keys() == expected[name].keys()
+            for problem, statistics in result[name].items():
+                assert statistics.data == expected[name][problem].data
+                assert statistics.satisfied == expected[name][problem].satisfied
+
+        driver = AsyncBenchmark(benchmark, max_in_flight=3, executor=executor)
+        results = asyncio.run(consume_slowly(driver, 3))
+        assert len(results) == driver.completed == len(problems) * len(algorithms)
+
+        # Problems can be generated as tasks are submitted, stopping the iteration stops the submissions
+        driver = AsyncBenchmark(Benchmark((p for p in problems), algorithms, functions), max_in_flight=2,
+                                executor=executor)
+        asyncio.run(stop_early(driver))
+        assert driver.completed == 1 and driver.submitted <= 3
+
+    # Configurations the workers can't honour are refused rather than ignored
+    for unsupported in (Benchmark(problems, algorithms, functions, registry=PropertyRegistry()),
+                        Benchmark(problems, algorithms, functions, lazy=True)):
+        try:
+            AsyncBenchmark(unsupported)
+            assert False
+        except ValueError:
+            pass
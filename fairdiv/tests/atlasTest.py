@@ -0,0 +1,38 @@
+import os
+import tempfile
+from fairdiv import *
+from fairdiv.problemGenerators import generate_possible_problems, lehmer_index, permutation_from_index
+import algorithm
+import atlas
+import monteCarlo
+
+
+if __name__ == "__main__":
+    for n in (3, 5):
+        for index in range(0, 120 if n == 5 else 6, 7):
+            assert lehmer_index(permutation_from_index(n, index)) == index
+    problems = generate_possible_problems(6)
+    assert all(atlas.problem_index(agents) == i for i, (agents, goods) in enumerate(problems))
+
+    with tempfile.TemporaryDirectory() as directory:
+        problems = generate_possible_problems(4)
+        path = atlas.build(4, os.path.join(directory, "atlas-4.bin"))
+        with atlas.Atlas(path) as a:
+            assert a.n == 4 and a.problems == len(problems)
+            assert a.algorithms == list(atlas.ALGORITHMS)
+            for agents, goods in problems:
+                for name, algo in atlas.ALGORITHMS.items():
+                    expected = set(algo(agents, goods))
+                    assert a.allocations(name, agents, goods) == expected
+                    for X, verdicts in a.verdicts(name, agents, goods).items():
+                        assert verdicts == {k: f(X, None, agents) for k, f in monteCarlo.PROPERTIES.items()}
+
+            # Problems where the first agent doesn't rank the goods in order are relabelled
+            agents, goods = problems[10]
+            goods = goods[::-1]
+            swapped = (Agent("A", goods[:]), Agent("B", [goods[3 - int(g.name)] for g in agents[1].preferences]))
+            assert a.allocations("bottom_up", swapped, goods) == set(algorithm.bottom_up(swapped, goods))
+            # Other sizes are computed
+            wrapped = a.wrap("trump_algorithm", algorithm.trump_algorithm)
+            agents, goods = generate_possible_problems(6)[5]
+            assert set(wrapped(agents, goods)) == set(algorithm.trump_algorithm(agents, goods))
@@ -0,0 +1,71 @@
+from fairdiv import *
+from fairdiv.problemGenerators import generate_possible_problems
+import algorithm
+import batch
+import monteCarlo
+import properties
+import random
+import statistics
+from propertyRegistry import DEFAULT_REGISTRY
+from statistics import Statistics, PropertyTable
+
+
+if __name__ == "__main__":
+    for n in (2, 4, 6):
+        problems = generate_possible_problems(n)
+        profiles = batch.possible_profiles(n)
+        assert (profiles == batch.profiles_from_problems(problems)).all()
+        assert sum(len(chunk) for chunk in batch.possible_profiles(n, chunk_size=7)) == len(problems)
+
+        results = batch.run_batch(profiles)
+        max_min = batch.batch_max_min_rank(profiles)
+        for p, (agents, goods) in enumerate(problems):
+            assert max_min[p] == max_min_rank(agents, goods)
+
+            masks, valid = results["bottom_up"]
+            assert batch.masks_to_allocations(masks[p], valid[p], agents, goods) == \
+                set(algorithm.bottom_up(agents, goods))
+
+            masks, valid = results["trump_algorithm"]
+            if valid[p][1]:
+                assert batch.masks_to_allocations(masks[p], valid[p], agents, goods) == \
+                    set(algorithm.trump_algorithm(agents, goods))
+
+            for alloc in batch.masks_to_allocations(masks[p], valid[p], agents, goods):
+                assert Allocation.from_mask(agents, goods, alloc.to_mask(goods)) == alloc
+
+    # Vectorized properties
+    for n in (2, 4, 6, 8):
+        for agents, goods in generate_possible_problems(n)[::1 if n < 6 else 997]:
+            A = list(Allocation.generate_all_allocations(agents, goods))
+            ranks = batch.ranks_from_agents(agents, goods)
+            masks = [X.to_mask(goods) for X in A]
+            envy_free = batch.batch_is_envy_free(ranks, masks)
+            pareto = batch.batch_is_pareto(ranks, masks, masks, chunk_size=7)
+            for i, X in enumerate(A):
+                assert envy_free[i] == properties.is_envy_free.__wrapped__(X, agents)
+                assert pareto[i] == properties.is_pareto.__wrapped__(X, A, agents)
+            # Only a part of the possible allocations
+            pareto = batch.batch_is_pareto(ranks, masks, masks[::3])
+            for i, X in enumerate(A):
+                assert pareto[i] == properties.is_pareto.__wrapped__(X, A[::3], agents)
+
+    # Statistics use the vectorized path for many allocations, with the same results
+    functions = DEFAULT_REGISTRY.functions(["is_pareto", "is_envy_free", "is_borda_envy_free"])
+    agents, goods = monteCarlo.random_problem(10, random.Random(0))
+    A = Allocation.view(agents, goods)
+    candidates = list(A)[:150]
+    assert len(candidates) >= statistics.BATCH_THRESHOLD
+    table = PropertyTable(A, agents, goods, functions)
+    table.prefetch(candidates)
+    assert len(table) == len(candidates)
+    batched = Statistics(A, agents, functions)
+    batched.add_all(candidates)
+    assert len(batched._own_table) == len(candidates)
+    for X, row in zip(candidates, batched.data):
+        assert row == dict({Statistics.A_KEY: X}, **{
+            "is_pareto": properties.is_pareto.__wrapped__(X, A, agents),
+            "is_envy_free": properties.is_envy_free.__wrapped__(X, agents),
+            "is_borda_envy_free": properties.is_borda_envy_free.__wrapped__(X, agents),
+        })
+        assert table.values(X) == {k: v for k, v in row.items() if k != Statistics.A_KEY}
@@ -0,0 +1,55 @@
+import benchmarkCompare
+import benchmarkSuite
+import copy
+
+
+if __name__ == "__main__":
+    baseline = {"results": [
+        {"target": "t", "family": "random", "n": 4, "times": [1.0, 1.1, 0.9, 1.05, 0.95], "peak_memory": 10000},
+        {"target": "u", "family": "random", "n": 4, "times": [1.0, 1.1, 0.9, 1.05, 0.95], "peak_memory": 10000},
+    ]}
+    same = copy.deepcopy(baseline)
+    passed, _ = benchmarkCompare.summary(benchmarkCompare.compare(baseline, same))
+    assert passed
+
+    slower = copy.deepcopy(baseline)
+    slower["results"][0]["times"] = [2 * t for t in slower["results"][0]["times"]]
+    slower["results"][1]["peak_memory"] = 100000
+    rows = benchmarkCompare.compare(baseline, slower)
+    assert [(row["slowdown"], row["memory_growth"]) for row in rows] == [(True, False), (False, True)]
+    passed, text = benchmarkCompare.summary(rows)
+    assert not passed and "FAIL t random n=4" in text
+
+    # A single noisy run isn't significant
+    noisy = copy.deepcopy(baseline)
+    noisy["results"][0]["times"] = [1.0, 1.1, 0.9, 3.0, 3.0]
+    assert not benchmarkCompare.compare(baseline, noisy)[0]["slowdown"]
+
+    assert benchmarkCompare.slowdown_p_value([1] * 20, [2] * 20) < 0.001
+    del slower["results"][1]
+    assert benchmarkCompare.missing_cells(baseline, slower) == [("u", "random", 4)]
+
+    # A uniformly slower machine isn't a regression
+    calibrated = copy.deepcopy(baseline)
+    calibrated["calibration"] = 2.0
+    for result in calibrated["results"]:
+        result["times"] = [2 * t for t in result["times"]]
+    baseline["calibration"] = 1.0
+    assert benchmarkCompare.summary(benchmarkCompare.compare(baseline, calibrated))[0]
+    # Nor a slower period of the machine during a run
+    for result in baseline["results"]:
+        result["calibrations"] = [1.0] * 5
+    for result in calibrated["results"]:
+        result["calibrations"] = [1.0, 1.0, 1.0, 2.0, 2.0]
+        result["times"] = [1.0, 1.1, 0.9, 2.1, 1.9]
+    calibrated["calibration"] = 1.0
+    assert benchmarkCompare.summary(benchmarkCompare.compare(baseline, calibrated))[0]
+    calibrated["results"][0]["calibrations"] = [1.0] * 5
+    calibrated["results"][0]["times"] = [2.0, 2.2, 1.8, 2.1, 1.9]
+    assert not benchmarkCompare.summary(benchmarkCompare.compare(baseline, calibrated))[0]
+
+    # The samples of a measure are taken in rounds, memory being measured once
+    data = benchmarkSuite.run_suite([2, 4], ["random"], ["cache.mem", "algorithm.bottom_up"], repeats=3)
+    assert [(r["target"], r["n"]) for r in data["results"]] == [
+        ("algorithm.bottom_up", 2), ("algorithm.bottom_up", 4), ("cache.mem", 2), ("cache.mem", 4)]
+    assert all(len(r["times"]) == 3 == len(r["calibrations"]) and r["peak_memory"] > 0 for r in data["results"])
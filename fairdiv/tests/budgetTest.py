@@ -0,0 +1,85 @@
+from fairdiv import *
+from fairdiv.problemGenerators import generate_possible_problems
+from budget import Budget, BudgetExceeded
+from statistics import Benchmark
+import algorithm
+import threading
+
+
+if __name__ == "__main__":
+    def search(depth):
+        Budget.tick()
+        if depth > 0:
+            search(depth - 1)
+            search(depth - 1)
+
+    with Budget.limit(nodes=100):
+        search(5)
+        assert Budget.nodes == 63
+        try:
+            search(5)
+            assert False
+        except BudgetExceeded as e:
+            assert e.reason == "nodes"
+        # A nested budget can't extend the enclosing one
+        with Budget.limit(nodes=1000):
+            assert Budget.nodes_left < 0
+    assert not Budget.active
+
+    try:
+        with Budget.limit(seconds=0):
+            search(1)
+        assert False
+    except BudgetExceeded as e:
+        assert e.reason == "time"
+
+    problems = generate_possible_problems(6)[:5]
+    algorithms = {
+        "os": algorithm.original_sequential.__wrapped__,
+        "bu": algorithm.bottom_up.__wrapped__,
+    }
+    # Counts as a long scan
+    functions = {"scan": lambda X, A, M: Budget.tick(10) or True}
+    result = Benchmark(problems, algorithms, functions, node_limit=5).run()
+    # Bottom-up doesn't branch, but the properties evaluation of its allocations is part of its budget
+    assert len(Benchmark.timeouts(result)) == 2 * len(problems)
+    assert all(stats.timeout is not None for stats in result["bu"].values())
+    aggregate = Benchmark(problems, algorithms, functions, node_limit=5).run(aggregate=True)
+    assert aggregate.timeouts == {("os", 6): len(problems), ("bu", 6): len(problems)}
+    assert ("os", 6) not in aggregate.problems
+
+    complete = Benchmark(problems, algorithms, functions).run()
+    assert Benchmark.timeouts(complete) == []
+    assert all(stats.timeout is None and stats.count > 0 for stats in complete["os"].values())
+
+    # Budgets are per thread : a limited benchmark doesn't cancel the one running in another thread
+    results = dict()
+
+    def run(key, node_limit):
+        results[key] = Benchmark(problems, algorithms, functions, node_limit=node_limit).run()
+
+    threads = [threading.Thread(target=run, args=("limited", 5)), threading.Thread(target=run, args=("free", None))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(Benchmark.timeouts(results["limited"])) == 2 * len(problems)
+    assert Benchmark.timeouts(results["free"]) == []
+    assert all(results["free"]["os"][p].data == complete["os"][p].data for p in complete["os"])
+    assert not Budget.active
+
+    def limited():
+        with Budget.limit(nodes=10):
+            barrier.wait()
+            search(2)
+            results["nodes"] = Budget.nodes
+
+    barrier = threading.Barrier(2)
+    thread = threading.Thread(target=limited)
+    thread.start()
+    barrier.wait()
+    # Ticks of this thread don't count for the other one's budget
+    search(5)
+    assert Budget.nodes_left is None
+    thread.join()
+    assert results["nodes"] == 7
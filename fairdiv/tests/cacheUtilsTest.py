@@ -0,0 +1,77 @@
+import os
+import tempfile
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+from cacheUtils import Database, cache, mem_cache
+
+
+calls = []
+
+
+def slow_square(x):
+    calls.append(x)
+    time.sleep(0.05)
+    return x * x
+
+
+failures = []
+
+
+def fail_once(x):
+    if len(failures) == 0:
+        failures.append(x)
+        time.sleep(0.05)
+        raise ValueError(x)
+    return x
+
+
+if __name__ == "__main__":
+    pool = ThreadPool(8)
+
+    # Concurrent misses on the same key are computed once
+    square = mem_cache(cache_size=5)(slow_square)
+    assert pool.map(square, [3] * 8) == [9] * 8
+    assert calls == [3]
+
+    # The LRU structures stay consistent under concurrent evictions
+    del calls[:]
+    assert pool.map(square, list(range(40)) * 2) == [x * x for x in range(40)] * 2
+    assert len(Database._mem_cache["slow_square"]) <= 5
+    assert sorted(Database._mem_cache_accesses["slow_square"]) == sorted(Database._mem_cache["slow_square"])
+
+    # A failed computation is retried by the threads that waited for it
+    flaky = mem_cache(cache_size=5)(fail_once)
+    errors = []
+
+    def call():
+        try:
+            flaky(7)
+        except ValueError as e:
+            errors.append(e)
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(errors) == 1 and flaky(7) == 7
+    assert Database._in_flight == dict()
+
+    with tempfile.TemporaryDirectory() as directory:
+        root = Database._db_files_root
+        Database._db_files_root = directory + os.sep
+        try:
+            del calls[:]
+            cached = cache(slow_square)
+            assert pool.map(cached, [2, 2, 3, 3, 2, 3]) == [4, 4, 9, 9, 4, 9]
+            assert sorted(calls) == [2, 3]
+            # Saving while other threads use the cache loses nothing
+            pool.map(lambda x: cached(x) if x % 2 else Database.save_files(), range(40))
+            Database.save_files()
+            del calls[:]
+            assert pool.map(cached, range(1, 40, 2)) == [x * x for x in range(1, 40, 2)]
+            assert calls == []
+        finally:
+            Database._open_files.clear()
+            Database._db_files_root = root
+    pool.close()
@@ -0,0 +1,65 @@
+from counterexample import problem_indices, search, check, _Feistel
+from cacheUtils import Database
+from propertyRegistry import DEFAULT_REGISTRY
+from fairdiv import Allocation
+from fairdiv.problemGenerators import generate_possible_problems
+import algorithm
+
+
+def is_counterexample(result, algo, prop):
+    agents, goods = result.problem
+    assert result.allocation in set(algo(agents, goods))
+    return not DEFAULT_REGISTRY.function(prop)(result.allocation, Allocation.view(agents, goods), agents)
+
+
+if __name__ == "__main__":
+    # Every problem once, in both orders
+    ordered = list(problem_indices([6, 2, 4]))
+    assert ordered[:3] == [(2, 0), (2, 1), (4, 0)]
+    assert len(ordered) == 2 + 24 + 720
+    shuffled = list(problem_indices([2, 4, 6], "random", seed=1))
+    assert shuffled != ordered
+    assert sorted(shuffled) == ordered
+    assert shuffled == list(problem_indices([2, 4, 6], "random", seed=1))
+    assert shuffled != list(problem_indices([2, 4, 6], "random", seed=2))
+    # A shuffle rather than a fixed stride between the consecutive indices of a size
+    indices = [index for size, index in shuffled if size == 6]
+    assert len(set((b - a) % 720 for a, b in zip(indices, indices[1:]))) > 100
+    # Permutations of ranges that aren't powers of two, with cycle walking
+    import random
+    for total in (1, 2, 3, 720, 40320):
+        permutation = _Feistel(total, random.Random(total))
+        assert sorted(permutation[i] for i in range(total)) == list(range(total))
+
+    # Checked problems aren't kept in the file cache
+    stored = sum(len(values) for values in Database._open_files.values())
+    assert not check("bottom_up", "is_envy_free", problem_indices([6])).found
+    assert sum(len(values) for values in Database._open_files.values()) == stored
+
+    # The first counterexample, smallest sizes first
+    result = search("original_sequential", "is_borda_pareto", [2, 4, 6])
+    assert result.found
+    assert (result.size, result.index) == (6, 2)
+    assert result.problems == 2 + 24 + 3
+    assert is_counterexample(result, algorithm.original_sequential, "is_borda_pareto")
+
+    # Exhaustion
+    result = search("bottom_up", "is_envy_free", [2, 4])
+    assert not result.found
+    assert result.problem is None
+    assert result.problems == 26
+    assert result.allocations == sum(len(algorithm.bottom_up(*problem))
+                                     for problem in generate_possible_problems(2) + generate_possible_problems(4))
+    assert search(algorithm.bottom_up, DEFAULT_REGISTRY.function("is_envy_free"), [2, 4]).allocations == \
+        result.allocations
+
+    # Random order & several processes
+    result = search("original_sequential", "is_borda_pareto", [4, 6], "random", seed=3)
+    assert result.found and is_counterexample(result, algorithm.original_sequential, "is_borda_pareto")
+    result = search("original_sequential", "is_borda_pareto", [4, 6], workers=2, chunk_size=20)
+    assert result.found and is_counterexample(result, algorithm.original_sequential, "is_borda_pareto")
+    result = search("bottom_up", "is_envy_free", [2, 4], workers=2, chunk_size=5)
+    assert not result.found and result.problems == 26
+    # The expected value can be False, e.g. to find an allocation satisfying a property
+    result = search("original_sequential", "is_borda_pareto", [6], expected=False)
+    assert result.found and not is_counterexample(result, algorithm.original_sequential, "is_borda_pareto")
@@ -0,0 +1,72 @@
+from fairdiv.problemGenerators import generate_possible_problems, generate_problem
+from distributedBenchmark import Coordinator, run_local, run_range, run_worker, _send, _receive
+from propertyRegistry import DEFAULT_REGISTRY
+from statistics import Aggregate, Benchmark
+from cacheUtils import Database
+import atlas
+import os
+import socket
+import tempfile
+import threading
+
+
+def same(a, b):
+    return all(getattr(a, name) == getattr(b, name) for name in
+               ("problems", "outputs", "output_sizes", "satisfied", "distributions", "timeouts"))
+
+
+if __name__ == "__main__":
+    algorithms = ["original_sequential", "bottom_up"]
+    properties = ["is_pareto", "is_envy_free", "is_borda_pareto"]
+    problems = generate_possible_problems(6)
+    expected = Benchmark(problems[:300], {name: atlas.ALGORITHMS[name] for name in algorithms},
+                         DEFAULT_REGISTRY.functions(properties)).run_aggregate()
+
+    # Workers don't fill the file cache with the results of their ranges
+    stored = sum(len(values) for values in Database._open_files.values())
+    assert same(run_range(6, 0, 300, algorithms, properties), expected)
+    assert same(run_range(6, 300, 720, algorithms, properties).merge(expected),
+                Benchmark(problems, {name: atlas.ALGORITHMS[name] for name in algorithms},
+                          DEFAULT_REGISTRY.functions(properties)).run_aggregate())
+    assert sum(len(values) for values in Database._open_files.values()) == stored
+
+    # Problems are rebuilt from their index
+    for index in (0, 1, 123, 719):
+        agents, goods = generate_problem(6, index)
+        assert goods == problems[index][1]
+        assert agents[1].preferences == problems[index][0][1].preferences
+
+    # Aggregates go through JSON
+    assert same(Aggregate.from_dict(expected.to_dict()), expected)
+
+    # Several worker processes
+    result = run_local(6, algorithms, properties, workers=3, range_size=50, stop=300)
+    assert same(result, expected)
+
+    # A worker taking a range & disconnecting before sending its result
+    coordinator = Coordinator(6, algorithms, properties, range_size=50, stop=300).start()
+    with socket.create_connection(coordinator.address) as sock, sock.makefile("rwb") as stream:
+        _send(stream, {"type": "request"})
+        assert _receive(stream)["range"] == [0, 50]
+    worker = threading.Thread(target=run_worker, args=(coordinator.address,))
+    worker.start()
+    assert same(coordinator.wait(120), expected)
+    worker.join()
+    assert coordinator.requeued == 1
+    coordinator.close()
+
+    # A worker that doesn't answer in time, over a Unix socket
+    path = os.path.join(tempfile.mkdtemp(), "coordinator")
+    coordinator = Coordinator(6, algorithms, properties, path, range_size=100, stop=300,
+                              lease=0.5).start()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock, sock.makefile("rwb") as stream:
+        sock.connect(path)
+        _send(stream, {"type": "request"})
+        assert _receive(stream)["range"] == [0, 100]
+        worker = threading.Thread(target=run_worker, args=(path,))
+        worker.start()
+        assert same(coordinator.wait(120), expected)
+        worker.join()
+    assert coordinator.requeued >= 1
+    coordinator.close()
+    assert not os.path.exists(path)
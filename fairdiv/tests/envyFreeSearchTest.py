@@ -0,0 +1,23 @@
+from fairdiv import *
+from fairdiv.problemGenerators import generate_possible_problems
+import properties
+import envyFreeSearch
+
+
+if __name__ == "__main__":
+    for n in (2, 4, 6):
+        for agents, goods in generate_possible_problems(n)[::1 if n < 6 else 12]:
+            A = list(Allocation.generate_all_allocations(agents, goods))
+            for envy_free in ((0, ), (1, ), (0, 1)):
+                expected = set(X for X in A
+                               if all(not agents[a].is_ordinally_less(X[a]) for a in envy_free))
+                assert envyFreeSearch.fair_set(agents, goods, envy_free=envy_free) == expected
+
+            ef = set(X for X in A if properties.is_envy_free_ordinally(X, agents))
+            assert ef == set(X for X in A if envyFreeSearch.is_envy_free_ordinally(X, agents))
+            assert envyFreeSearch.fair_set(agents, goods, borda_envy_free=True) == \
+                set(X for X in ef if properties.is_borda_envy_free(X, agents))
+            assert envyFreeSearch.fair_set(agents, goods, pareto=True) == \
+                set(X for X in ef if properties.is_pareto(X, A, agents))
+            assert envyFreeSearch.fair_set(agents, goods, constraints=[properties.is_envy_free]) == \
+                set(X for X in ef if properties.is_envy_free(X, agents))
@@ -0,0 +1,41 @@
+from fairdiv import *
+from fairdiv.problemGenerators import generate_possible_problems
+from fusedEvaluator import FusedEvaluator, FUSED_PROPERTIES
+from statistics import Statistics, Benchmark
+import algorithm
+import properties
+
+
+if __name__ == "__main__":
+    for n in (2, 4, 6):
+        for agents, goods in generate_possible_problems(n)[::1 if n < 6 else 12]:
+            A = list(Allocation.generate_all_allocations(agents, goods))
+            for allocs in (A, Allocation.view(agents, goods)):
+                evaluator = FusedEvaluator(allocs, agents, goods)
+                for X, values in zip(A, evaluator.evaluate(A)):
+                    assert values == {name: getattr(properties, name).__wrapped__(X, A, agents)
+                                      for name in FUSED_PROPERTIES}
+
+    # Only a part of the possible allocations
+    agents, goods = generate_possible_problems(6)[100]
+    A = list(Allocation.generate_all_allocations(agents, goods))[::3]
+    evaluator = FusedEvaluator(A, agents, goods)
+    for X in A:
+        assert evaluator.values(X) == {name: getattr(properties, name).__wrapped__(X, A, agents)
+                                       for name in FUSED_PROPERTIES}
+
+    # Statistics & Benchmark give the values of the properties
+    functions = {name: getattr(properties, name).__wrapped__ for name in FUSED_PROPERTIES}
+    functions["is_envy_free"] = lambda X, A, M: properties.is_envy_free(X, M)
+    algorithms = {"os": algorithm.original_sequential, "bu": algorithm.bottom_up}
+    problems = generate_possible_problems(4)
+    result = Benchmark(problems, algorithms, functions).run()
+    for agents, goods in problems:
+        A = list(Allocation.generate_all_allocations(agents, goods))
+        for name, algo in algorithms.items():
+            statistics = Statistics(A, agents, functions)
+            for X in algo(agents, goods):
+                statistics.add(X)
+                assert statistics.data[-1] == dict({Statistics.A_KEY: X},
+                                                   **{k: f(X, A, agents) for k, f in functions.items()})
+            assert result[name][str(agents[1].preferences)].data == statistics.data
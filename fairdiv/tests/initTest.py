@@ -1,6 +1,7 @@
 from fairdiv import *
 from fairdiv.problemGenerators import generate_possible_problems
 import math
+import algorithm
 
 
 @mem_cache(cache_size=10)
@@ -17,6 +18,51 @@ if __name__ == "__main__":
         actual_cache_content = set(key for key in Database._mem_cache['cache_test'])
         assert actual_cache_content == cache_content
 
+    for agents, goods in generate_possible_problems(6)[::60]:
+        view = Allocation.view(agents, goods)
+        A = Allocation.generate_all_allocations(agents, goods)
+        assert len(view) == len(A) and set(view) == set(A)
+        assert all(X in view for X in A) and view.masks() == [X.to_mask(goods) for X in view]
+        # The skeleton is shared by all the problems of a size
+        assert view._skeleton is Allocation.view(*generate_possible_problems(6)[1])._skeleton
+
+    for agents, goods in generate_possible_problems(6)[::60]:
+        A = set(Allocation.generate_all_allocations(agents, goods))
+        names = ("original_sequential", "restricted_sequential", "singles_doubles", "bottom_up")
+        outputs = {name: getattr(algorithm, name)(agents, goods) for name in names}
+        # Hits of the file cache are sets too, including the results stored as lists by older versions
+        assert all(isinstance(getattr(algorithm, name)(agents, goods), AllocationSet) for name in names)
+        for name, output in outputs.items():
+            assert isinstance(output, AllocationSet) and output <= A and output.issubset(A)
+            assert output.masks() == sorted(X.to_mask(sorted(goods)) for X in output)
+        os, rs = outputs["original_sequential"], outputs["restricted_sequential"]
+        plain_os, plain_rs = set(os), set(rs)
+        assert (os & rs) == (plain_os & plain_rs) and (os | rs) == (plain_os | plain_rs)
+        assert (os - rs) == (plain_os - plain_rs) and (os ^ rs) == (plain_os ^ plain_rs)
+        assert isinstance(os & rs, AllocationSet) and isinstance(plain_os - rs, AllocationSet)
+        assert (plain_os - rs) == (plain_os - plain_rs) and os.intersection(list(rs)) == (plain_os & plain_rs)
+        assert os.count(rs) == len(plain_os & plain_rs) and (rs <= os) == (plain_rs <= plain_os)
+        assert all(X in os for X in plain_os) and sum(X in os for X in A) == len(os)
+        empty = Allocation.get_allocations(agents, [])
+        assert len(empty) == 0 and (os | empty) == os and (empty | os) == os and empty <= os
+        # Sets of other problems are combined as plain sets
+        other = set(Allocation.generate_all_allocations(*generate_possible_problems(4)[0]))
+        assert (os | other) == (plain_os | other) and len(os & other) == 0
+
+    # Plain sets are converted from the bundles of their allocations, the possible allocations aren't built
+    goods = [Good(str(i)) for i in range(20)]
+    agents = (Agent("A", goods[:]), Agent("B", goods[::-1]))
+    X = Allocation(agents[0], goods[:10], agents[1], goods[10:])
+    Y = Allocation(agents[0], goods[10:], agents[1], goods[:10])
+    big = Allocation.get_allocations(agents, [X], goods)
+    assert isinstance(big | {Y}, AllocationSet) and (big | {Y}) == {X, Y} and big <= {X, Y}
+    assert (20, ) not in Database._mem_cache.get("Allocation.skeleton", dict())
+    # Unbalanced allocations & allocations of other goods are combined as plain sets
+    Z = Allocation(agents[0], goods[:9], agents[1], goods[9:])
+    W = Allocation(agents[0], goods[:10], agents[1], goods[10:19] + [Good("20")])
+    assert not isinstance(big | {Z}, AllocationSet) and not isinstance(big | {W}, AllocationSet)
+    assert (big | {Z}) == {X, Z} and len(big & {W}) == 0
+
     for i in range(7):
         assert len(generate_possible_problems(i+2)) == math.factorial(i+2)
         generate_possible_problems(i+2, True)
@@ -0,0 +1,30 @@
+from fairdiv import *
+from fairdiv.problemGenerators import generate_possible_problems
+from statistics import Benchmark
+import algorithm
+import properties
+
+
+if __name__ == "__main__":
+    problems = generate_possible_problems(4)
+    algorithms = {"os": algorithm.original_sequential, "bu": algorithm.bottom_up}
+    functions = {"is_envy_free_ordinally": lambda X, A, M: properties.is_envy_free_ordinally(X, M)}
+
+    Instrumentation.reset()
+    result = Benchmark(problems, algorithms, functions).run()
+    assert Instrumentation.snapshot() == {"counters": dict(), "timers": dict()}
+    assert all(s.instrumentation is None for stats in result.values() for s in stats.values())
+
+    Instrumentation.enable()
+    result = Benchmark(problems, algorithms, functions).run()
+    aggregate = Benchmark(problems, algorithms, functions).run(aggregate=True)
+    Instrumentation.disable()
+
+    collected = Benchmark.collect_instrumentation(result)
+    assert collected["os"]["timers"]["algorithm.os"][1] == len(problems)
+    assert collected["os"]["counters"]["file_cache.original_sequential.hits"] == len(problems)
+    assert aggregate.instrumentation["bu"]["timers"]["algorithm.bu"][1] == len(problems)
+    total = Instrumentation.merge([collected["os"], collected["bu"]] + list(aggregate.instrumentation.values()))
+    for name, value in total["counters"].items():
+        assert value <= Instrumentation.counters[name]
+    assert "Counters:" in Instrumentation.report()
@@ -0,0 +1,32 @@
+from fairdiv import *
+from fairdiv.problemGenerators import generate_possible_problems
+import algorithm
+import monteCarlo
+import properties
+
+
+if __name__ == "__main__":
+    low, high = monteCarlo.wilson_interval(50, 100)
+    assert abs(low - 0.4038) < 1e-3 and abs(high - 0.5962) < 1e-3
+    assert monteCarlo.wilson_interval(0, 100)[0] == 0.0
+
+    agents, goods = generate_possible_problems(6)[100]
+    A = list(Allocation.generate_all_allocations(agents, goods))
+    functions = {
+        "is_pareto": properties.is_pareto,
+        "is_envy_free_ordinally": lambda X, A, M: properties.is_envy_free_ordinally(X, M),
+        "is_borda_pareto": properties.is_borda_pareto,
+    }
+    estimates = monteCarlo.estimate(monteCarlo.allocation_sampler(agents, goods),
+                                    {k: monteCarlo.PROPERTIES[k] for k in functions}, precision=0.05, seed=0)
+    for k, func in functions.items():
+        exact = sum(1 for X in A if func(X, A, agents)) / len(A)
+        assert estimates[k].interval[0] <= exact <= estimates[k].interval[1]
+        # Adaptive stopping
+        assert estimates[k].half_width <= 0.05
+
+    # Bottom-up always returns allocations, so every draw is a sample
+    sampler = monteCarlo.algorithm_sampler(algorithm.bottom_up, 8)
+    functions = {"is_envy_free_ordinally": monteCarlo.PROPERTIES["is_envy_free_ordinally"]}
+    estimates = monteCarlo.estimate(sampler, functions, max_samples=200, seed=1)
+    assert estimates["is_envy_free_ordinally"].trials == 200
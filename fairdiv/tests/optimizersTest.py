@@ -0,0 +1,24 @@
+from fairdiv import *
+from fairdiv.problemGenerators import generate_possible_problems
+import properties
+import optimizers
+import random
+
+
+if __name__ == "__main__":
+    predicates = ["is_max_min", "is_maximal_borda_sum", "is_borda_max_min", "is_borda_nash", "is_borda_pareto"]
+    for n in (2, 4, 6):
+        # Only a sample of the problems of size 6, scanning A for each of them is slow
+        for agents, goods in generate_possible_problems(n)[::1 if n < 6 else 12]:
+            A = list(Allocation.generate_all_allocations(agents, goods))
+            for X in A:
+                for name in predicates:
+                    assert getattr(optimizers, name)(X, A, agents) == getattr(properties, name)(X, A, agents)
+
+    # Large problems only need to be tractable
+    goods = [Good(str(i)) for i in range(40)]
+    b_pref = goods[:]
+    random.Random(0).shuffle(b_pref)
+    agents = (Agent("A", goods[:]), Agent("B", b_pref))
+    assert optimizers.max_min_value(agents, goods) >= 20
+    assert optimizers.borda_max_min_value(agents, goods) <= optimizers.maximal_borda_sum_value(agents, goods) // 2
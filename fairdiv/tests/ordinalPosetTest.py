@@ -0,0 +1,64 @@
+from fairdiv import *
+from fairdiv.problemGenerators import generate_possible_problems
+import itertools
+import algorithm
+import ordinalPoset
+import properties
+
+
+def scan_envy_free_ordinally(alloc, agents):
+    """
+    The check of properties.is_envy_free_ordinally before the posets : each bundle is compared to its complement
+    over all the goods, also for the partial allocations of singles_doubles
+    """
+    return not any(agents[j]._is_ordinally_less.__wrapped__(
+        agents[j], tuple(alloc[j]), tuple([g for g in agents[j].preferences if g not in alloc[j]])) for j in range(2))
+
+
+if __name__ == "__main__":
+    # The relation is the one of Agent.is_ordinally_less
+    for n in (2, 4, 6):
+        for agents, goods in generate_possible_problems(n)[::1 if n < 6 else 60]:
+            bundles = list(itertools.combinations(goods, n // 2))
+            for agent in agents:
+                poset = ordinalPoset.ordinal_poset(agent, goods)
+                for b1 in bundles:
+                    dominators = 0
+                    for b2 in bundles:
+                        less = agent._is_ordinally_less.__wrapped__(agent, b1, b2)
+                        assert poset.is_less(b1, b2) == less
+                        if less:
+                            dominators |= 1 << poset.index(b2)
+                    assert poset.dominators(b1) == dominators
+                    assert poset.is_dominated(b1) == (dominators != 0)
+                    assert poset.is_less(b1) == agent._is_ordinally_less.__wrapped__(
+                        agent, b1, tuple([g for g in agent.preferences if g not in b1]))
+
+    # The properties give the same results as the scans
+    for agents, goods in generate_possible_problems(6)[::30]:
+        A = list(Allocation.generate_all_allocations(agents, goods))
+        for allocs in (A, A[::4], Allocation.view(agents, goods)):
+            for X in A:
+                expected = not any(agents[j]._is_ordinally_less.__wrapped__(agents[j], X[j], Y[j])
+                                   for Y in allocs for j in range(2))
+                assert ordinalPoset.is_pareto_ordinally(X, allocs, agents) == expected
+        for X in A:
+            assert ordinalPoset.is_envy_free_ordinally(X, agents) == (
+                not agents[0]._is_ordinally_less.__wrapped__(agents[0], X[0], X[1]) and
+                not agents[1]._is_ordinally_less.__wrapped__(agents[1], X[1], X[0]))
+
+    # singles_doubles, which checks partial allocations, returns the same allocations as with the scan
+    original = algorithm.is_envy_free_ordinally
+    try:
+        for agents, goods in generate_possible_problems(6):
+            algorithm.is_envy_free_ordinally = scan_envy_free_ordinally
+            expected = algorithm.singles_doubles.__wrapped__(agents, goods)
+            algorithm.is_envy_free_ordinally = properties.is_envy_free_ordinally.__wrapped__
+            assert algorithm.singles_doubles.__wrapped__(agents, goods) == expected
+    finally:
+        algorithm.is_envy_free_ordinally = original
+
+    # Large sizes are tractable
+    relation = ordinalPoset.rank_relation(12)
+    # The worst bundle is ordinally less than the ones without the worst good
+    assert len(relation[0]) == 924 and bin(relation[1][-1]).count("1") == 462
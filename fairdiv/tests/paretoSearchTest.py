@@ -0,0 +1,35 @@
+from fairdiv import *
+from fairdiv.problemGenerators import generate_possible_problems
+import properties
+import paretoSearch
+import math
+import random
+
+
+if __name__ == "__main__":
+    # The oracle agrees with the scan of the possible allocations on every problem up to 6 goods. The uncached
+    # scans are used, so the file cache doesn't store every allocation.
+    for n in (2, 4, 6):
+        for agents, goods in generate_possible_problems(n):
+            A = list(Allocation.generate_all_allocations(agents, goods))
+            search = paretoSearch.ParetoSearch(agents, goods)
+            for X in A:
+                assert paretoSearch.is_pareto(X, A, agents) == properties.is_pareto.__wrapped__(X, A, agents)
+                assert paretoSearch.is_pareto_ordinally(X, A, agents) == \
+                    properties.is_pareto_ordinally.__wrapped__(X, A, agents)
+                Y = search.find_dominator(X)
+                if Y is not None:
+                    assert Y in A and not properties.is_pareto(X, [Y], agents)
+
+    # Checks on large problems only visit a small part of the allocations
+    rng = random.Random(0)
+    n = 24
+    goods = [Good(str(i)) for i in range(n)]
+    b_pref = goods[:]
+    rng.shuffle(b_pref)
+    agents = (Agent("A", goods[:]), Agent("B", b_pref))
+    search = paretoSearch.ParetoSearch(agents, goods)
+    for _ in range(20):
+        g1 = rng.sample(goods, n // 2)
+        search.find_dominator(Allocation(agents[0], g1, agents[1], [g for g in goods if g not in g1]))
+    assert search.nodes < math.comb(n, n // 2)
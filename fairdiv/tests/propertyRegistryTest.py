@@ -0,0 +1,31 @@
+from fairdiv import *
+from fairdiv.problemGenerators import generate_possible_problems
+from propertyRegistry import DEFAULT_REGISTRY, PropertyRegistry
+from statistics import Statistics
+
+
+if __name__ == "__main__":
+    functions = DEFAULT_REGISTRY.functions()
+    functions["not_registered"] = lambda X, A, M: len(X[0])
+    for agents, goods in generate_possible_problems(4):
+        A = list(Allocation.generate_all_allocations(agents, goods))
+        scheduled = Statistics(A, agents, functions)
+        everything = Statistics(A, agents, functions, registry=PropertyRegistry())
+        for X in A:
+            scheduled.add(X)
+            everything.add(X)
+        assert scheduled.data == everything.data
+        assert [list(row.keys()) for row in scheduled.data] == [list(row.keys()) for row in everything.data]
+
+    registry = PropertyRegistry()
+    calls = []
+    registry.register("a", lambda X, A, M: calls.append("a") or False, 1)
+    registry.register("b", lambda X, A, M: calls.append("b") or True, 2)
+    registry.add_implication("b", "a", conclusion_value=False)
+    assert registry.evaluate(registry.functions(), None, None, None) == {"a": False, "b": True}
+    assert calls == ["a", "b"]
+    calls.clear()
+    registry.register("c", lambda X, A, M: calls.append("c") or True, 0)
+    registry.add_implication("c", "b")
+    assert registry.evaluate(registry.functions(), None, None, None) == {"a": False, "b": True, "c": True}
+    assert calls == ["c"]
@@ -0,0 +1,39 @@
+from fairdiv import *
+from fairdiv.problemGenerators import generate_possible_problems
+import properties
+import revolvingDoor
+import math
+
+
+if __name__ == "__main__":
+    # Every balanced allocation appears once & consecutive ones differ by one swap
+    for n in (2, 4, 6, 8, 10):
+        swaps = revolvingDoor.door_swaps(n)
+        assert len(swaps) == math.comb(n, n // 2)
+        mask = swaps[0]
+        seen = {mask}
+        for out, into in swaps[1:]:
+            assert mask >> out & 1 and not mask >> into & 1
+            mask ^= 1 << out | 1 << into
+            seen.add(mask)
+        assert len(seen) == len(swaps)
+        assert all(bin(m).count("1") == n // 2 for m in seen)
+
+    # The incremental scores are the ones of the allocations
+    agents, goods = generate_possible_problems(6)[123]
+    scan = revolvingDoor.RevolvingDoorScan(agents, goods)
+    for mask, ba, bb, ra, rb in scan.states():
+        X = Allocation.from_mask(agents, goods, mask)
+        assert (ba, bb) == (agents[0].borda(X[0]), agents[1].borda(X[1]))
+        assert ra.bit_length() == max([agents[0].rank(g) for g in X[0]])
+        assert sorted(r + 1 for r in range(6) if rb >> r & 1) == sorted([agents[1].rank(g) for g in X[1]])
+
+    predicates = ["is_pareto", "is_max_min", "is_maximal_borda_sum", "is_borda_max_min", "is_borda_nash",
+                  "is_borda_pareto"]
+    for n in (2, 4, 6):
+        for agents, goods in generate_possible_problems(n)[::1 if n < 6 else 12]:
+            A = list(Allocation.generate_all_allocations(agents, goods))
+            for X in A:
+                for name in predicates:
+                    assert getattr(revolvingDoor, name)(X, A, agents) == \
+                        getattr(properties, name).__wrapped__(X, A, agents), name
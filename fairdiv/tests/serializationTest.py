@@ -0,0 +1,99 @@
+import io
+import os
+import pickle
+import tempfile
+from fairdiv import *
+from fairdiv.problemGenerators import generate_possible_problems
+from serialization import PackedAllocations, compact, dump_result, expand, load_all, load_result, load_segments, \
+    upgrade_sets
+from statistics import Benchmark
+import algorithm
+import properties
+
+
+if __name__ == "__main__":
+    agents, goods = generate_possible_problems(6)[42]
+    A = list(Allocation.generate_all_allocations(agents, goods))
+    packed = PackedAllocations.pack(A)
+    assert len(packed) == len(A) and packed.unpack() == A
+    assert PackedAllocations.pack([A[0], "not an allocation"]) is None
+
+    # Cache values survive the compaction, equal objects being pickled once
+    values = {(tuple(agents), tuple(goods)): A, ("int", 1): True, ("bool", True): 1, "x": [1, 2]}
+    for X in A:
+        values[(tuple(X[0]), tuple(X[1]), tuple(agents))] = properties.is_envy_free(X, agents)
+    data = pickle.dumps(compact(values))
+    loaded = pickle.loads(data)
+    assert {k: expand(v) for k, v in loaded.items()} == values
+    # True & 1 are equal but not interchangeable
+    assert {k[0]: type(k[1]) for k in loaded if k[0] in ("int", "bool")} == {"int": int, "bool": bool}
+    assert type(loaded[("int", 1)]) is bool and type(loaded[("bool", True)]) is int
+    assert len(data) < len(pickle.dumps(values))
+
+    # Sets of allocations stay sets, packs of older versions hold the outputs of algorithms
+    output = algorithm.bottom_up.__wrapped__(agents, goods)
+    loaded = expand(pickle.loads(pickle.dumps(compact({"set": output})))["set"])
+    assert isinstance(loaded, AllocationSet) and loaded == output
+    legacy = PackedAllocations.pack(list(output))
+    del legacy.container
+    assert isinstance(expand(legacy), AllocationSet) and expand(legacy) == output
+
+    # Successive pickles written by older versions of the file cache are merged
+    f = io.BytesIO(pickle.dumps({"a": 1, "b": 1}) + pickle.dumps({"b": 2}))
+    assert load_all(f) == {"a": 1, "b": 2}
+
+    with tempfile.TemporaryDirectory() as directory:
+        root = Database._db_files_root
+        Database._db_files_root = directory + os.sep
+        try:
+            cached = cache(algorithm.original_sequential.__wrapped__)
+            expected = cached(agents, goods)
+            Database.save_files()
+            path = Database.get_file_path(algorithm.original_sequential.__wrapped__)
+            size = os.path.getsize(path)
+            # Nothing new, nothing written
+            Database.save_files()
+            assert cached(agents, goods) == expected
+            assert os.path.getsize(path) == size
+            # New results are appended, until the file is rewritten as a single pickle
+            Database.max_segments = 3
+            for agents_i, goods_i in generate_possible_problems(4)[:5]:
+                cached(agents_i, goods_i)
+                Database.save_files()
+            with open(path, "rb") as f:
+                values, segments = load_segments(f)
+            assert segments <= 3 and len(values) == 6
+            assert all(isinstance(value, PackedAllocations) for value in values.values())
+            Database._open_files.clear()
+            assert cached(agents, goods) == expected
+
+            # Algorithm results stored as lists by older versions are sets when read, also after a rewrite
+            key = Database.get_args_key((agents, goods))
+            with open(path, "wb") as f:
+                pickle.dump({key: list(expected)}, f)
+            Database._open_files.clear()
+            Database._segments.clear()
+            assert isinstance(algorithm.original_sequential(agents, goods), AllocationSet)
+            assert algorithm.original_sequential(agents, goods) == expected
+            Database.max_segments = 1
+            algorithm.original_sequential(*generate_possible_problems(4)[0])
+            Database.save_files()
+            with open(path, "rb") as f:
+                values, segments = load_segments(f)
+            assert segments == 1 and all(value.container == "set" for value in values.values())
+            assert upgrade_sets({key: []})[key] == AllocationSet(agents, goods)
+        finally:
+            Database._open_files.clear()
+            Database._db_files_root = root
+            Database.max_segments = 16
+
+    problems = generate_possible_problems(4)
+    functions = {"is_pareto": properties.is_pareto, "size": lambda X, A, M: len(X[0])}
+    result = Benchmark(problems, {"os": algorithm.original_sequential}, functions).run()
+    f = io.BytesIO()
+    dump_result(result, f)
+    f.seek(0)
+    loaded = load_result(f)
+    for problem, statistics in result["os"].items():
+        assert loaded["os"][problem].data == statistics.data
+        assert loaded["os"][problem].satisfied == statistics.satisfied
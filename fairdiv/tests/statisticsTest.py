@@ -0,0 +1,89 @@
+from fairdiv import *
+from fairdiv.problemGenerators import generate_possible_problems, generate_problems_range
+from cacheUtils import Database
+from statistics import Statistics, Benchmark
+import algorithm
+import properties
+
+
+if __name__ == "__main__":
+    algorithms = {
+        "os": algorithm.original_sequential,
+        "rs": algorithm.restricted_sequential,
+        "sd": algorithm.singles_doubles,
+        "bu": algorithm.bottom_up,
+    }
+    calls = []
+    functions = {
+        "is_borda_pareto": properties.is_borda_pareto,
+        "counted": lambda X, A, M: calls.append(X) or len(X[0]),
+    }
+    problems = generate_possible_problems(4)
+
+    result = Benchmark(problems, algorithms, functions).run()
+    benchmark_calls = len(calls)
+    distinct_solutions = 0
+    for agents, goods in problems:
+        A = Allocation.generate_all_allocations(agents, goods)
+        distinct = set()
+        for name, algo in algorithms.items():
+            expected = Statistics(A, agents, functions)
+            for solution in algo(agents, goods):
+                expected.add(solution)
+                distinct.add(solution)
+            assert result[name][str(agents[1].preferences)].data == expected.data
+        distinct_solutions += len(distinct)
+    # Each distinct allocation of a problem is only evaluated once by the benchmark
+    assert benchmark_calls == distinct_solutions
+
+    aggregate = Benchmark(problems, algorithms, functions).run(aggregate=True)
+    for name in algorithms:
+        outputs = [row for stats in result[name].values() for row in stats.data]
+        assert aggregate.outputs[(name, 4)] == len(outputs)
+        assert aggregate.satisfied[(name, "is_borda_pareto", 4)] == sum(row["is_borda_pareto"] for row in outputs)
+        assert sum(aggregate.output_sizes[(name, 4)].values()) == len(problems)
+    halves = [Benchmark(problems[:10], algorithms, functions).run(aggregate=True),
+              Benchmark(problems[10:], algorithms, functions).run(aggregate=True)]
+    merged = halves[0].merge(halves[1])
+    assert (merged.problems, merged.outputs, merged.output_sizes, merged.satisfied, merged.distributions) == \
+        (aggregate.problems, aggregate.outputs, aggregate.output_sizes, aggregate.satisfied, aggregate.distributions)
+
+    # Lazy statistics only apply the functions whose results are read, once per allocation
+    calls = []
+    lazy = Benchmark(problems, algorithms, functions, lazy=True).run()
+    assert len(calls) == 0
+    agents = problems[3][0]
+    rows = lazy["os"][str(agents[1].preferences)].data
+    assert [row["is_borda_pareto"] for row in rows] == \
+        [row["is_borda_pareto"] for row in result["os"][str(agents[1].preferences)].data]
+    assert len(calls) == 0
+    assert [row["counted"] for row in rows] == [row["counted"] for row in rows] and len(calls) == len(rows)
+    for name in algorithms:
+        for problem, statistics in lazy[name].items():
+            assert statistics.data == result[name][problem].data
+            assert statistics.satisfied == result[name][problem].satisfied
+            assert statistics.count == result[name][problem].count
+    assert len(calls) == benchmark_calls
+
+    calls = []
+    agents, goods = problems[5]
+    A = Allocation.view(agents, goods)
+    statistics = Statistics(A, agents, functions, lazy=True)
+    statistics.add_all(algorithm.original_sequential(agents, goods))
+    statistics.materialize(["counted"])
+    assert len(calls) == statistics.count
+    expected = Statistics(A, agents, functions)
+    expected.add_all(algorithm.original_sequential(agents, goods))
+    assert statistics.satisfied == expected.satisfied and len(calls) == statistics.count + expected.count
+
+    # Aggregate runs don't store their results in the file cache, so it doesn't grow with the number of problems
+    def cache_sizes():
+        return sum(len(values) for values in Database._open_files.values())
+
+    before = cache_sizes()
+    Benchmark(generate_problems_range(6, 0, 20), algorithms, functions).run(aggregate=True)
+    small = cache_sizes()
+    Benchmark(generate_problems_range(6, 20, 80), algorithms, functions).run(aggregate=True)
+    assert cache_sizes() == small == before
+    assert all(len(values) <= Database._mem_cache_sizes[name] for name, values in Database._mem_cache.items())
+    assert Database._bypassing == 0 and not Database._bypassed.active